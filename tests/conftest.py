@@ -0,0 +1,33 @@
+import os
+
+import pytest
+import yaml
+
+from toolbox.toolbox import Toolbox
+
+# Testmodule unter toolbox_modules.testing
+MODULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modules")
+
+
+@pytest.fixture(name="config_file")
+def fixture_config_file(tmp_path):
+    """ Config file with the test modules, manifest and state live in tmp_path """
+
+    path = tmp_path / "toolbox.yaml"
+    path.write_text(yaml.safe_dump({
+        "toolbox": {
+            "module_search_paths": [MODULES_PATH],
+            "manifest_path": str(tmp_path / "manifest.json"),
+            "state_path": str(tmp_path / "state"),
+        },
+    }), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture(name="tb")
+def fixture_tb(config_file):
+    """ Toolbox with the test modules, closed after the test """
+
+    toolbox = Toolbox(config_file)
+    yield toolbox
+    toolbox.close()
@@ -0,0 +1,11 @@
+from toolbox.base import BaseToolboxModule, Changes
+
+
+class ToolboxModule(BaseToolboxModule): # pylint: disable=abstract-method
+    HELP = "Incremental module: the first run returns two hosts, later runs change, add and delete one"
+    INCREMENTAL_KEY = "id"
+
+    def run_incremental(self, run_data, cursor):
+        if cursor is None:
+            return Changes([{"id": 1, "name": "esx1"}, {"id": 2, "name": "esx2"}], 1)
+        return Changes([{"id": 2, "name": "esx2-new"}, {"id": 3, "name": "esx3"}], cursor + 1, deleted=[1])
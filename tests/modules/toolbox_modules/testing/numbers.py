@@ -0,0 +1,11 @@
+from toolbox.base import BaseToolboxModule, ConfigModel
+
+
+class ToolboxModule(BaseToolboxModule): # pylint: disable=abstract-method
+    HELP = "Returns the numbers 0 to count - 1 as records"
+
+    class Arguments(ConfigModel):
+        count: int = ConfigModel.add_argument("-n", "--count", default=3, help="Number of records")
+
+    def run(self, run_data=None):
+        return [{"i": i} for i in range(self.args.count)]
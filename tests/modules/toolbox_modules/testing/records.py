@@ -0,0 +1,12 @@
+from toolbox.base import BaseToolboxModule, ConfigModel
+
+
+class ToolboxModule(BaseToolboxModule): # pylint: disable=abstract-method
+    HELP = "Streams the numbers 0 to count - 1 as records"
+
+    class Arguments(ConfigModel):
+        count: int = ConfigModel.add_argument("-n", "--count", default=3, help="Number of records")
+
+    def iter_records(self, run_data=None):
+        for i in range(self.args.count):
+            yield {"i": i, "tags": ["a", "b"]}
@@ -0,0 +1,11 @@
+import subprocess
+
+from toolbox.base import BaseToolboxModule
+
+
+class ToolboxModule(BaseToolboxModule): # pylint: disable=abstract-method
+    HELP = "Runs false, fails with CalledProcessError like a failing external command"
+
+    def run(self, run_data=None):
+        subprocess.run(["false"], check=True)
+        return {"ok": True}
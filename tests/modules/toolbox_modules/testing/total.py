@@ -0,0 +1,14 @@
+from toolbox.base import BaseToolboxModule, ConfigModel
+
+
+class ToolboxModule(BaseToolboxModule): # pylint: disable=abstract-method
+    HELP = "Counts the records of every input"
+
+    class Arguments(ConfigModel):
+        minimum: int = ConfigModel.add_argument("-m", "--minimum", default=0, help="Fail for inputs with fewer records")
+
+    def run(self, run_data=None):
+        counts = {name: len(records) for name, records in (run_data or {}).items()}
+        if any(count < self.args.minimum for count in counts.values()):
+            raise ValueError(f"fewer than {self.args.minimum} records")
+        return counts
@@ -0,0 +1,31 @@
+import abc
+
+import pytest
+
+from toolbox.base import BaseToolboxModule
+
+
+def test_module_without_entry_point_is_rejected():
+    """ A module implementing none of the entry points fails when the class is defined """
+
+    with pytest.raises(TypeError, match="must implement run"):
+        class ToolboxModule(BaseToolboxModule): # pylint: disable=abstract-method,unused-variable
+            HELP = "no entry point"
+
+
+def test_any_entry_point_is_enough():
+    """ run_async, iter_records or run_incremental replace run """
+
+    class Streaming(BaseToolboxModule): # pylint: disable=abstract-method
+        def iter_records(self, run_data=None):
+            yield from range(3)
+
+    class Intermediate(BaseToolboxModule, abc.ABC): # pylint: disable=abstract-method
+        HELP = "base of other modules"
+
+    class Concrete(Intermediate): # pylint: disable=abstract-method
+        async def run_async(self, run_data=None):
+            return {"ok": True}
+
+    assert Streaming().run() == [0, 1, 2]
+    assert Concrete().run() == {"ok": True}
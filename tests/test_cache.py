@@ -0,0 +1,285 @@
+import asyncio
+import os
+import pickle
+import threading
+import time
+
+import pytest
+
+from toolbox.web.cache import (CacheEntry, LocalRedis, MemoryCacheBackend, RedisCacheBackend, ResultCache, SingleFlight,
+                                 SQLiteCacheBackend, create_backend)
+
+
+@pytest.fixture(name="redis_backend")
+def fixture_redis_backend():
+    """ Redis backend with the in-process LocalRedis client """
+
+    return RedisCacheBackend(client=LocalRedis(), prefix="test:")
+
+
+def test_local_redis_get_set_delete(redis_backend):
+    """ Entries are stored, read and deleted """
+
+    entry = CacheEntry({"rows": [1, 2, 3]}, time.time())
+    redis_backend.set("a", entry, 60)
+
+    assert redis_backend.get("a") == entry
+    assert redis_backend.get("b") is None
+
+    redis_backend.delete("a")
+    assert redis_backend.get("a") is None
+
+
+def test_local_redis_ttl(redis_backend):
+    """ Entries expire after their TTL """
+
+    redis_backend.set("a", CacheEntry(1, time.time()), 0.05)
+    assert redis_backend.get("a") is not None
+
+    time.sleep(0.1)
+    assert redis_backend.get("a") is None
+
+
+def test_local_redis_clear_keeps_other_prefixes():
+    """ clear only removes the keys of its own prefix """
+
+    client = LocalRedis()
+    ours, theirs = RedisCacheBackend(client=client, prefix="ours:"), RedisCacheBackend(client=client, prefix="theirs:")
+    ours.set("a", CacheEntry(1, time.time()), 60)
+    theirs.set("a", CacheEntry(2, time.time()), 60)
+
+    ours.clear()
+    assert ours.get("a") is None
+    assert theirs.get("a").value == 2
+
+
+def test_create_backend_local_redis():
+    """ The local-redis backend uses LocalRedis """
+
+    backend = create_backend({"backend": "local-redis", "prefix": "x:"})
+    assert isinstance(backend, RedisCacheBackend)
+    assert isinstance(backend.client, LocalRedis)
+
+
+def test_single_flight_coalesces_threads():
+    """ Concurrent callers in threads share a single call """
+
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", compute))) for _ in range(4)]
+    for follower in followers:
+        follower.start()
+    while not all(follower.is_alive() for follower in followers):
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["result"] * 5
+    assert not flight.in_flight("key")
+
+
+def test_single_flight_shares_exceptions():
+    """ All waiting coroutines get the exception of the call """
+
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("key", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [type(result) for result in results] == [RuntimeError] * 3
+
+
+def test_result_cache_coalesces_async_computations():
+    """ Concurrent misses of the same key compute once """
+
+    cache = ResultCache(backend=RedisCacheBackend(client=LocalRedis()))
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": 42}
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute_async("key", compute) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert calls == [1]
+    assert results == [{"value": 42}] * 5
+    assert cache.get("key").value == {"value": 42}
+
+
+def test_single_flight_cancelled_caller_does_not_cancel_others():
+    """ Cancelling the caller that started the call does not cancel the others """
+
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def main():
+        leader = asyncio.create_task(flight.do_async("key", compute))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(flight.do_async("key", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "result"
+    assert calls == [1]
+
+
+def test_memory_backend_compresses_and_decodes_lazily():
+    """ Large values are stored compressed and decoded once on the first read """
+
+    backend = MemoryCacheBackend(max_bytes=10_000_000, compress_min_size=1024)
+    value = [{"host": f"esx{i % 10}", "state": "poweredOn"} for i in range(10_000)]
+    backend.set("a", CacheEntry(value, time.time()), 60)
+
+    stats = backend.stats()
+    assert stats["bytes"] < len(pickle.dumps(value)) / 10
+    assert stats["hot_bytes"] == 0
+
+    assert backend.get("a").value == value
+    assert backend.get("a").value == value
+    assert backend.stats()["decoded"] == 1
+
+
+def test_memory_backend_counts_decoded_values_against_max_bytes():
+    """ Decoded values count against max_bytes at their pickled size """
+
+    max_bytes = 2_000_000
+    backend = MemoryCacheBackend(max_bytes=max_bytes, compress_min_size=1024, hot_bytes=max_bytes)
+    for i in range(10):
+        # ~1 MB gepickelt, komprimiert nur wenige KB
+        backend.set(f"k{i}", CacheEntry("x" * 1_000_000 + str(i), time.time()), 60)
+        backend.get(f"k{i}")
+
+        stats = backend.stats()
+        assert stats["bytes"] + stats["hot_bytes"] <= max_bytes
+    assert backend.stats()["hot_bytes"] >= 1_000_000
+
+
+def test_memory_backend_evicts_one_off_entries_first():
+    """ Entries read again survive a burst of one-off entries """
+
+    backend = MemoryCacheBackend(max_bytes=100_000, compress_min_size=10**9, hot_bytes=0)
+    backend.set("popular", CacheEntry(os.urandom(20_000), time.time()), 60)
+    assert backend.get("popular") is not None
+
+    for i in range(10):
+        backend.set(f"once{i}", CacheEntry(os.urandom(20_000), time.time()), 60)
+        assert backend.stats()["bytes"] <= 100_000
+
+    assert backend.get("popular") is not None
+    assert backend.get("once0") is None
+    assert backend.stats()["evictions"] >= 6
+
+
+def test_memory_backend_rejects_large_items_and_expires():
+    """ Entries above max_item_size are not stored, expired ones are dropped """
+
+    backend = MemoryCacheBackend(max_bytes=100_000, max_item_size=10_000, compress_min_size=10**9)
+    backend.set("large", CacheEntry(os.urandom(20_000), time.time()), 60)
+    assert backend.get("large") is None
+
+    backend.set("short", CacheEntry(1, time.time()), 0.05)
+    time.sleep(0.1)
+    assert backend.get("short") is None
+    assert backend.stats()["entries"] == 0
+
+
+def test_result_cache_configure_applies_memory_options():
+    """ Memory options are applied without an explicit backend """
+
+    cache = ResultCache()
+    cache.configure({"max_bytes": 1000, "compression": "zlib", "hot_bytes": 100})
+
+    assert isinstance(cache.backend, MemoryCacheBackend)
+    assert cache.backend.max_bytes == 1000
+    assert cache.backend.hot_bytes == 100
+
+
+@pytest.fixture(name="sqlite_backend")
+def fixture_sqlite_backend(tmp_path):
+    """ SQLite backend in tmp_path """
+
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite"), maxsize=3)
+    yield backend
+    backend.close()
+
+
+def test_sqlite_backend_get_set_delete_clear(sqlite_backend):
+    """ Entries are stored, read, deleted and cleared """
+
+    entry = CacheEntry({"rows": [1, 2, 3]}, time.time())
+    sqlite_backend.set("a", entry, 60)
+    sqlite_backend.set("b", entry, 60)
+    assert sqlite_backend.get("a") == entry
+
+    sqlite_backend.delete("a")
+    assert sqlite_backend.get("a") is None
+
+    sqlite_backend.clear()
+    assert sqlite_backend.get("b") is None
+
+
+def test_sqlite_backend_expires_entries(sqlite_backend):
+    """ Expired entries are not returned """
+
+    sqlite_backend.set("a", CacheEntry(1, time.time()), 0.05)
+    time.sleep(0.1)
+    assert sqlite_backend.get("a") is None
+
+
+def test_sqlite_backend_evicts_least_recently_used(sqlite_backend):
+    """ Above maxsize the least recently used entries are evicted """
+
+    sqlite_backend.touch_interval = 0
+    for key in ("a", "b", "c"):
+        sqlite_backend.set(key, CacheEntry(key, time.time()), 60)
+        time.sleep(0.01)
+    assert sqlite_backend.get("a") is not None
+    sqlite_backend.set("d", CacheEntry("d", time.time()), 60)
+
+    assert sqlite_backend.get("b") is None
+    assert [sqlite_backend.get(key).value for key in ("a", "c", "d")] == ["a", "c", "d"]
+
+
+def test_sqlite_backend_hits_do_not_write(sqlite_backend):
+    """ Hits within touch_interval leave the access time alone """
+
+    sqlite_backend.set("a", CacheEntry(1, time.time()), 60)
+    conn = sqlite_backend._connection() # pylint: disable=protected-access
+    accessed = conn.execute("SELECT accessed FROM cache WHERE key = 'a'").fetchone()[0]
+    changes = conn.total_changes
+    for _ in range(5):
+        assert sqlite_backend.get("a") is not None
+
+    assert conn.total_changes == changes
+    assert conn.execute("SELECT accessed FROM cache WHERE key = 'a'").fetchone()[0] == accessed
@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from toolbox.daemon import ToolboxDaemon, run_client
+from toolbox.paths import config_path
+
+
+def _serve(config_file: str, socket_path: str) -> None:
+    ToolboxDaemon(config_file, socket_path=socket_path).serve_forever()
+
+
+@pytest.fixture(name="socket_path")
+def fixture_socket_path(config_file, tmp_path):
+    """ Socket of a daemon started with config_file in a forked process """
+
+    path = str(tmp_path / "toolbox.sock")
+    process = multiprocessing.get_context("fork").Process(target=_serve, args=(config_file, path), daemon=True)
+    process.start()
+    deadline = time.time() + 10
+    while not os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.05)
+    yield path
+    process.terminate()
+    process.join()
+
+
+def _request(command: str, config_file: str, **extra) -> dict:
+    return {"command": command, "arguments": [], "output": "-", "config": config_path(config_file), **extra}
+
+
+def test_daemon_runs_module(socket_path, config_file, capsys):
+    """ The output of a run in the daemon arrives on stdout """
+
+    assert run_client(socket_path, _request("testing.numbers", config_file, arguments=["-n", "2"])) == 0
+    assert "i: 1" in capsys.readouterr().out
+
+
+def test_daemon_keeps_exit_codes_of_subprocesses(socket_path, config_file, capsys):
+    """ subprocess.run in a daemon run sees the exit code of the child, as in a local run """
+
+    assert run_client(socket_path, _request("testing.subprocess_false", config_file)) == 1
+    assert "CalledProcessError" in capsys.readouterr().err
+
+
+def test_daemon_survives_unknown_packages(socket_path, config_file):
+    """ A request for a package that does not exist does not stop the daemon """
+
+    run_client(socket_path, _request("nope.module", config_file))
+    assert run_client(socket_path, _request("testing.numbers", config_file)) == 0
+
+
+def test_daemon_refuses_other_configs(socket_path, tmp_path):
+    """ Clients with another config, also the default one (no -c), run locally """
+
+    assert run_client(socket_path, {**_request("testing.numbers", None)}) is None
+    assert run_client(socket_path, {**_request("testing.numbers", str(tmp_path / "other.yaml"))}) is None
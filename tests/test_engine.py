@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from toolbox.engine import ExecutionEngine, ExecutionTimeout
+
+
+def test_timed_out_thread_keeps_its_slot():
+    """ A thread past its timeout holds the module slot until it really ends """
+
+    engine = ExecutionEngine({"workers": 2, "modules": {"slow": {"max_concurrency": 1, "timeout": 0.05}}})
+    release = threading.Event()
+    try:
+        first = engine.submit("slow", release.wait, 5)
+        with pytest.raises(ExecutionTimeout):
+            first.result(5)
+
+        second = engine.submit("slow", lambda: "done")
+        assert engine.stats()["slow"] == {"running": 1, "queued": 1}
+        assert not second.done()
+
+        release.set()
+        assert second.result(5) == "done"
+        assert engine.stats()["slow"] == {"running": 0, "queued": 0}
+    finally:
+        release.set()
+        engine.shutdown()
+
+
+def test_shutdown_resolves_queued_runs():
+    """ Runs cancelled or still queued at shutdown are resolved instead of hanging """
+
+    engine = ExecutionEngine({"workers": 1, "modules": {"mod": {"max_concurrency": 2}}})
+    release = threading.Event()
+    try:
+        running = engine.submit("mod", release.wait, 5)
+        in_pool = engine.submit("mod", lambda: "never")
+        waiting = engine.submit("mod", lambda: "never")
+
+        engine.shutdown()
+        assert in_pool.cancelled()
+        assert waiting.cancelled()
+        with pytest.raises(RuntimeError):
+            engine.submit("mod", lambda: "never").result(5)
+
+        release.set()
+        assert running.result(5) is True
+        assert engine.stats()["mod"] == {"running": 0, "queued": 0}
+    finally:
+        release.set()
@@ -0,0 +1,30 @@
+import yaml
+
+from toolbox import formats
+
+
+class Host: # pylint: disable=too-few-public-methods
+    """ Object without a standard YAML tag """
+
+    def __init__(self, name):
+        self.name = name
+
+
+def test_yaml_dump_keeps_python_tags():
+    """ Sets, tuples and objects are written as by yaml.dump """
+
+    data = {"tags": {"a"}, "pair": (1, 2), "host": Host("esx1"), "name": "vm1"}
+
+    assert formats.yaml_dump(data) == yaml.dump(data, allow_unicode=True, default_flow_style=False)
+    assert "!!set" in formats.yaml_dump(data)
+    assert "!!python/object:test_formats.Host" in formats.yaml_dump(data)
+
+
+def test_yaml_dump_safe_writes_unknown_objects_as_strings():
+    """ With safe the output can be read by safe loaders """
+
+    data = {"tags": ("a", "b"), "host": Host("esx1")}
+
+    loaded = formats.yaml_load(formats.yaml_dump(data, safe=True))
+    assert loaded["tags"] == ["a", "b"]
+    assert loaded["host"].startswith("<test_formats.Host object")
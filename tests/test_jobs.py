@@ -0,0 +1,41 @@
+import pytest
+
+from toolbox.web.jobs import Job, JobStore
+
+
+@pytest.fixture(name="store")
+def fixture_store(tmp_path):
+    """ Job database in tmp_path """
+
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    yield store
+    store.close()
+
+
+def test_job_is_claimed_by_one_owner(store):
+    """ Only the first owner claims a queued job, a claimed job can't be cancelled as queued """
+
+    store.save(Job("job1", "reports", "vms", {"limit": "WIN"}))
+
+    assert store.claim("job1", "worker-a", lease=160, started=100)
+    assert not store.claim("job1", "worker-b", lease=160, started=101)
+    assert not store.cancel_queued("job1", finished=102)
+    assert store.get("job1").status == "running"
+    assert store.pending() == []
+
+
+def test_only_expired_leases_are_requeued(store):
+    """ Running jobs are queued again once their lease expired, or all jobs of an owner """
+
+    for job_id in ("job1", "job2"):
+        store.save(Job(job_id, "reports", "vms", {}))
+    store.claim("job1", "worker-a", lease=160, started=100)
+    store.claim("job2", "worker-b", lease=160, started=100)
+
+    store.renew("worker-a", lease=260)
+    assert store.requeue(now=200) == ["job2"]
+    assert [job.id for job in store.pending()] == ["job2"]
+
+    assert store.requeue(now=200, owner="worker-a") == ["job1"]
+    job = store.get("job1")
+    assert (job.status, job.started) == ("queued", None)
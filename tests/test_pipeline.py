@@ -0,0 +1,27 @@
+import pytest
+
+from toolbox.pipeline import Pipeline, PipelineError
+
+
+def test_pipeline_passes_outputs_to_the_steps_that_need_them(tb):
+    """ Steps get the outputs of the steps they need, the output step is returned under the pipeline name """
+
+    definition = {
+        "steps": {
+            "two": {"module": "testing.numbers", "arguments": {"count": 2}},
+            "three": {"module": "testing.numbers", "arguments": ["-n", "3"]},
+            "total": {"module": "testing.total", "needs": ["two", "three"]},
+        },
+        "output": "total",
+    }
+
+    assert tb.run_pipeline(definition) == {"pipeline": {"two": 2, "three": 3}}
+
+
+def test_pipeline_rejects_cycles_and_unknown_steps(tb):
+    """ Invalid definitions fail before anything runs """
+
+    with pytest.raises(PipelineError, match="cycle"):
+        Pipeline(tb, {"steps": {"a": {"module": "testing.total", "needs": ["b"]}, "b": {"module": "testing.total", "needs": ["a"]}}})
+    with pytest.raises(PipelineError, match="unknown step"):
+        Pipeline(tb, {"steps": {"a": {"module": "testing.numbers"}}, "output": "b"})
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import pytest
+
+from toolbox.web.prewarm import CronSchedule
+
+
+def test_cron_next_matches_weekdays_and_times():
+    """ The next run is the first matching minute after the given time """
+
+    schedule = CronSchedule("30 6 * * 1-5")
+    # Samstag, 17.10.2026
+    assert schedule.next(datetime(2026, 10, 17, 7, 0)) == datetime(2026, 10, 19, 6, 30)
+    assert schedule.next(datetime(2026, 10, 19, 6, 29, 59)) == datetime(2026, 10, 19, 6, 30)
+    assert CronSchedule("*/15 * * * *").next(datetime(2026, 10, 17, 7, 14)) == datetime(2026, 10, 17, 7, 15)
+    assert CronSchedule("@monthly").next(datetime(2026, 12, 31, 23, 59)) == datetime(2027, 1, 1, 0, 0)
+
+
+def test_cron_restricted_day_fields_match_either():
+    """ As in cron a day matches the day of month or the day of week if both are restricted """
+
+    # 13. des Monats oder Freitag (7: Sonntag wie 0)
+    assert CronSchedule("0 0 13 * 5").next(datetime(2026, 10, 10, 12, 0)) == datetime(2026, 10, 13, 0, 0)
+    assert CronSchedule("0 0 13 * 5").next(datetime(2026, 10, 13, 12, 0)) == datetime(2026, 10, 16, 0, 0)
+    assert CronSchedule("0 0 * * 7").next(datetime(2026, 10, 17, 12, 0)) == datetime(2026, 10, 18, 0, 0)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "0 0 31 2 *", "5-1 * * * *", "x * * * *"])
+def test_cron_rejects_invalid_expressions(expression):
+    """ Wrong field counts, values out of range and expressions that never match raise ValueError """
+
+    with pytest.raises(ValueError):
+        CronSchedule(expression).next(datetime(2026, 10, 17))
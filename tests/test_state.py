@@ -0,0 +1,18 @@
+def test_incremental_runs_merge_changes_into_the_snapshot(tb):
+    """ Later runs get the stored cursor, their changes are merged into the previous snapshot """
+
+    assert tb.run("testing.changes", []) == {"testing.changes": [{"id": 1, "name": "esx1"}, {"id": 2, "name": "esx2"}]}
+    assert tb.run("testing.changes", []) == {"testing.changes": [{"id": 2, "name": "esx2-new"}, {"id": 3, "name": "esx3"}]}
+
+    module = tb.init_module(tb.load_module("testing.changes"), [])
+    state = tb.state_store.load("testing.changes", module.cache_key(module.args, tb.config))
+    assert state["cursor"] == 2
+
+
+def test_full_run_starts_over(tb):
+    """ With full the module gets no cursor and its output replaces the snapshot """
+
+    tb.run("testing.changes", [])
+    tb.run("testing.changes", [])
+
+    assert tb.run("testing.changes", [], full=True) == {"testing.changes": [{"id": 1, "name": "esx1"}, {"id": 2, "name": "esx2"}]}
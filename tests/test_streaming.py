@@ -0,0 +1,41 @@
+import io
+
+import pytest
+
+from toolbox import formats
+
+
+@pytest.mark.parametrize("count", [0, 1, 3])
+def test_streamed_yaml_matches_a_complete_run(tb, tmp_path, count):
+    """ Streamed YAML is the same document as the output of a complete run """
+
+    path = tmp_path / "records.yaml"
+    assert tb.run("testing.records", ["-n", str(count)], output=str(path)) == {"testing.records": count}
+
+    complete = tb.run("testing.records", ["-n", str(count)])
+    assert path.read_text(encoding="utf-8") == formats.dumps(complete)
+    assert formats.load(str(path)) == complete
+
+
+def test_streamed_yaml_can_be_summed_up(tb, tmp_path, monkeypatch):
+    """ The streamed output can be passed on with --summation like any other output """
+
+    path = tmp_path / "records.yaml"
+    tb.run("testing.records", ["-n", "2"], output=str(path))
+    monkeypatch.setattr("sys.stdin", io.StringIO(path.read_text(encoding="utf-8")))
+
+    output = tb.run("testing.numbers", ["-n", "1"], summation=True)
+    assert output == {"testing.records": [{"i": 0, "tags": ["a", "b"]}, {"i": 1, "tags": ["a", "b"]}], "testing.numbers": [{"i": 0}]}
+
+
+@pytest.mark.parametrize("suffix", [".ndjson", ".msgpack"])
+def test_record_streams_load_as_list(tb, tmp_path, monkeypatch, suffix):
+    """ NDJSON and MessagePack record streams are read as list, --summation rejects them """
+
+    path = tmp_path / f"records{suffix}"
+    tb.run("testing.records", ["-n", "2"], output=str(path))
+
+    assert formats.load(str(path)) == [{"i": 0, "tags": ["a", "b"]}, {"i": 1, "tags": ["a", "b"]}]
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(path.read_bytes()), encoding="utf-8"))
+    with pytest.raises(ValueError, match="summation"):
+        tb.run("testing.numbers", [], summation=True, format=suffix[1:])
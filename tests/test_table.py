@@ -0,0 +1,26 @@
+from toolbox.web.table import ResultTable
+
+ROWS = [{"name": f"vm{i}", "cpus": i % 4, "host": "esx1" if i % 2 else "esx2"} for i in range(25)]
+
+
+def test_page_returns_a_window_of_the_rows():
+    """ Offset and limit select a window, total counts all rows """
+
+    page = ResultTable(ROWS).page(offset=20, limit=10)
+
+    assert page["columns"] == ["name", "cpus", "host"]
+    assert (page["total"], page["filtered"], page["offset"]) == (25, 25, 20)
+    assert [row[0] for row in page["rows"]] == ["vm20", "vm21", "vm22", "vm23", "vm24"]
+
+
+def test_page_sorts_and_filters_before_paging():
+    """ Sorting is numeric for numbers, the filter applies before offset and limit """
+
+    table = ResultTable(ROWS)
+
+    page = table.page(limit=3, sort="cpus", descending=True)
+    assert [row[1] for row in page["rows"]] == [3, 3, 3]
+
+    page = table.page(offset=1, limit=2, sort="name", query="ESX1")
+    assert page["filtered"] == 12
+    assert [row[0] for row in page["rows"]] == ["vm11", "vm13"]
@@ -0,0 +1,22 @@
+import pytest
+import yaml
+
+
+def test_run_many_collects_outputs_and_errors(tb, tmp_path):
+    """ Every argument set runs with the same input, failed runs contain an error """
+
+    path = tmp_path / "input.yaml"
+    path.write_text(yaml.safe_dump({"hosts": [1, 2, 3]}), encoding="utf-8")
+
+    output = tb.run_many("testing.total", [{"minimum": 1}, ["-m", "5"]], input=str(path))
+    assert output == {"testing.total": [
+        {"arguments": {"minimum": 1}, "output": {"hosts": 3}},
+        {"arguments": {"minimum": 5}, "error": "ValueError: fewer than 5 records"},
+    ]}
+
+
+def test_run_many_validates_all_arguments_first(tb):
+    """ Invalid arguments fail the batch before anything runs """
+
+    with pytest.raises(ValueError, match="batch item 1"):
+        tb.run_many("testing.numbers", [{"count": 1}, {"count": "many"}])
@@ -0,0 +1,45 @@
+import pytest
+import yaml
+from fastapi.testclient import TestClient
+
+from toolbox import web
+from toolbox.toolbox import Toolbox
+
+
+@pytest.fixture(name="client")
+def fixture_client(config_file, tmp_path, monkeypatch):
+    """ Web app with the test modules as tools of the group "testing" """
+
+    with open(config_file, encoding="utf-8") as fh:
+        config = yaml.safe_load(fh)
+    config["web"] = {
+        "groups": {"testing": {"tools": {"numbers": {"module": "testing.numbers"}}}},
+        "jobs": {"path": str(tmp_path / "jobs.sqlite")},
+    }
+    with open(config_file, "w", encoding="utf-8") as fh:
+        yaml.safe_dump(config, fh)
+
+    monkeypatch.setattr(web, "tb", Toolbox(config_file))
+    with TestClient(web.app) as client:
+        yield client
+
+
+def test_artifacts_are_compressed_and_revalidated(client):
+    """ Text artifacts are gzipped on request, a matching If-None-Match gets 304 """
+
+    response = client.get("/testing/numbers/raw/json?count=200", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-json-gz"')
+    assert response.json() == [{"i": i} for i in range(200)]
+
+    plain = client.get("/testing/numbers/raw/json?count=200", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] == response.headers["etag"].replace("-gz", "")
+    assert plain.json() == response.json()
+
+    # Beide Varianten gelten als aktuell, auch als schwaches ETag
+    for etag in (response.headers["etag"], f"W/{plain.headers['etag']}"):
+        revalidated = client.get("/testing/numbers/raw/json?count=200", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
@@ -1 +1,6 @@
-from .toolbox import Toolbox
+def __getattr__(name):
+    # Lazy Export: "import toolbox" soll keine Abhängigkeiten (pydantic, yaml) laden
+    if name == "Toolbox":
+        from .toolbox import Toolbox # pylint: disable=import-outside-toplevel
+        return Toolbox
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
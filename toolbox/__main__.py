@@ -1,8 +1,7 @@
 import argparse
 import os
-from toolbox import Toolbox
 
-def main():
+def main(): # pylint: disable=too-many-branches,too-many-statements
     """
     Entry point for the toolbox application.
 
@@ -12,9 +11,14 @@ def main():
 
     Command-line arguments:
     - -c, --config <file>: Path to the config.yml file (optional).
-    - -i, --input <file>: YAML input for the module (optional).
+    - -i, --input <file>: YAML, JSON or MessagePack input for the module (optional).
     - -o, --output <file>: Path to store module output (optional, default is "-").
+    - -f, --format <format>: Format yaml, json, ndjson or msgpack of the output and stdin (optional, default from the file extension).
     - -v, --verbose: Enable verbose mode (optional, default is False).
+    - -s, --socket <path>: Run the command in a toolbox daemon listening on this socket (optional).
+    - -b, --batch <file>: Run the module once per argument set listed in this file (optional).
+    - --full: Incremental modules fetch everything instead of the changes since their last run (optional).
+    - --stats: Print run, parse, serialization and cache metrics to stderr after the run (optional).
     - command: Mode or module name to run.
     - arguments: Additional arguments for the selected mode/module.
 
@@ -27,12 +31,32 @@ def main():
     parser = argparse.ArgumentParser(prog="toolbox", add_help=True)
     parser.add_argument("-c", "--config", metavar="<file>", help="Path to config.yml", required=False)
     parser.add_argument("--port", metavar="<port>", help="Port for Webapp", required=False)
-    parser.add_argument("-i", "--input", metavar="<file>", help="YAML-Input for module", required=False)
+    parser.add_argument("-i", "--input", metavar="<file>", help="Input for module (YAML, JSON or MessagePack)", required=False)
     parser.add_argument("-x", "--summation", action="store_true", default=False, help="summation of input modules", required=False)
     parser.add_argument(
         "-o", "--output", metavar="<file>", help="Path to store module output", required=False, default="-"
     )
+    parser.add_argument(
+        "-f", "--format", metavar="<format>", choices=["yaml", "json", "ndjson", "msgpack"], required=False,
+        help="Format of output and stdin: yaml, json, ndjson or msgpack (default: from the file extension or yaml)"
+    )
+    parser.add_argument(
+        "-b", "--batch", metavar="<file>", required=False,
+        help="YAML/JSON list of argument sets (lists or dicts), the module runs once per set"
+    )
+    parser.add_argument(
+        "--full", action="store_true", default=False, required=False,
+        help="Incremental modules fetch everything instead of only the changes since their last run"
+    )
+    parser.add_argument(
+        "--stats", action="store_true", default=False, required=False,
+        help="Print run, parse, serialization and cache metrics to stderr after the run"
+    )
     parser.add_argument("-v", "--verbose", help="Verbose Mode", required=False, action="store_true", default=False)
+    parser.add_argument(
+        "-s", "--socket", metavar="<path>", help="Unix socket of a toolbox daemon (default: $TOOLBOX_SOCKET)", required=False,
+        default=os.environ.get("TOOLBOX_SOCKET")
+    )
 
     parser.add_argument("command", help="Mode or module name")
     parser.add_argument("arguments", nargs=argparse.REMAINDER, help="Additional arguments for the selected mode/module")
@@ -62,13 +86,92 @@ def main():
         from pylint.lint import Run #pylint: disable=import-outside-toplevel
         Run(['toolbox', '--exit-zero'], exit=False)
 
+        print("Checking import-time budget")
+        from toolbox import importtime #pylint: disable=import-outside-toplevel
+        if importtime.main(args.arguments):
+            raise SystemExit(1)
+
         #print("Running pytest")
         #import unittest
         #tests = unittest.TestLoader().discover('tests')
         #result = unittest.TextTestRunner(verbosity=2).run(tests)
+    elif args.command == "bench":
+        from toolbox import bench #pylint: disable=import-outside-toplevel
+        raise SystemExit(bench.main(args.arguments))
+    elif args.command == "pipeline":
+        from toolbox.toolbox import Toolbox #pylint: disable=import-outside-toplevel
+        if len(args.arguments) != 1:
+            parser.error("pipeline needs exactly one definition file")
+        tb = Toolbox(args.config, args.verbose)
+        try:
+            tb.run_pipeline(args.arguments[0], args.input, args.output, args.summation, args.format)
+        finally:
+            tb.close()
+            if args.stats:
+                print_stats()
+    elif args.command == "daemon":
+        from toolbox.daemon import ToolboxDaemon #pylint: disable=import-outside-toplevel
+        daemon = ToolboxDaemon(args.config, args.verbose, args.socket)
+        daemon.preload(args.arguments)
+        daemon.serve_forever()
     else:
+        # Metriken entstehen im ausführenden Prozess, mit --stats daher lokal ausführen
+        if args.socket and not args.batch and not args.stats:
+            from toolbox.daemon import run_client #pylint: disable=import-outside-toplevel
+            from toolbox.paths import config_path #pylint: disable=import-outside-toplevel
+            code = run_client(args.socket, {
+                "command": args.command,
+                "arguments": args.arguments,
+                "input": args.input,
+                "output": args.output,
+                "summation": args.summation,
+                "format": args.format,
+                "full": args.full,
+                "verbose": args.verbose,
+                "config": config_path(args.config),
+            })
+            if code is not None:
+                raise SystemExit(code)
+
+        from toolbox.toolbox import Toolbox #pylint: disable=import-outside-toplevel
         tb = Toolbox(args.config, args.verbose)
-        tb.run(args.command, args.arguments, args.input, args.output, args.summation)
+        try:
+            if args.batch:
+                run_batch(parser, tb, args)
+            else:
+                tb.run(args.command, args.arguments, args.input, args.output, args.summation, args.format, args.full)
+        finally:
+            tb.close()
+            if args.stats:
+                print_stats()
+
+def run_batch(parser: argparse.ArgumentParser, tb, args: argparse.Namespace) -> None:
+    """ Runs the module of the command once per argument set of the batch file """
+
+    from toolbox import formats #pylint: disable=import-outside-toplevel
+
+    items = formats.load(args.batch)
+    if not isinstance(items, list):
+        parser.error(f"{args.batch} must contain a list of argument sets")
+
+    arguments_list = []
+    for item in items:
+        if isinstance(item, dict) and args.arguments:
+            parser.error("additional arguments can only be combined with argument lists, not dicts")
+        # Gemeinsame Argumente der Kommandozeile vor jeden Satz stellen
+        arguments_list.append(args.arguments + [str(value) for value in item] if isinstance(item, list) else item)
+
+    tb.run_many(args.command, arguments_list, args.input, args.output, args.summation, args.format, full=args.full)
+
+def print_stats() -> None:
+    """ Prints the metrics of this process to stderr, so they don't mix with the output """
+
+    import sys #pylint: disable=import-outside-toplevel
+    from toolbox import metrics #pylint: disable=import-outside-toplevel
+
+    print("--- toolbox stats ---", file=sys.stderr)
+    for line in metrics.registry.summary():
+        print(line, file=sys.stderr)
 
 if __name__ == "__main__":
     main()
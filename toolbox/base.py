@@ -1,12 +1,17 @@
 import argparse
+import hashlib
+import json
 import logging
+import sys
 from logging import Logger
-from typing import Any, List, Optional, Type, Dict
+from typing import Any, Iterator, List, NamedTuple, Optional, Sequence, Type, Dict
 import abc
 
 
 from pydantic import BaseModel, Field
 
+from toolbox.resources import ResourceLease, ResourceRegistry
+
 class ConfigModel(BaseModel):
     """
     Pydantic model for configuration.
@@ -43,6 +48,17 @@ class ConfigModel(BaseModel):
             deprecated=deprecated,
         )
 
+class Changes(NamedTuple):
+    """
+    Result of run_incremental: the records changed since the cursor, the keys of deleted
+    records and the cursor for the next run. ``full`` marks records as complete snapshot,
+    e.g. if the source no longer knows the old cursor.
+    """
+    records: List[Any]
+    cursor: Any
+    deleted: Sequence[Any] = ()
+    full: bool = False
+
 class BaseToolboxModule(abc.ABC):
     """
     Abstract base class for all Toolbox Modules.
@@ -51,6 +67,33 @@ class BaseToolboxModule(abc.ABC):
 
     OUTPUT_HTML_JINJA2: Optional[str] = None
 
+    # Version des Moduls, fließt in den Cache-Key ein (Fallback: __version__ des Python-Moduls)
+    VERSION: Optional[str] = None
+
+    # Cache-Policy für die Web-App
+    CACHEABLE: bool = True  # False: Ergebnis wird nie gecacht
+    CACHE_TTL: Optional[float] = None  # Sekunden, None: Default aus der Web-Config
+    CACHE_IGNORE_ARGS: tuple[str, ...] = ()  # Argumente, die das Ergebnis nicht beeinflussen
+    CONFIG_SECTIONS: Optional[tuple[str, ...]] = None  # relevante Config-Sektionen, None: alle außer "web"
+
+    # True: run_data von -i/--input ist ein Iterator über die Records statt des vollständig geladenen Dokuments
+    STREAM_INPUT: bool = False
+
+    # Inkrementelle Läufe: Feld, das einen Datensatz identifiziert (für merge_changes)
+    INCREMENTAL_KEY: Optional[str] = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        """
+        Rejects a module without an entry point when it is defined.
+        Intermediate base classes, which derive from abc.ABC directly, are not checked.
+        """
+
+        super().__init_subclass__(**kwargs)
+        if abc.ABC in cls.__bases__:
+            return
+        if cls.run is BaseToolboxModule.run and not (cls.has_async_run() or cls.has_iter_records() or cls.has_incremental_run()):
+            raise TypeError(f"{cls.__qualname__} must implement run, run_async, iter_records or run_incremental")
+
     @staticmethod
     def flat_output(output_data: Dict[str, Any]) -> List[Dict[str, str]]: # pylint: disable=unused-argument
         """ Flat the output of the module """
@@ -68,6 +111,39 @@ class BaseToolboxModule(abc.ABC):
         Pydantic model for CLI arguments.
         """
 
+    @classmethod
+    def version(cls) -> str:
+        """ Version of the module, used to invalidate cached results after an update """
+
+        if cls.VERSION is not None:
+            return cls.VERSION
+        return str(getattr(sys.modules.get(cls.__module__), "__version__", ""))
+
+    @classmethod
+    def config_fingerprint(cls, config: dict[str, Any]) -> str:
+        """ Hash of the config sections relevant for this module """
+
+        sections = cls.CONFIG_SECTIONS
+        if sections is None:
+            sections = tuple(section for section in config if section != "web")
+        relevant = {section: config.get(section) for section in sections}
+        return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def cache_key(cls, args: ConfigModel, config: Optional[dict[str, Any]] = None) -> str:
+        """
+        Canonical cache key for a run: the validated and normalized arguments without
+        CACHE_IGNORE_ARGS, the module and its version and the relevant config, hashed.
+        """
+
+        key_data = {
+            "module": f"{cls.__module__}.{cls.__qualname__}",
+            "version": cls.version(),
+            "args": args.model_dump(mode="json", exclude=set(cls.CACHE_IGNORE_ARGS)),
+            "config": cls.config_fingerprint(config or {}),
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
     @classmethod
     def update_parser(cls, parser: argparse.ArgumentParser) -> None:
         """
@@ -123,6 +199,7 @@ class BaseToolboxModule(abc.ABC):
         args: dict | ConfigModel | None = None,
         config: Optional[dict[str, Any]] = None,
         logger: Optional[Logger] = None,
+        resources: Optional[ResourceLease] = None,
     ):
         if args is None:
             self.args = self.__class__.Arguments()  # Default-Werte verwenden
@@ -135,12 +212,107 @@ class BaseToolboxModule(abc.ABC):
 
         self.config: dict[str, Any] = config or {}
         self.logger: Logger = logger or logging.getLogger(self.__class__.__name__)
+        # Ohne Toolbox (z. B. direkt instanziiert) eigene Clients ohne Pool
+        self.resources: ResourceLease = resources or ResourceRegistry(self.config, detached=True).lease()
 
         self.logger.debug(f"Initializing {self.__class__.__name__} module")
 
-    @abc.abstractmethod
+    @classmethod
+    def has_async_run(cls) -> bool:
+        """ check if module implements run_async """
+
+        return cls.run_async is not BaseToolboxModule.run_async
+
+    @classmethod
+    def has_iter_records(cls) -> bool:
+        """ check if module streams its output with iter_records """
+
+        return cls.iter_records is not BaseToolboxModule.iter_records
+
+    @classmethod
+    def has_incremental_run(cls) -> bool:
+        """ check if module implements run_incremental """
+
+        return cls.run_incremental is not BaseToolboxModule.run_incremental
+
+    def progress(self, done: float, total: Optional[float] = None, message: Optional[str] = None) -> None:
+        """
+        Reports the progress of a long run, e.g. self.progress(i, len(hosts), host).
+        Logged with the module's logger, background jobs of the web app show it as progress bar.
+        """
+
+        text = f"{done}/{total}" if total else f"{done}"
+        self.logger.info(f"{text} {message}" if message else text, extra={"progress": {"done": done, "total": total}})
+
+    def run_incremental(self, run_data: Optional[dict[str, Any]], cursor: Any) -> Changes: # pylint: disable=unused-argument
+        """
+        Optional incremental variant of run: returns only the records changed since ``cursor``
+        (None: no previous run, return all records) and the cursor for the next run, e.g. a timestamp
+        or change number of the source. The toolbox stores the cursor and the merged snapshot per
+        argument set and returns the snapshot, so the output stays the same as of a full run.
+        Cursor and records must be JSON serializable.
+
+        The default returns the output of a full run as complete snapshot.
+        """
+
+        return Changes(self.run(run_data), None, full=True)
+
+    @classmethod
+    def merge_changes(cls, snapshot: Optional[Any], changes: Changes) -> Any:
+        """
+        Merges changes into the snapshot of the previous run (None for a full run).
+        The default replaces records with the same INCREMENTAL_KEY in place, appends new records
+        and removes deleted keys. Override it for other output structures.
+        """
+
+        if snapshot is None:
+            return list(changes.records)
+        if cls.INCREMENTAL_KEY is None:
+            raise NotImplementedError("INCREMENTAL_KEY or merge_changes must be implemented for incremental runs!")
+
+        key = cls.INCREMENTAL_KEY
+        changed = {record[key]: record for record in changes.records}
+        deleted = set(changes.deleted)
+        merged = []
+        for record in snapshot:
+            record_key = record[key]
+            if record_key in deleted:
+                continue
+            merged.append(changed.pop(record_key, record))
+        merged.extend(record for record_key, record in changed.items() if record_key not in deleted)
+        return merged
+
+    def iter_records(self, run_data: Optional[dict[str, Any]] = None) -> Iterator[Any]:
+        """
+        Optional streaming variant of run: yields the output records one by one.
+        The CLI writes them incrementally (multi-document YAML or NDJSON), so memory stays flat.
+        """
+
+        yield self.run(run_data)
+
     def run(self, run_data: Optional[dict[str, Any]] = None) -> dict[str, Any]:
         """
         Execute the module's main functionality.
-        Must be implemented in the subclass.
+        Must be implemented in the subclass, unless the subclass implements run_async, iter_records or run_incremental.
         """
+
+        if self.has_async_run():
+            import asyncio # pylint: disable=import-outside-toplevel
+            return asyncio.run(self.run_async(run_data))
+        if self.has_iter_records():
+            return list(self.iter_records(run_data))
+        if self.has_incremental_run():
+            # Ohne Zustand (direkter Aufruf): vollständiger Lauf
+            changes = self.run_incremental(run_data, None)
+            return self.merge_changes(None, changes)
+        raise NotImplementedError("run, run_async, iter_records or run_incremental must be implemented!")
+
+    async def run_async(self, run_data: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+        """
+        Optional asynchronous variant of run for I/O-bound modules.
+        If implemented, the web app awaits it on the event loop and the CLI drives it with an event loop.
+        The default runs the synchronous run in a thread.
+        """
+        import asyncio # pylint: disable=import-outside-toplevel
+
+        return await asyncio.to_thread(self.run, run_data)
@@ -0,0 +1,190 @@
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Median-Laufzeit, ab der ein Benchmark als Regression gilt (0.25 = 25 % langsamer)
+DEFAULT_THRESHOLD = 0.25
+
+BASELINE_VERSION = 1
+
+
+def measure(func: Callable[[], Any], rounds: int = 5, min_time: float = 0.5) -> Dict[str, float]:
+    """
+    Times func: one warm-up call, then ``rounds`` rounds of as many calls as needed for
+    a round to take about min_time / rounds seconds.
+
+    Returns:
+        dict: Seconds per call (min, median, mean, stdev) and the number of rounds and calls per round.
+    """
+
+    start = time.perf_counter()
+    func()
+    warmup = time.perf_counter() - start
+    number = max(1, int(min_time / rounds / max(warmup, 1e-9)))
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "rounds": rounds,
+        "number": number,
+    }
+
+
+def run(suites: Optional[List[str]] = None, patterns: Optional[List[str]] = None, rows: int = 10000, # pylint: disable=too-many-arguments,too-many-positional-arguments
+        modules: int = 200, rounds: int = 5, min_time: float = 0.5, report: Callable[[str], None] = print) -> Dict[str, Any]:
+    """
+    Runs the benchmark suites and returns the results in the baseline format.
+    Suites whose dependencies (e.g. the web extra) are missing are skipped.
+
+    Args:
+        suites: Names of the suites to run, default: all (see toolbox.bench.suites.SUITES).
+        patterns: fnmatch patterns, only matching benchmarks are run.
+        rows: Records of the synthetic module outputs.
+        modules: Modules of the tree used for discovery.
+    """
+
+    from toolbox.bench.suites import SUITES, BenchEnvironment # pylint: disable=import-outside-toplevel
+    from toolbox.release import __version__ # pylint: disable=import-outside-toplevel
+
+    results: Dict[str, Dict[str, float]] = {}
+    with BenchEnvironment(rows=rows, modules=modules) as env:
+        for suite in suites or SUITES:
+            try:
+                for case in SUITES[suite](env):
+                    if patterns and not any(fnmatch.fnmatch(case.name, pattern) for pattern in patterns):
+                        continue
+                    results[case.name] = measure(case.func, rounds, min_time)
+                    report(format_result(case.name, results[case.name]))
+            except ImportError as e:
+                report(f"{suite}: skipped, {e}")
+
+    return {
+        "version": BASELINE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "toolbox": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"rows": rows, "modules": modules, "rounds": rounds, "min_time": min_time},
+        "results": results,
+    }
+
+
+def format_duration(seconds: float) -> str:
+    """ Duration with a readable unit """
+
+    for unit, factor in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= factor:
+            return f"{seconds / factor:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def format_result(name: str, result: Dict[str, float]) -> str:
+    """ One line per benchmark: median, min and spread """
+
+    return (f"{name:<40} {format_duration(result['median']):>10}  min {format_duration(result['min']):>10}  "
+            f"+- {format_duration(result['stdev']):>10}  ({result['rounds']}x{result['number']})")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compares the medians of two result sets.
+
+    Returns:
+        list: One dict per benchmark contained in both: name, baseline, current, ratio and status
+        ("regression" if slower by more than threshold, "improvement" if faster by more than threshold, else "ok").
+    """
+
+    comparison = []
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        ratio = result["median"] / previous["median"] if previous["median"] else float("inf")
+        status = "ok"
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improvement"
+        comparison.append({"name": name, "baseline": previous["median"], "current": result["median"], "ratio": ratio, "status": status})
+    return comparison
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    """ Reads a baseline written with --save """
+
+    with open(path, "r", encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(f"{path} is not a toolbox benchmark baseline (version {BASELINE_VERSION})")
+    return baseline
+
+
+def save_baseline(results: Dict[str, Any], path: str) -> None:
+    """ Writes results as JSON baseline """
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """ Entry point for "toolbox bench", returns 1 if a regression against the baseline was found """
+
+    from toolbox.bench.suites import SUITES # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(prog="toolbox bench", description="Benchmark the run path, module discovery and the web endpoints")
+    parser.add_argument("suites", nargs="*", metavar="suite", help=f"Suites to run: {', '.join(SUITES)} (default: all)")
+    parser.add_argument("-k", "--filter", action="append", metavar="<pattern>", help="Only run benchmarks matching the pattern, e.g. 'web.*'")
+    parser.add_argument("--rows", type=int, default=10000, help="Records of the synthetic module outputs")
+    parser.add_argument("--modules", type=int, default=200, help="Modules of the tree used for discovery")
+    parser.add_argument("--rounds", type=int, default=5, help="Measured rounds per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds measured per benchmark")
+    parser.add_argument("--quick", action="store_true", help="Small inputs and short measurements, e.g. for smoke tests")
+    parser.add_argument("--save", metavar="<file>", help="Write the results as JSON baseline")
+    parser.add_argument("--compare", metavar="<file>", help="Compare the results with a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative slowdown of the median counted as regression")
+    args = parser.parse_args(argv)
+    if unknown := [suite for suite in args.suites if suite not in SUITES]:
+        parser.error(f"unknown suite {', '.join(unknown)}, choose from {', '.join(SUITES)}")
+
+    if args.quick:
+        args.rows, args.modules, args.rounds, args.min_time = min(args.rows, 1000), min(args.modules, 50), 3, 0.1
+
+    baseline = load_baseline(args.compare) if args.compare else None
+    if baseline and baseline.get("parameters", {}).get("rows") != args.rows:
+        print(f"Warning: baseline was measured with {baseline['parameters'].get('rows')} rows, now {args.rows}")
+
+    results = run(args.suites, args.filter, args.rows, args.modules, args.rounds, args.min_time)
+    if args.save:
+        save_baseline(results, args.save)
+        print(f"Baseline written to {args.save}")
+
+    if baseline is None:
+        return 0
+
+    regressions = 0
+    print(f"\nCompared with {args.compare} (threshold {args.threshold:.0%}):")
+    for entry in compare(results, baseline, args.threshold):
+        regressions += entry["status"] == "regression"
+        print(f"{entry['name']:<40} {format_duration(entry['baseline']):>10} -> {format_duration(entry['current']):>10}  "
+              f"{entry['ratio'] - 1:+7.1%}  {entry['status']}")
+    if regressions:
+        print(f"FAIL: {regressions} benchmark(s) slower than the baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
@@ -0,0 +1,139 @@
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+from toolbox.base import BaseToolboxModule
+
+POWER_STATES = ("poweredOn", "poweredOff", "suspended")
+
+
+class SyntheticModule(BaseToolboxModule):
+    """ Base of the benchmark modules: deterministic output of a configurable size """
+
+    HELP: str = "Synthetic benchmark module"
+    VERSION: Optional[str] = "bench"
+
+    class Arguments(BaseToolboxModule.Arguments):
+        size: int = BaseToolboxModule.Arguments.add_argument('-n', '--size', default=1000, help="Number of records")
+        columns: int = BaseToolboxModule.Arguments.add_argument('--columns', default=50, help="Number of columns of wide records")
+        seed: int = BaseToolboxModule.Arguments.add_argument('--seed', default=0, help="Seed of the generated values")
+
+    @staticmethod
+    def flat_output(output_data: Dict[str, Any]) -> List[Dict[str, str]]:
+        return output_data["items"]
+
+    def record(self, rng: random.Random, index: int) -> Dict[str, Any]:
+        """ Returns the record with the given index """
+
+        raise NotImplementedError
+
+    def run(self, run_data: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+        rng = random.Random(self.args.seed)
+        return {"items": [self.record(rng, index) for index in range(self.args.size)]}
+
+
+class RowsModule(SyntheticModule):
+    """ Flat rows like an inventory export """
+
+    HELP: str = "Synthetic benchmark module with flat rows"
+
+    def record(self, rng: random.Random, index: int) -> Dict[str, Any]:
+        return {
+            "id": index,
+            "name": f"vm-{index:06d}",
+            "host": f"esx{rng.randrange(64):02d}.example.org",
+            "cpu": rng.choice((1, 2, 4, 8, 16)),
+            "memory_mb": rng.choice((1024, 2048, 4096, 8192, 16384)),
+            "power_state": rng.choice(POWER_STATES),
+            "notes": f"synthetic record {rng.getrandbits(32):08x}",
+        }
+
+
+class NestedModule(SyntheticModule):
+    """ Nested dicts and lists like raw API objects """
+
+    HELP: str = "Synthetic benchmark module with nested records"
+
+    @staticmethod
+    def flat_output(output_data: Dict[str, Any]) -> List[Dict[str, str]]:
+        return [
+            {
+                "id": item["id"],
+                "name": item["name"],
+                "cpu": item["config"]["hardware"]["cpu"],
+                "memory_mb": item["config"]["hardware"]["memory_mb"],
+                "disks": len(item["config"]["disks"]),
+                "tags": ", ".join(item["tags"]),
+            }
+            for item in output_data["items"]
+        ]
+
+    def record(self, rng: random.Random, index: int) -> Dict[str, Any]:
+        return {
+            "id": index,
+            "name": f"vm-{index:06d}",
+            "config": {
+                "hardware": {"cpu": rng.choice((1, 2, 4, 8)), "memory_mb": rng.choice((2048, 4096, 8192))},
+                "disks": [
+                    {"label": f"Hard disk {disk + 1}", "capacity_gb": rng.choice((40, 80, 200)), "thin": rng.random() < 0.5}
+                    for disk in range(rng.randint(1, 4))
+                ],
+                "network": {"adapter": "vmxnet3", "mac": ":".join(f"{rng.randrange(256):02x}" for _ in range(6))},
+            },
+            "tags": [f"tag-{rng.randrange(20)}" for _ in range(rng.randint(0, 3))],
+        }
+
+
+class WideModule(SyntheticModule):
+    """ Wide tables with many columns like reports """
+
+    HELP: str = "Synthetic benchmark module with wide records"
+
+    def record(self, rng: random.Random, index: int) -> Dict[str, Any]:
+        record: Dict[str, Any] = {"id": index}
+        for column in range(self.args.columns - 1):
+            record[f"col_{column:03d}"] = rng.random() if column % 2 else f"value-{rng.randrange(1000)}"
+        return record
+
+
+SHAPES = {"rows": RowsModule, "nested": NestedModule, "wide": WideModule}
+
+MODULE_TEMPLATE = '''from toolbox.bench.modules import {base}
+
+
+class ToolboxModule({base}):
+    """ {help} """
+
+    HELP: str = "{help}"
+'''
+
+
+def write_package(path: str, modules: Dict[str, str]) -> None:
+    """ Writes a module package: the directory with __init__.py and one file per module source """
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "__init__.py"), "w", encoding="utf-8"):
+        pass
+    for name, source in modules.items():
+        with open(os.path.join(path, f"{name}.py"), "w", encoding="utf-8") as fh:
+            fh.write(source)
+
+
+def write_shape_package(path: str) -> None:
+    """ Writes a package with one module per output shape (rows, nested, wide) """
+
+    write_package(path, {
+        shape: MODULE_TEMPLATE.format(base=module_class.__name__, help=module_class.HELP)
+        for shape, module_class in SHAPES.items()
+    })
+
+
+def write_module_tree(path: str, count: int, per_package: int = 50) -> None:
+    """ Writes a package tree of ``count`` modules, split into subpackages of ``per_package`` modules """
+
+    write_package(path, {})
+    for start in range(0, count, per_package):
+        write_package(os.path.join(path, f"group_{start // per_package:03d}"), {
+            f"module_{index:05d}": MODULE_TEMPLATE.format(base="RowsModule", help=f"Synthetic module {index}")
+            for index in range(start, min(start + per_package, count))
+        })
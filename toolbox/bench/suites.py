@@ -0,0 +1,208 @@
+import itertools
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional
+
+from toolbox import formats
+from toolbox.toolbox import Toolbox
+
+SHAPE_PACKAGE = "benchmark"
+TREE_PACKAGE = "benchmark_tree"
+
+
+class Case(NamedTuple):
+    """ A single benchmark: func is called repeatedly and timed """
+    name: str
+    func: Callable[[], Any]
+
+
+class BenchEnvironment:
+    """
+    Temporary module search path with the synthetic modules and a Toolbox using it.
+    Used as context manager, everything is removed again on exit.
+    """
+
+    def __init__(self, rows: int = 10000, modules: int = 200, columns: int = 50):
+        self.rows = rows
+        self.modules = modules
+        self.columns = columns
+        self.path = ""
+        self.tb: Optional[Toolbox] = None
+        self.stack = ExitStack()
+
+    def __enter__(self) -> "BenchEnvironment":
+        from toolbox.bench.modules import write_module_tree, write_shape_package # pylint: disable=import-outside-toplevel
+
+        self.path = tempfile.mkdtemp(prefix="toolbox-bench-")
+        write_shape_package(os.path.join(self.path, "toolbox_modules", SHAPE_PACKAGE))
+        write_module_tree(os.path.join(self.path, "toolbox_modules", TREE_PACKAGE), self.modules)
+
+        self.tb = Toolbox({
+            "toolbox": {"module_search_paths": [self.path], "manifest_path": os.path.join(self.path, "manifest.json")},
+            "web": {
+                "groups": {"bench": {"tools": {shape: {"module": f"{SHAPE_PACKAGE}.{shape}"} for shape in ("rows", "nested", "wide")}}},
+                "jobs": {"path": os.path.join(self.path, "jobs.sqlite")},
+            },
+        })
+        # Ausgaben von list_modules & Co. würden die Messung verfälschen
+        self.tb.logger.setLevel(logging.WARNING)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stack.close()
+        self.tb.close()
+        if self.path in sys.path:
+            sys.path.remove(self.path)
+        for name in [name for name in sys.modules if name.startswith(("toolbox_modules.benchmark", "toolbox_modules.benchmark_tree"))]:
+            del sys.modules[name]
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def arguments(self, **extra: Any) -> list:
+        """ CLI arguments of a synthetic module """
+
+        arguments = ["--size", str(self.rows), "--columns", str(self.columns)]
+        for key, value in extra.items():
+            arguments += [f"--{key}", str(value)]
+        return arguments
+
+    def output(self, shape: str) -> Dict[str, Any]:
+        """ Output of a synthetic module, computed once """
+
+        module_class = self.tb.load_module(f"{SHAPE_PACKAGE}.{shape}")
+        return module_class(args={"size": self.rows, "columns": self.columns}).run()
+
+
+def core_cases(env: BenchEnvironment) -> Iterator[Case]:
+    """ Toolbox.run end to end: argument parsing, the run and the serialization to a file """
+
+    for shape, fmt in (("rows", "yaml"), ("rows", "json"), ("nested", "yaml"), ("wide", "yaml"), ("rows", "msgpack")):
+        if fmt == "msgpack" and not _has_msgpack():
+            continue
+        output = os.path.join(env.path, f"output.{fmt}")
+        yield Case(
+            f"run.{shape}.{fmt}",
+            lambda shape=shape, fmt=fmt, output=output: env.tb.run(f"{SHAPE_PACKAGE}.{shape}", env.arguments(), output=output, format=fmt),
+        )
+
+
+def discovery_cases(env: BenchEnvironment) -> Iterator[Case]:
+    """ list_modules over the generated tree, without (cold) and with (warm) the manifest on disk """
+
+    manifest_path = os.path.join(env.path, "manifest.json")
+
+    def cold():
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        env.tb._manifest = None # pylint: disable=protected-access
+        return list(env.tb.list_modules(TREE_PACKAGE))
+
+    def warm():
+        env.tb._manifest = None # pylint: disable=protected-access
+        return list(env.tb.list_modules(TREE_PACKAGE))
+
+    yield Case(f"discovery.list_modules.cold.{env.modules}", cold)
+    list(env.tb.list_modules(TREE_PACKAGE))
+    yield Case(f"discovery.list_modules.warm.{env.modules}", warm)
+
+
+def format_cases(env: BenchEnvironment) -> Iterator[Case]:
+    """ YAML (and JSON) load and dump of module outputs """
+
+    for shape in ("rows", "nested"):
+        data = env.output(shape)
+        text = formats.yaml_dump(data)
+        yield Case(f"yaml.dump.{shape}", lambda data=data: formats.yaml_dump(data))
+        yield Case(f"yaml.load.{shape}", lambda text=text: formats.yaml_load(text))
+
+    data = env.output("rows")
+    text = formats.dumps(data, "json")
+    yield Case("json.dump.rows", lambda: formats.dumps(data, "json"))
+    yield Case("json.load.rows", lambda: formats.loads(text, "json"))
+
+
+def _import_web(env: BenchEnvironment):
+    """ Imports the web app, its static files and templates are found relative to the working directory """
+
+    cwd = os.getcwd()
+    os.chdir(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    env.stack.callback(os.chdir, cwd)
+    from toolbox import web # pylint: disable=import-outside-toplevel
+    return web
+
+
+def render_cases(env: BenchEnvironment) -> Iterator[Case]:
+    """ flat_output to CSV, XLSX and the generic HTML table of the web app """
+
+    web = _import_web(env)
+
+    for shape in ("rows", "nested", "wide"):
+        module_class = env.tb.load_module(f"{SHAPE_PACKAGE}.{shape}")
+        output = env.output(shape)
+        yield Case(f"render.flat_output.{shape}", lambda module_class=module_class, output=output: module_class.flat_output(output))
+        flat = module_class.flat_output(output)
+        yield Case(f"render.csv.{shape}", lambda flat=flat: web.generate_csv_output(flat))
+        yield Case(f"render.html.{shape}", lambda flat=flat: web.generate_generic_table(flat))
+        if shape != "wide":
+            yield Case(f"render.xlsx.{shape}", lambda flat=flat: web.generate_xlsx_output(flat))
+
+
+def web_cases(env: BenchEnvironment) -> Iterator[Case]:
+    """ The FastAPI endpoints through a test client, with cold and warm caches """
+
+    from fastapi.testclient import TestClient # pylint: disable=import-outside-toplevel
+
+    web = _import_web(env)
+    web.tb = env.tb
+    env.stack.callback(setattr, web, "tb", None)
+    client = env.stack.enter_context(TestClient(web.app))
+
+    seeds = itertools.count(1)
+    params = {"size": env.rows, "columns": env.columns}
+
+    def get(path: str, **extra: Any):
+        response = client.get(path, params={**params, **extra})
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {path} returned {response.status_code}")
+        return response
+
+    def uncached(path: str) -> Callable[[], Any]:
+        return lambda: get(path, seed=next(seeds))
+
+    def rendered(path: str) -> Callable[[], Any]:
+        # Ergebnis aus dem Cache, das Artefakt wird jedes Mal neu erzeugt
+        def _get():
+            web.artifact_cache.clear()
+            return get(path)
+        return _get
+
+    yield Case("web.page.uncached", uncached("/bench/rows/run"))
+    yield Case("web.page.cached", lambda: get("/bench/rows/run"))
+    yield Case("web.data.first_page", lambda: get("/bench/rows/data", _limit=200))
+    yield Case("web.data.sorted_filtered", lambda: get("/bench/rows/data", _limit=200, _sort="host", _q="esx1"))
+    yield Case("web.raw_json.uncached", uncached("/bench/rows/raw/json"))
+    yield Case("web.raw_json", rendered("/bench/rows/raw/json"))
+    yield Case("web.raw_yaml", rendered("/bench/rows/raw/yaml"))
+    yield Case("web.csv", rendered("/bench/rows/csv"))
+    yield Case("web.csv.artifact_cached", lambda: get("/bench/rows/csv"))
+    yield Case("web.xlsx", rendered("/bench/rows/xlsx"))
+
+
+def _has_msgpack() -> bool:
+    try:
+        formats._msgpack() # pylint: disable=protected-access
+    except ImportError:
+        return False
+    return True
+
+
+SUITES: Dict[str, Callable[[BenchEnvironment], Iterator[Case]]] = {
+    "core": core_cases,
+    "discovery": discovery_cases,
+    "formats": format_cases,
+    "render": render_cases,
+    "web": web_cases,
+}
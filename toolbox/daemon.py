@@ -0,0 +1,234 @@
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import traceback
+from typing import Any, Dict, List, Optional
+
+from toolbox.paths import config_path
+
+# Frame-Kanäle: Ausgabe, Fehlerausgabe, Exit-Code, Anfrage abgelehnt (Client führt lokal aus)
+STDOUT, STDERR, EXIT, REFUSED = b"o", b"e", b"x", b"r"
+HEADER = struct.Struct("!cI")
+
+
+def default_socket_path() -> str:
+    """ Default location of the daemon socket """
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "toolbox.sock")
+    return f"/tmp/toolbox-{os.getuid()}.sock"
+
+
+def _send_frame(sock: socket.socket, channel: bytes, payload: bytes) -> None:
+    sock.sendall(HEADER.pack(channel, len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed by peer")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _recv_frame(sock: socket.socket) -> tuple[bytes, bytes]:
+    channel, size = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    return channel, _recv_exact(sock, size)
+
+
+class _FrameWriter:
+    """ File-like object, which streams everything written to it as frames to the client """
+
+    def __init__(self, sock: socket.socket, channel: bytes):
+        self.sock = sock
+        self.channel = channel
+
+    def write(self, text: str) -> int:
+        """ Sends the text as one frame """
+        if text:
+            _send_frame(self.sock, self.channel, text.encode("utf-8"))
+        return len(text)
+
+    def flush(self) -> None:
+        """ Frames are sent immediately, nothing to flush """
+
+    def isatty(self) -> bool:
+        """ The client decides about terminal handling """
+        return False
+
+
+class ToolboxDaemon:
+    """
+    Keeps a Toolbox instance warm and executes CLI requests received over a Unix socket.
+
+    Every requested module is imported once in the daemon process, the request itself runs in a
+    forked child, so stdin/stdout, the working directory and module state are isolated per call.
+    """
+
+    def __init__(self, config: Optional[str] = None, verbose: bool = False, socket_path: Optional[str] = None):
+        from toolbox.toolbox import Toolbox # pylint: disable=import-outside-toplevel
+
+        self.config_path = config_path(config)
+        self.socket_path = socket_path or default_socket_path()
+        self.tb = Toolbox(config, verbose)
+        self.verbose = verbose
+
+    def preload(self, modules: List[str]) -> None:
+        """ Imports modules up front, so the first request is fast as well """
+
+        for module_name in modules:
+            self.tb.load_module(module_name)
+
+    def serve_forever(self) -> None:
+        """ Binds the socket and handles requests until the process is terminated """
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            server.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        server.listen(64)
+
+        if hasattr(os, "fork"):
+            # Kindprozesse automatisch aufräumen lassen
+            signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+        self.tb.logger.info(f"Toolbox daemon listening on {self.socket_path}")
+        try:
+            while True:
+                conn, _ = server.accept()
+                try:
+                    self.handle(conn)
+                except (ConnectionError, ValueError) as e:
+                    self.tb.logger.error(f"Invalid daemon request: {e}")
+                except Exception: # pylint: disable=broad-exception-caught
+                    # Fehler einer Anfrage dürfen den Daemon nicht beenden, der Client bekommt den Traceback
+                    self.tb.logger.exception("Daemon request failed")
+                    self._fail(conn, traceback.format_exc())
+                finally:
+                    conn.close()
+        finally:
+            server.close()
+            self.tb.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def handle(self, conn: socket.socket) -> None:
+        """ Reads a request, warms the module in the daemon and executes it in a forked child """
+
+        _, payload = _recv_frame(conn)
+        request: Dict[str, Any] = json.loads(payload.decode("utf-8"))
+
+        # Clients senden den aufgelösten Pfad, auch ohne -c (Default-Config)
+        if config_path(request.get("config")) != self.config_path:
+            _send_frame(conn, REFUSED, b"daemon runs with a different config")
+            return
+
+        if len(request["command"].split('.')) > 1:
+            self.tb.load_module(request["command"])
+
+        if not hasattr(os, "fork"):
+            self._execute(conn, request)
+            return
+
+        if os.fork() == 0:
+            # SIG_IGN des Daemons würde subprocess/wait() im Lauf die Exit-Codes nehmen
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            code = 1
+            try:
+                code = self._execute(conn, request)
+            finally:
+                os._exit(code) # pylint: disable=protected-access
+
+    @staticmethod
+    def _fail(conn: socket.socket, message: str) -> None:
+        """ Reports a failed request to the client as stderr output and exit code 1 """
+
+        try:
+            _send_frame(conn, STDERR, message.encode("utf-8"))
+            _send_frame(conn, EXIT, b"1")
+        except OSError:
+            pass # Client ist schon weg
+
+    def _execute(self, conn: socket.socket, request: Dict[str, Any]) -> int:
+        """ Runs Toolbox.run with the client's stdin, stdout, stderr and working directory """
+
+        import io # pylint: disable=import-outside-toplevel
+
+        saved = (sys.stdin, sys.stdout, sys.stderr, os.getcwd())
+        stdout, stderr = _FrameWriter(conn, STDOUT), _FrameWriter(conn, STDERR)
+        handlers = [(handler, handler.setStream(stderr)) for handler in self.tb.logger.handlers if hasattr(handler, "setStream")]
+        self.tb.logger.setLevel("DEBUG" if request.get("verbose") or self.verbose else "INFO")
+
+        code = 0
+        try:
+            sys.stdin = io.StringIO(request.get("stdin") or "")
+            sys.stdout, sys.stderr = stdout, stderr
+            os.chdir(request.get("cwd") or saved[3])
+            self.tb.run(request["command"], request.get("arguments", []), request.get("input"),
+                        request.get("output", "-"), request.get("summation", False), request.get("format"),
+                        request.get("full", False))
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception: # pylint: disable=broad-exception-caught
+            stderr.write(traceback.format_exc())
+            code = 1
+        finally:
+            sys.stdin, sys.stdout, sys.stderr = saved[:3]
+            os.chdir(saved[3])
+            for handler, stream in handlers:
+                handler.setStream(stream)
+
+        _send_frame(conn, EXIT, str(code).encode("ascii"))
+        return code
+
+
+def run_client(socket_path: str, request: Dict[str, Any]) -> Optional[int]:
+    """
+    Sends a CLI request to a running daemon and streams its output to stdout/stderr.
+
+    Returns:
+        int | None: The exit code of the request or None if the daemon is not available
+        or refused the request, in that case the caller should run the module locally.
+    """
+
+    import io # pylint: disable=import-outside-toplevel
+
+    if request.get("format") == "msgpack":
+        return None # Frames transportieren Text, binäre Ein- und Ausgaben laufen lokal
+
+    needs_stdin = request.get("input") == '-' or request.get("summation")
+    request = {**request, "cwd": os.getcwd(), "stdin": sys.stdin.read() if needs_stdin else None}
+    if needs_stdin:
+        # stdin ist jetzt gelesen, für einen lokalen Fallback wieder bereitstellen
+        sys.stdin = io.StringIO(request["stdin"])
+
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(socket_path)
+    except OSError:
+        return None
+
+    with sock:
+        _send_frame(sock, b"q", json.dumps(request).encode("utf-8"))
+        while True:
+            channel, payload = _recv_frame(sock)
+            if channel == STDOUT:
+                sys.stdout.write(payload.decode("utf-8"))
+            elif channel == STDERR:
+                sys.stderr.write(payload.decode("utf-8"))
+            elif channel == EXIT:
+                sys.stdout.flush()
+                return int(payload)
+            elif channel == REFUSED:
+                return None
@@ -0,0 +1,400 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from logging import Logger
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class EngineBusy(Exception):
+    """ Raised when a run is rejected because the queue is full """
+
+    def __init__(self, message: str, status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ExecutionTimeout(Exception):
+    """ Raised when a run exceeds its timeout """
+
+    status_code = 504
+
+
+class ExecutionError(Exception):
+    """ Raised when the worker process of a run died, e.g. by a segfault or the OOM killer """
+
+    status_code = 500
+
+
+def _process_worker(conn) -> None:
+    """ Main loop of a pre-forked worker process: receives (func, args), sends back the result """
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+
+        func, args = task
+        try:
+            conn.send((True, func(*args)))
+        except Exception as e: # pylint: disable=broad-exception-caught
+            conn.send((False, e))
+
+
+class _ProcessWorker:
+    """ A forked worker process, which is killed and replaced if a call times out """
+
+    def __init__(self, context):
+        self.context = context
+        self.process = None
+        self.conn = None
+        self.start()
+
+    def start(self) -> None:
+        """ Forks the worker process """
+
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(target=_process_worker, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def stop(self) -> None:
+        """ Terminates the worker process """
+
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+    def restart(self) -> None:
+        """ Replaces the worker process by a new one """
+
+        self.stop()
+        self.start()
+
+    def call(self, func: Callable, args: tuple, timeout: Optional[float]) -> Any:
+        """ Executes func(*args) in the worker process """
+
+        try:
+            self.conn.send((func, args))
+            if not self.conn.poll(timeout):
+                self.restart()
+                raise ExecutionTimeout(f"Execution timed out after {timeout} seconds, worker was killed")
+            ok, result = self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.stop()
+            exitcode = self.process.exitcode
+            self.start()
+            raise ExecutionError(f"Worker process died (exit code {exitcode}), it was replaced") from e
+        except KeyboardInterrupt:
+            # Der Worker rechnet evtl. noch, sein Ergebnis darf nicht beim nächsten Aufruf ankommen
+            self.restart()
+            raise
+
+        if not ok:
+            raise result
+        return result
+
+
+class _ModuleSlots: # pylint: disable=too-few-public-methods
+    """ Concurrency and queue state of a single module """
+
+    def __init__(self, max_concurrency: int, max_queue: int, timeout: Optional[float], is_async: bool = False):
+        self.is_async = is_async
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.running = 0
+        self.waiting: Deque[tuple] = deque()
+
+
+class ExecutionEngine: # pylint: disable=too-many-instance-attributes
+    """
+    Bounded execution of module runs, shared by the CLI and the web app.
+
+    Runs are executed in a pool of threads or pre-forked processes. Every module has a
+    concurrency cap and a queue depth, a full module queue is rejected with EngineBusy(429),
+    a full engine with EngineBusy(503). In process mode a timeout kills the worker process,
+    in thread mode the caller gets ExecutionTimeout while the thread is left to finish. Until then it
+    keeps its module slot and pool worker, so runaway work is only stopped with ``mode: process``.
+    Runs in the main thread (CLI) get a timeout only in process mode as well.
+
+    Config (section "engine" of the toolbox config):
+        engine:
+          mode: thread            # thread or process
+          workers: 8
+          max_queue: 64           # runs waiting for a free worker
+          timeout: 600            # seconds, None: no timeout; kills the run only with mode: process
+          async_max_concurrency: 100  # default cap for modules with run_async, they need no worker
+          modules:
+            vmware.get_vms: {max_concurrency: 2, max_queue: 10, timeout: 120}
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, logger: Optional[Logger] = None):
+        config = config or {}
+        self.mode = config.get('mode', 'thread')
+        self.workers = config.get('workers', 8)
+        self.max_queue = config.get('max_queue', 64)
+        self.timeout = config.get('timeout')
+        self.async_max_concurrency = config.get('async_max_concurrency', 100)
+        self.module_config: Dict[str, Dict[str, Any]] = config.get('modules', {})
+        self.logger = logger or logging.getLogger("toolbox.engine")
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._slots: Dict[str, _ModuleSlots] = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="toolbox-engine")
+
+        self._process_workers: Optional[queue.SimpleQueue] = None
+        if self.mode == 'process':
+            context = multiprocessing.get_context("fork")
+            self._process_workers = queue.SimpleQueue()
+            for _ in range(self.workers):
+                self._process_workers.put(_ProcessWorker(context))
+        elif self.mode != 'thread':
+            raise ValueError(f"Invalid engine mode: {self.mode}")
+
+    @property
+    def pending(self) -> int:
+        """ Number of queued and running executions in the pool """
+
+        return self._pending
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """ Running and queued executions per module """
+
+        with self._lock:
+            return {name: {"running": slots.running, "queued": len(slots.waiting)} for name, slots in self._slots.items()}
+
+    def max_concurrency(self, name: str, is_async: bool = False) -> int:
+        """ Concurrency cap of the module ``name`` """
+
+        with self._lock:
+            return self._module_slots(name, is_async).max_concurrency
+
+    def capacity(self, name: str, is_async: bool = False) -> int:
+        """ Runs of the module ``name`` accepted at the same time (running and queued) before EngineBusy """
+
+        with self._lock:
+            slots = self._module_slots(name, is_async)
+            limit = slots.max_concurrency + slots.max_queue
+            if not slots.is_async:
+                limit = min(limit, self.workers + self.max_queue)
+            return limit
+
+    def _module_slots(self, name: str, is_async: bool) -> _ModuleSlots:
+        slots = self._slots.get(name)
+        if slots is None:
+            config = self.module_config.get(name, {})
+            slots = self._slots[name] = _ModuleSlots(
+                config.get('max_concurrency', self.async_max_concurrency if is_async else self.workers),
+                config.get('max_queue', self.max_queue),
+                config.get('timeout', self.timeout),
+                is_async,
+            )
+        return slots
+
+    def submit(self, name: str, func: Callable, *args: Any, local: bool = False) -> Future:
+        """
+        Schedules func(*args) as a run of the module ``name``.
+        With ``local`` the run always takes place in a thread of this process, also in process mode
+        (e.g. for work bound to open files).
+
+        Returns:
+            Future: Resolves to the result of func.
+
+        Raises:
+            EngineBusy: If the module queue (429) or the engine (503) is full.
+        """
+
+        if self._process_workers is None or local:
+            # Kontextvariablen des Aufrufers (z. B. der laufende Web-Job) in den Thread mitnehmen
+            func = functools.partial(contextvars.copy_context().run, func)
+
+        future: Future = Future()
+        slots, queued = self._admit(name, future, func, args, local, is_async=False)
+        if not queued:
+            self._dispatch(name, slots, future, func, args, local)
+        return future
+
+    def _admit(self, name: str, future: Future, func: Optional[Callable], args: tuple, local: bool = False, # pylint: disable=too-many-arguments,too-many-positional-arguments
+               is_async: bool = False) -> tuple[_ModuleSlots, bool]:
+        """
+        Takes a slot of the module or queues the run, returns the slots and if the run was queued.
+        Without func the future is resolved when the queued run gets its slot, the caller runs it itself.
+        """
+
+        with self._lock:
+            slots = self._module_slots(name, is_async)
+            if not slots.is_async:
+                # Nur Läufe im Pool belegen Worker, async Läufe laufen im Event-Loop
+                if self._pending >= self.workers + self.max_queue:
+                    raise EngineBusy("Toolbox is busy, please try again later", 503)
+                self._pending += 1
+
+            if slots.running >= slots.max_concurrency:
+                if len(slots.waiting) >= slots.max_queue:
+                    if not slots.is_async:
+                        self._pending -= 1
+                    raise EngineBusy(f"Too many concurrent runs of {name}, please try again later", 429)
+                slots.waiting.append((future, func, args, local))
+                return slots, True
+
+            slots.running += 1
+            return slots, False
+
+    def run(self, name: str, func: Callable, *args: Any, local: bool = False) -> Any:
+        """
+        Submits func and waits for the result.
+
+        In the main thread (CLI) the run takes place in the calling thread, after it got a slot of the
+        module, so Ctrl-C interrupts it. A timeout only applies in process mode, there it kills the worker.
+        """
+
+        if threading.current_thread() is not threading.main_thread():
+            return self.submit(name, func, *args, local=local).result()
+
+        gate: Future = Future()
+        slots, queued = self._admit(name, gate, None, args)
+        if queued:
+            try:
+                gate.result()
+            except KeyboardInterrupt:
+                if not gate.cancel():
+                    self._release(name, slots)
+                raise
+
+        try:
+            if self._process_workers is not None and not local:
+                return self._call_in_process(func, args, slots.timeout)
+            return func(*args)
+        finally:
+            self._release(name, slots)
+
+    async def run_async(self, name: str, func: Callable, *args: Any) -> Any:
+        """
+        Runs the coroutine function func(*args) on the running event loop.
+        Uses the same concurrency caps and queues as threaded runs, a timeout cancels the coroutine.
+        """
+
+        gate: Future = Future()
+        slots, queued = self._admit(name, gate, None, args, is_async=True)
+        if queued:
+            try:
+                await asyncio.wrap_future(gate)
+            except asyncio.CancelledError:
+                # Wartenden Eintrag verwerfen oder den bereits übergebenen Slot wieder freigeben
+                if not gate.cancel():
+                    self._release(name, slots)
+                raise
+
+        try:
+            if slots.timeout:
+                return await asyncio.wait_for(func(*args), slots.timeout)
+            return await func(*args)
+        except asyncio.TimeoutError as e:
+            raise ExecutionTimeout(f"Execution timed out after {slots.timeout} seconds") from e
+        finally:
+            self._release(name, slots)
+
+    def _dispatch(self, name: str, slots: _ModuleSlots, future: Future, func: Optional[Callable], args: tuple, local: bool = False) -> None: # pylint: disable=too-many-arguments,too-many-positional-arguments
+        if func is None:
+            # Wartender asynchroner oder direkter Lauf: Slot übergeben, der Aufrufer führt ihn selbst aus
+            future.set_result(None)
+            return
+
+        timeout = slots.timeout
+
+        try:
+            if self._process_workers is not None and not local:
+                inner = self._executor.submit(self._call_in_process, func, args, timeout)
+            else:
+                inner = self._executor.submit(func, *args)
+        except RuntimeError as e:
+            # Engine wurde beendet: Lauf abweisen und den Slot freigeben
+            future.set_exception(e)
+            self._release(name, slots)
+            return
+
+        if self._process_workers is None or local:
+            if timeout:
+                timer = threading.Timer(timeout, self._expire, (name, future, timeout))
+                timer.daemon = True
+                timer.start()
+                inner.add_done_callback(lambda _: timer.cancel())
+
+        inner.add_done_callback(lambda done: self._finished(name, slots, future, done))
+
+    def _call_in_process(self, func: Callable, args: tuple, timeout: Optional[float]) -> Any:
+        worker = self._process_workers.get()
+        try:
+            return worker.call(func, args, timeout)
+        finally:
+            self._process_workers.put(worker)
+
+    def _expire(self, name: str, future: Future, timeout: float) -> None:
+        try:
+            future.set_exception(ExecutionTimeout(f"Execution timed out after {timeout} seconds"))
+            self.logger.warning(f"{name} exceeded its timeout of {timeout} seconds, thread keeps running")
+        except InvalidStateError:
+            pass
+
+    def _finished(self, name: str, slots: _ModuleSlots, future: Future, done: Future) -> None:
+        try:
+            if done.cancelled():
+                future.cancel() # durch shutdown() verworfen
+            elif done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result())
+        except InvalidStateError:
+            pass # bereits durch Timeout beendet
+
+        # Slot erst freigeben, wenn die Arbeit wirklich beendet ist
+        self._release(name, slots)
+
+    def _release(self, name: str, slots: _ModuleSlots) -> None:
+        """ Frees a slot of the module or hands it over to the next queued run """
+
+        next_run = None
+        pending = 0 if slots.is_async else 1
+        with self._lock:
+            self._pending -= pending
+            while slots.waiting:
+                candidate = slots.waiting.popleft()
+                if candidate[0].cancelled():
+                    self._pending -= pending # Aufrufer hat aufgegeben
+                    continue
+                next_run = candidate
+                break
+            if next_run is None:
+                slots.running -= 1
+
+        if next_run is not None:
+            self._dispatch(name, slots, *next_run)
+
+    def shutdown(self) -> None:
+        """ Stops all workers, queued runs are cancelled """
+
+        # Wartende zuerst verwerfen: die Callbacks von shutdown() dürfen nichts mehr an den Pool übergeben
+        with self._lock:
+            waiting = []
+            for slots in self._slots.values():
+                if not slots.is_async:
+                    self._pending -= len(slots.waiting)
+                waiting.extend(slots.waiting)
+                slots.waiting.clear()
+        for future, *_ in waiting:
+            future.cancel()
+
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._process_workers is not None:
+            while not self._process_workers.empty():
+                self._process_workers.get().stop()
@@ -0,0 +1,341 @@
+import codecs
+import io
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from typing import IO, Any, Callable, Iterable, Iterator, Optional, TextIO, Union
+
+import yaml
+
+from toolbox import metrics
+
+# libyaml ist um ein Vielfaches schneller, die reinen Python-Klassen bleiben als Fallback
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+SafeDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+Dumper = getattr(yaml, "CDumper", yaml.Dumper)
+
+
+class _SafeDumper(SafeDumper): # pylint: disable=too-many-ancestors
+    """ Safe dumper, which writes unknown objects like json.dumps(default=str) """
+
+    def represent_undefined(self, data):
+        if isinstance(data, dict):
+            return self.represent_dict(data)
+        if isinstance(data, (list, tuple, set)):
+            return self.represent_list(data)
+        return self.represent_str(str(data))
+
+
+_SafeDumper.add_representer(None, _SafeDumper.represent_undefined)
+
+# Formate für Ein- und Ausgabe, "ndjson" schreibt ein JSON-Dokument pro Zeile
+FORMATS = ("yaml", "json", "ndjson", "msgpack")
+
+# Formate, die als Bytes gelesen und geschrieben werden
+BINARY_FORMATS = ("msgpack",)
+
+# Formate, in die Records einzeln geschrieben werden können (JSON braucht das vollständige Dokument)
+STREAMING_FORMATS = ("yaml", "ndjson", "msgpack")
+
+EXTENSIONS = {
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".msgpack": "msgpack",
+    ".mpk": "msgpack",
+}
+
+
+def detect_format(path: Optional[str], fmt: Optional[str] = None, default: str = "yaml") -> str:
+    """ Returns the explicit format or the format matching the file extension """
+
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"Invalid format {fmt}. Must be one of {', '.join(FORMATS)}.")
+        return fmt
+    if path and path != '-':
+        return EXTENSIONS.get(os.path.splitext(path)[1].lower(), default)
+    return default
+
+
+def is_binary(fmt: str) -> bool:
+    """ True if the format is read and written as bytes """
+
+    return fmt in BINARY_FORMATS
+
+
+def _msgpack():
+    try:
+        import msgpack # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise ImportError("The msgpack format requires the msgpack package: pip install toolbox[msgpack]") from e
+    return msgpack
+
+
+def yaml_load(stream: Union[str, bytes, IO]) -> Any:
+    """ yaml.safe_load with libyaml, if available """
+
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def yaml_dump(data: Any, safe: bool = False) -> str:
+    """
+    Block style YAML as written by the CLI, with libyaml if available. Like yaml.dump, types without
+    a standard tag (sets, tuples, objects) are written with their !!set or !!python tags.
+    With ``safe`` only standard tags are used and unknown objects are written as strings.
+    """
+
+    return yaml.dump(data, Dumper=_SafeDumper if safe else Dumper, allow_unicode=True, default_flow_style=False)
+
+
+def loads(data: Union[str, bytes], fmt: str = "yaml") -> Any:
+    """
+    Deserializes a complete input. NDJSON and MessagePack with a single document return that document,
+    with several documents a list of them.
+    """
+
+    if fmt == "msgpack":
+        msgpack = _msgpack()
+        try:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except msgpack.ExtraData:
+            # Stream mehrerer Objekte (z. B. von iter_records) wie NDJSON als Liste
+            return list(msgpack.Unpacker(io.BytesIO(data), raw=False, strict_map_key=False))
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    if fmt == "json":
+        return json.loads(data)
+    if fmt == "ndjson":
+        documents = [json.loads(line) for line in data.splitlines() if line.strip()]
+        return documents[0] if len(documents) == 1 else documents
+    return yaml_load(data)
+
+
+def dumps(data: Any, fmt: str = "yaml") -> Union[str, bytes]:
+    """ Serializes a complete output, bytes for binary formats """
+
+    if fmt == "msgpack":
+        return _msgpack().packb(data, default=str, use_bin_type=True)
+    if fmt == "json":
+        return json.dumps(data, ensure_ascii=False, default=str, indent=2) + "\n"
+    if fmt == "ndjson":
+        return json.dumps(data, ensure_ascii=False, default=str) + "\n"
+    return yaml_dump(data)
+
+
+def load(path: str, fmt: Optional[str] = None) -> Any:
+    """ Reads a file or stdin ('-'), the format defaults to the file extension or yaml """
+
+    fmt = detect_format(path, fmt)
+    if path == '-':
+        return loads(sys.stdin.buffer.read() if is_binary(fmt) else sys.stdin.read(), fmt)
+    with open(path, "rb") as fh:
+        return loads(fh.read(), fmt)
+
+
+def _stdin_binary() -> IO[bytes]:
+    # Im Daemon ist stdin ein StringIO ohne Byte-Puffer
+    return getattr(sys.stdin, "buffer", None) or io.BytesIO(sys.stdin.read().encode("utf-8"))
+
+
+def _mmap(fh: IO[bytes]) -> Optional[mmap.mmap]:
+    """ Maps a file read-only: pages are read on demand and not copied. None for empty files or pipes """
+
+    try:
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+
+def _iter_lines(stream: IO[bytes]) -> Iterator[bytes]:
+    return iter(stream.readline, b"")
+
+
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+def _iter_json(read: Callable[[int], bytes], chunk_size: int = 1024 * 1024) -> Iterator[Any]: # pylint: disable=too-many-branches
+    """
+    Parses a JSON document incrementally: the elements of a top level array are yielded one by one,
+    only the current element and one chunk are held in memory. Other documents are yielded as a whole.
+    """
+
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, eof
+        chunk = read(chunk_size)
+        eof = not chunk
+        buffer += text_decoder.decode(chunk, final=eof)
+        return not eof
+
+    def skip(pos: int) -> int:
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or not fill():
+                return pos
+
+    while not buffer and fill():
+        pass
+    pos = skip(1 if buffer.startswith("\ufeff") else 0)
+    if pos >= len(buffer):
+        return
+    if buffer[pos] != "[":
+        # Kein Array: Dokument vollständig lesen
+        while fill():
+            pass
+        yield decoder.decode(buffer[pos:])
+        return
+
+    pos = skip(pos + 1)
+    if pos < len(buffer) and buffer[pos] == "]":
+        return
+    while True:
+        if pos > chunk_size:
+            # Verarbeiteten Anfang verwerfen, damit der Puffer nicht wächst
+            buffer, pos = buffer[pos:], 0
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Element reicht über den Puffer hinaus, weiterlesen
+            if eof or not fill():
+                raise
+            continue
+        if not eof and (end == len(buffer) or buffer[end] not in ", \t\r\n]"):
+            # Zahl am Pufferende könnte abgeschnitten sein (z. B. "1." von "1.5")
+            fill()
+            continue
+        yield element
+        pos = skip(end)
+        if pos >= len(buffer):
+            raise json.JSONDecodeError("Unterminated array", buffer, pos)
+        if buffer[pos] == "]":
+            return
+        if buffer[pos] != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+        pos = skip(pos + 1)
+
+
+def _unwrap_single_list(documents: Iterator[Any]) -> Iterator[Any]:
+    """ Yields the documents of a stream, a single document containing a list is unwrapped to its items """
+
+    first = next(documents, _END)
+    if first is _END:
+        return
+    second = next(documents, _END)
+    if second is _END:
+        if isinstance(first, list):
+            yield from first
+        else:
+            yield first
+        return
+    yield first
+    yield second
+    yield from documents
+
+
+_END = object()
+
+
+def iter_load(path: str, fmt: Optional[str] = None) -> Iterator[Any]:
+    """
+    Reads the records of a file or stdin ('-') lazily, for modules processing inputs larger than memory.
+
+    Records are the documents of a multi-document YAML or MessagePack stream, the lines of NDJSON
+    or the elements of a top level JSON array. A single document containing a list yields its items.
+    Files are memory-mapped, NDJSON and JSON arrays are parsed record by record in constant memory.
+    """
+
+    fmt = detect_format(path, fmt)
+    if path == '-':
+        yield from _iter_records(_stdin_binary(), fmt)
+        return
+    with open(path, "rb") as fh:
+        mapped = _mmap(fh)
+        try:
+            yield from _iter_records(mapped or fh, fmt)
+        finally:
+            if mapped is not None:
+                mapped.close()
+
+
+def _iter_records(stream: IO[bytes], fmt: str) -> Iterator[Any]:
+    if fmt == "ndjson":
+        for line in _iter_lines(stream):
+            if line.strip():
+                yield json.loads(line)
+    elif fmt == "json":
+        yield from _iter_json(stream.read)
+    elif fmt == "msgpack":
+        yield from _unwrap_single_list(iter(_msgpack().Unpacker(stream, raw=False, strict_map_key=False)))
+    else:
+        yield from _unwrap_single_list(yaml.load_all(stream, Loader=SafeLoader))
+
+
+def dump(data: Any, path: str, fmt: Optional[str] = None) -> None:
+    """ Writes a complete output to a file or stdout ('-') """
+
+    fmt = detect_format(path, fmt)
+    start = time.perf_counter()
+    content = dumps(data, fmt)
+    metrics.SERIALIZE_SECONDS.observe(time.perf_counter() - start, format=fmt)
+    metrics.OUTPUT_BYTES.observe(len(content) if isinstance(content, bytes) else len(content.encode("utf-8")), format=fmt)
+    if path == '-':
+        if isinstance(content, bytes):
+            sys.stdout.flush()
+            sys.stdout.buffer.write(content)
+            sys.stdout.buffer.flush()
+        else:
+            sys.stdout.write(content)
+            sys.stdout.flush()
+        return
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    with open(path, "wb") as fh:
+        fh.write(content)
+
+
+def write_records(records: Iterable[Any], stream: Union[TextIO, IO[bytes]], fmt: str = "yaml", flush_every: int = 1000, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                  key: Optional[str] = None) -> int:
+    """
+    Writes records incrementally, as multi-document YAML, JSON lines or a MessagePack stream.
+    Only one record is serialized at a time, so memory stays flat. MessagePack needs a binary stream.
+    With ``key`` YAML is written as a single document with the list of records under that key,
+    the same output as dumps({key: list(records)}). NDJSON and MessagePack stay record streams.
+
+    Returns:
+        int: Number of written records.
+    """
+
+    packer = _msgpack().Packer(default=str, use_bin_type=True) if fmt == "msgpack" else None
+    keyed = key is not None and fmt == "yaml"
+    count = 0
+    for record in records:
+        if packer is not None:
+            stream.write(packer.pack(record))
+        elif fmt == "ndjson":
+            stream.write(json.dumps(record, ensure_ascii=False, default=str))
+            stream.write("\n")
+        elif keyed:
+            if count == 0:
+                # "key: []" ohne die leere Liste, die Records folgen als Block-Sequenz
+                stream.write(yaml_dump({key: []})[:-len(" []\n")] + "\n")
+            stream.write(yaml_dump([record]))
+        else:
+            stream.write(yaml.dump(record, Dumper=Dumper, allow_unicode=True, default_flow_style=False, explicit_start=True))
+        count += 1
+        if count % flush_every == 0:
+            stream.flush()
+
+    if keyed and count == 0:
+        stream.write(yaml_dump({key: []}))
+    stream.flush()
+    return count
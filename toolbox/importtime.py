@@ -0,0 +1,84 @@
+import argparse
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# Startpfade der CLI mit Budget (Millisekunden, kumulierte Importzeit laut -X importtime)
+IMPORT_BUDGETS: Dict[str, float] = {
+    "toolbox.__main__": 15.0,
+    "toolbox.toolbox": 50.0,
+    "toolbox.daemon": 15.0,
+}
+
+# Diese Pakete dürfen auf dem Startpfad nie geladen werden, sie gehören zum Modul oder zur Web-App
+FORBIDDEN_IMPORTS: List[str] = [
+    "pydantic", "fastapi", "starlette", "uvicorn", "openpyxl", "jinja2", "cachetools", "inspect", "ast",
+]
+
+
+def measure(module: str, python: str = sys.executable) -> Dict[str, int]:
+    """
+    Imports a module in a fresh interpreter with "-X importtime".
+
+    Returns:
+        dict: Cumulative import time in microseconds per imported module.
+    """
+
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue # Kopfzeile
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def check(budgets: Optional[Dict[str, float]] = None, runs: int = 5, python: str = sys.executable) -> List[str]:
+    """
+    Checks all startup paths against their budget and the list of forbidden imports.
+    The fastest of several runs is used, so a busy machine does not cause false alarms.
+
+    Returns:
+        list: Violations as human readable strings, empty if everything is within budget.
+    """
+
+    violations = []
+    for module, budget in (budgets or IMPORT_BUDGETS).items():
+        samples = [measure(module, python) for _ in range(runs)]
+        best_ms = min(sample.get(module, 0) for sample in samples) / 1000
+
+        print(f"{module}: {best_ms:.1f} ms (budget {budget:.1f} ms)")
+        if best_ms > budget:
+            violations.append(f"{module} imports in {best_ms:.1f} ms, budget is {budget:.1f} ms")
+
+        for forbidden in FORBIDDEN_IMPORTS:
+            if forbidden in samples[0]:
+                violations.append(f"{module} imports {forbidden} on the startup path")
+
+    return violations
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """ Entry point for "python -m toolbox.importtime", returns 1 if the budget is exceeded """
+
+    parser = argparse.ArgumentParser(prog="toolbox importtime", description="Check the import-time budget of the CLI")
+    parser.add_argument("--runs", type=int, default=5, help="Number of measurements per module")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply all budgets, e.g. for slow CI runners")
+    args = parser.parse_args(argv)
+
+    budgets = {module: budget * args.scale for module, budget in IMPORT_BUDGETS.items()}
+    violations = check(budgets, args.runs)
+    for violation in violations:
+        print(f"FAIL: {violation}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
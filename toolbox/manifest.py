@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from logging import Logger
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+# ast wird nur benötigt, wenn sich eine Datei geändert hat
+if TYPE_CHECKING:
+    import ast
+
+MANIFEST_VERSION = 1
+
+
+def default_manifest_path() -> str:
+    """ Default location of the manifest index (XDG cache dir) """
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "toolbox", "manifest.json")
+
+
+def _literal(node: Optional[ast.AST]) -> Any:
+    """ Evaluate a literal AST node, returns None if the value is not static """
+    import ast # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+    if node is None:
+        return None
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def _arguments_schema(class_node: ast.ClassDef) -> List[Dict[str, Any]]:
+    """ Build the argument schema from the fields of an inner Arguments class """
+    import ast # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+    fields = []
+    for node in class_node.body:
+        if not isinstance(node, ast.AnnAssign) or not isinstance(node.target, ast.Name):
+            continue
+
+        field: Dict[str, Any] = {
+            "name": node.target.id,
+            "annotation": ast.unparse(node.annotation),
+            "flags": [],
+            "help": None,
+            "default": None,
+            "required": node.value is None,
+        }
+
+        if isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Attribute) \
+                and node.value.func.attr == "add_argument":
+            field["flags"] = [flag for flag in (_literal(arg) for arg in node.value.args) if isinstance(flag, str)]
+            for keyword in node.value.keywords:
+                if keyword.arg is None:
+                    continue
+                field[keyword.arg] = _literal(keyword.value)
+            # Wie in update_parser: Positionale Argumente ohne Default sind Pflicht
+            field["required"] = not field["flags"] and field.get("default") is None
+        elif node.value is not None:
+            field["default"] = _literal(node.value)
+
+        fields.append(field)
+    return fields
+
+
+def scan_source(source: str, filename: str = "<unknown>") -> Optional[Dict[str, Any]]:
+    """
+    Statically scans the source of a python file for a ToolboxModule class.
+
+    Returns:
+        dict | None: HELP text and Arguments schema of the module or None if the file contains no ToolboxModule.
+    """
+    import ast # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+    tree = ast.parse(source, filename=filename)
+
+    for node in tree.body:
+        # Re-Exports wie "from .other import ToolboxModule" zählen ebenfalls
+        if isinstance(node, ast.ImportFrom) and any((alias.asname or alias.name) == "ToolboxModule" for alias in node.names):
+            return {"help": None, "arguments": [], "has_flat_output": False, "has_html_output": False}
+
+        if not isinstance(node, ast.ClassDef) or node.name != "ToolboxModule":
+            continue
+
+        info: Dict[str, Any] = {"help": None, "arguments": [], "has_flat_output": False, "has_html_output": False}
+        for member in node.body:
+            if isinstance(member, (ast.Assign, ast.AnnAssign)):
+                targets = member.targets if isinstance(member, ast.Assign) else [member.target]
+                names = [target.id for target in targets if isinstance(target, ast.Name)]
+                if "HELP" in names:
+                    info["help"] = _literal(member.value)
+                if "OUTPUT_HTML_JINJA2" in names:
+                    info["has_html_output"] = _literal(member.value) is not None
+            elif isinstance(member, ast.FunctionDef) and member.name == "flat_output":
+                info["has_flat_output"] = True
+            elif isinstance(member, ast.ClassDef) and member.name == "Arguments":
+                info["arguments"] = _arguments_schema(member)
+        return info
+
+    return None
+
+
+class ModuleManifest:
+    """
+    Persistent index of all Toolbox Modules, built by static (AST) scanning.
+
+    Entries are keyed by file path and invalidated by mtime and size, so only new or
+    changed files are parsed again. No module is imported while building the index.
+    """
+
+    def __init__(self, path: Optional[str] = None, logger: Optional[Logger] = None):
+        self.path = path or default_manifest_path()
+        self.logger = logger or logging.getLogger("toolbox.manifest")
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return
+
+        if isinstance(data, dict) and data.get("version") == MANIFEST_VERSION:
+            self._files = data.get("files", {})
+
+    def save(self) -> None:
+        """ Writes the index atomically to disk, if anything has changed """
+
+        if not self._dirty:
+            return
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump({"version": MANIFEST_VERSION, "files": self._files}, fh)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            self.logger.debug(f"Manifest {self.path} konnte nicht geschrieben werden: {e}")
+
+    def _scan_file(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """ Returns the (cached) module info of a single file """
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+
+        cached = self._files.get(file_path)
+        if cached and cached.get("mtime") == stat.st_mtime_ns and cached.get("size") == stat.st_size:
+            return cached.get("module")
+
+        try:
+            with open(file_path, "r", encoding="utf-8") as fh:
+                module_info = scan_source(fh.read(), file_path)
+        except (OSError, SyntaxError, ValueError, UnicodeDecodeError) as e:
+            self.logger.error(f"Fehler beim Parsen von {file_path}: {e}")
+            module_info = None
+
+        self._files[file_path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "module": module_info}
+        self._dirty = True
+        return module_info
+
+    def scan(self, package_name: str, package_paths: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Scans the given package paths recursively and yields an entry for every ToolboxModule.
+
+        Args:
+            package_name (str): The fully qualified package name (e.g. "toolbox.builtin").
+            package_paths (list): The filesystem paths of the package (multiple for namespace packages).
+
+        Yields:
+            dict: Module entry with "name", "path", "help" and "arguments".
+        """
+
+        seen = set()
+        for package_path in package_paths:
+            for root, _, files in os.walk(package_path):
+                for file in sorted(files):
+                    if not file.endswith('.py') or file == '__init__.py':
+                        continue
+
+                    file_path = os.path.join(root, file)
+                    seen.add(file_path)
+                    module_info = self._scan_file(file_path)
+                    if module_info is None:
+                        continue
+
+                    rel_dir = os.path.relpath(root, package_path)
+                    module_name = os.path.splitext(file)[0]
+                    if rel_dir == '.':
+                        full_module_name = f"{package_name}.{module_name}"
+                    else:
+                        full_module_name = f"{package_name}.{rel_dir.replace(os.sep, '.')}.{module_name}"
+
+                    yield {"name": full_module_name, "path": file_path, **module_info}
+
+        # Gelöschte Dateien aus dem Index entfernen
+        for package_path in package_paths:
+            prefix = os.path.join(package_path, "")
+            for file_path in [path for path in self._files if path.startswith(prefix) and path not in seen]:
+                del self._files[file_path]
+                self._dirty = True
+
+        self.save()
@@ -0,0 +1,283 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Sekunden, von schnellen Cache-Treffern bis zu langen Inventar-Läufen
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SIZE_BUCKETS = tuple(float(4 ** i * 1024) for i in range(10)) # 1 KiB bis 256 MiB
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric: # pylint: disable=too-few-public-methods
+    """ Base of all metrics: name, help text and label names """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> List[str]:
+        """ Prometheus text format of the metric """
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """ Monotonic counter per label set """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """ Increases the counter of the label set """
+
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        """ Current values per label set """
+
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in sorted(self.values().items())]
+
+
+class Gauge(_Metric):
+    """ Current values, read from a function when the metrics are collected """
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._collect: Optional[Callable[[], Dict[LabelValues, float]]] = None
+
+    def set_function(self, collect: Callable[[], Dict[LabelValues, float]]) -> None:
+        """ Sets the function returning the current value per label set """
+
+        self._collect = collect
+
+    def values(self) -> Dict[LabelValues, float]:
+        """ Current values per label set """
+
+        return dict(self._collect()) if self._collect else {}
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in sorted(self.values().items())]
+
+
+class Histogram(_Metric):
+    """ Distribution of observed values per label set, with cumulative buckets like Prometheus """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Pro Label-Satz: Zähler je Bucket (nicht kumuliert), Summe, Anzahl, Maximum
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """ Records a value for the label set """
+
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [[0] * len(self.buckets), 0.0, 0, value]
+            data[0][index] += 1
+            data[1] += value
+            data[2] += 1
+            data[3] = max(data[3], value)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """ Observes the duration of the with block in seconds """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def summary(self) -> Dict[LabelValues, Dict[str, float]]:
+        """ Count, sum, mean and maximum per label set """
+
+        with self._lock:
+            return {
+                key: {"count": count, "sum": total, "mean": total / count if count else 0.0, "max": maximum}
+                for key, (_, total, count, maximum) in self._values.items()
+            }
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count, _) in self._values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """ Collection of metrics, rendered together for /metrics or summarized for the CLI """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """ Adds a metric, an existing metric with the same name is returned instead """
+
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        """ Creates or returns a counter """
+
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        """ Creates or returns a gauge """
+
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        """ Creates or returns a histogram """
+
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """ All metrics in the Prometheus text exposition format """
+
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> List[str]:
+        """ Human readable lines of all recorded values, for toolbox --stats """
+
+        lines = []
+        for metric in self._metrics.values():
+            if isinstance(metric, Histogram):
+                for key, stats in sorted(metric.summary().items()):
+                    lines.append(
+                        f"{metric.name}{_format_labels(metric.labels, key)}: count={stats['count']} "
+                        f"sum={stats['sum']:.4g} mean={stats['mean']:.4g} max={stats['max']:.4g}"
+                    )
+            else:
+                for key, value in sorted(metric.values().items()):
+                    lines.append(f"{metric.name}{_format_labels(metric.labels, key)}: {_format_value(value)}")
+        return lines
+
+
+registry = MetricsRegistry()
+
+RUN_SECONDS = registry.histogram("toolbox_run_seconds", "Duration of module runs", ("module",))
+RUNS = registry.counter("toolbox_runs_total", "Finished module runs", ("module", "status"))
+PARSE_SECONDS = registry.histogram("toolbox_parse_seconds", "Duration of argument parsing and validation", ("module",))
+SERIALIZE_SECONDS = registry.histogram("toolbox_serialize_seconds", "Duration of output serialization", ("format",))
+OUTPUT_BYTES = registry.histogram("toolbox_output_bytes", "Size of serialized outputs", ("format",), SIZE_BUCKETS)
+CACHE_REQUESTS = registry.counter("toolbox_cache_requests_total", "Result cache lookups by result (hit, stale, miss)", ("cache", "result"))
+CACHE_EVICTIONS = registry.counter("toolbox_cache_evictions_total", "Entries evicted from a cache to make room", ("cache",))
+CACHE_BYTES = registry.gauge("toolbox_cache_bytes", "Bytes held by a memory cache: stored entries and decoded values at their pickled size", ("cache",))
+CACHE_ENTRIES = registry.gauge("toolbox_cache_entries", "Entries in a memory cache", ("cache",))
+IN_FLIGHT = registry.gauge("toolbox_runs_in_flight", "Module runs currently executing", ("module",))
+QUEUED = registry.gauge("toolbox_runs_queued", "Module runs waiting for a free slot", ("module",))
+PREWARMS = registry.counter("toolbox_prewarm_total", "Scheduled cache prewarm runs of web tools", ("tool", "status"))
+
+
+def _status(error: BaseException) -> str:
+    # Ohne Import der Engine: Ablehnungen und Timeouts am Klassennamen erkennen
+    return {"EngineBusy": "rejected", "ExecutionTimeout": "timeout", "CancelledError": "cancelled"}.get(type(error).__name__, "error")
+
+
+@contextmanager
+def track_run(module: str) -> Iterator[None]:
+    """ Observes the duration and the outcome (ok, error, timeout, rejected, cancelled) of a module run """
+
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException as e:
+        status = _status(e)
+        raise
+    finally:
+        RUN_SECONDS.observe(time.perf_counter() - start, module=module)
+        RUNS.inc(module=module, status=status)
+
+
+def iter_measured(chunks: Iterable[Any], fmt: str) -> Iterator[Any]:
+    """
+    Passes rendered chunks through and observes the serialization time and the output size of the format.
+    Only the time spent producing the chunks is measured, not the time the consumer needs.
+    """
+
+    elapsed = 0.0
+    size = 0
+    iterator = iter(chunks)
+    while True:
+        start = time.perf_counter()
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            break
+        finally:
+            elapsed += time.perf_counter() - start
+        size += len(chunk.encode("utf-8")) if isinstance(chunk, str) else len(chunk)
+        yield chunk
+
+    SERIALIZE_SECONDS.observe(elapsed, format=fmt)
+    OUTPUT_BYTES.observe(size, format=fmt)
+
+
+def watch_engine(engine) -> None:
+    """ Reports the running and queued executions of an execution engine in the gauges """
+
+    def _collect(field: str) -> Dict[LabelValues, float]:
+        return {(name, ): stats[field] for name, stats in engine.stats().items()}
+
+    IN_FLIGHT.set_function(lambda: _collect("running"))
+    QUEUED.set_function(lambda: _collect("queued"))
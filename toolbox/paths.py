@@ -0,0 +1,11 @@
+import os
+from typing import Optional
+
+# Config der Toolbox, wenn weder -c noch ein dict angegeben ist
+DEFAULT_CONFIG = "~/.config/toolbox.yaml"
+
+
+def config_path(config: Optional[str]) -> str:
+    """ Absolute path of the config file a Toolbox would load, also for the default (no -c) """
+
+    return os.path.abspath(os.path.expanduser(config or DEFAULT_CONFIG))
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type, Union
+
+from toolbox import formats
+
+if TYPE_CHECKING:
+    from toolbox.base import BaseToolboxModule
+    from toolbox.toolbox import Toolbox
+
+
+class PipelineError(Exception):
+    """ Raised for invalid pipeline definitions """
+
+
+class PipelineStep: # pylint: disable=too-few-public-methods
+    """ A single module run of a pipeline """
+
+    def __init__(self, name: str, module: str, arguments: Union[list, dict, None] = None, needs: Optional[List[str]] = None):
+        self.name = name
+        self.module = module
+        self.arguments = arguments if arguments is not None else {}
+        self.needs = list(needs or [])
+
+
+class Pipeline:
+    """
+    Runs several modules as a DAG inside one Toolbox. The output of a step is passed to the steps
+    that need it as run_data, without serialization. Independent steps run in parallel
+    through the execution engine, only the final output is serialized by the caller.
+
+    Definition (YAML file or dict):
+        help: Windows VMs with their hosts
+        steps:
+          vms:
+            module: vmware.get_vms
+            arguments: {limit: WIN}     # dict or CLI argument list
+          hosts:
+            module: vmware.get_hosts
+          report:
+            module: vmware.report
+            needs: [vms, hosts]         # run_data: {"vms": ..., "hosts": ...}
+        output: report                  # a step name: its output, a list: dict of these steps, default: all steps
+
+    Steps without needs get the input of the pipeline as run_data.
+    """
+
+    def __init__(self, tb: Toolbox, definition: Dict[str, Any], name: str = "pipeline"):
+        self.tb = tb
+        self.name = name
+        self.definition = definition
+        self.help = definition.get('help', f"Pipeline {name}")
+
+        steps = definition.get('steps')
+        if not isinstance(steps, dict) or not steps:
+            raise PipelineError(f"Pipeline {name} has no steps")
+        self.steps: Dict[str, PipelineStep] = {}
+        for step_name, step in steps.items():
+            if not isinstance(step, dict) or not step.get('module'):
+                raise PipelineError(f"Step {step_name} of pipeline {name} has no module")
+            self.steps[step_name] = PipelineStep(step_name, step['module'], step.get('arguments'), step.get('needs'))
+
+        self.output = definition.get('output')
+        output_steps = [self.output] if isinstance(self.output, str) else (self.output or [])
+        for step_name in output_steps + [need for step in self.steps.values() for need in step.needs]:
+            if step_name not in self.steps:
+                raise PipelineError(f"Pipeline {name} references unknown step {step_name}")
+
+        self._check_cycles()
+        self._modules: Optional[Dict[str, Type[BaseToolboxModule]]] = None
+
+    @classmethod
+    def from_file(cls, tb: Toolbox, path: str) -> Pipeline:
+        """ Loads a pipeline definition from a YAML, JSON or MessagePack file """
+
+        import os # pylint: disable=import-outside-toplevel
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        return cls(tb, formats.load(path), name)
+
+    def _check_cycles(self) -> None:
+        from graphlib import CycleError, TopologicalSorter # pylint: disable=import-outside-toplevel
+
+        try:
+            tuple(TopologicalSorter({name: step.needs for name, step in self.steps.items()}).static_order())
+        except CycleError as e:
+            raise PipelineError(f"Pipeline {self.name} contains a cycle: {' -> '.join(e.args[1])}") from e
+
+    def load_modules(self) -> Dict[str, Type[BaseToolboxModule]]:
+        """ Loads the module classes of all steps, once per pipeline """
+
+        if self._modules is not None:
+            return self._modules
+        modules = {}
+        for step in self.steps.values():
+            module_class = self.tb.load_module(step.module)
+            if module_class is None:
+                raise PipelineError(f"Module {step.module} of step {step.name} could not be loaded")
+            modules[step.name] = module_class
+        self._modules = modules
+        return modules
+
+    async def run_async(self, run_data: Optional[Any] = None) -> Any:
+        """ Runs all steps, each as soon as the steps it needs are finished """
+
+        modules = self.load_modules()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_step(step: PipelineStep) -> Any:
+            if step.needs:
+                results = await asyncio.gather(*(tasks[need] for need in step.needs))
+                step_data = dict(zip(step.needs, results))
+            else:
+                step_data = run_data
+            module = self.tb.init_module(modules[step.name], step.arguments)
+            self.tb.logger.debug(f"pipeline {self.name}: running step {step.name}")
+            return await self.tb.execute_async(module, step_data)
+
+        for step in self.steps.values():
+            tasks[step.name] = asyncio.ensure_future(run_step(step))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            # Bei einem Fehler laufende Schritte abbrechen
+            for task in tasks.values():
+                task.cancel()
+
+        if isinstance(self.output, str):
+            return tasks[self.output].result()
+        return {name: tasks[name].result() for name in (self.output or self.steps)}
+
+    def run(self, run_data: Optional[Any] = None) -> Any:
+        """ Runs the pipeline and waits for its output """
+
+        return asyncio.run(self.run_async(run_data))
+
+    def module_class(self) -> Type[BaseToolboxModule]:
+        """
+        Wraps the pipeline as a module class without arguments, so it can be used like a module,
+        e.g. as a tool of the web app. With a single output step the flat and HTML output
+        of that step's module are used.
+        """
+
+        from toolbox.base import BaseToolboxModule # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        pipeline = self
+        modules = self.load_modules()
+        attributes: Dict[str, Any] = {
+            "__module__": f"pipeline.{self.name}",
+            "__doc__": self.help,
+            "HELP": self.help,
+            "VERSION": hashlib.sha256(json.dumps(self.definition, sort_keys=True, default=str).encode("utf-8")).hexdigest(),
+            "CACHEABLE": all(module_class.CACHEABLE for module_class in modules.values()),
+        }
+        if isinstance(self.output, str):
+            output_module = modules[self.output]
+            attributes["OUTPUT_HTML_JINJA2"] = output_module.OUTPUT_HTML_JINJA2
+            attributes["flat_output"] = staticmethod(output_module.flat_output)
+
+        async def run_async(self, run_data: Optional[Any] = None) -> Any: # pylint: disable=unused-argument
+            return await pipeline.run_async(run_data)
+
+        attributes["run_async"] = run_async
+        return type("PipelineModule", (BaseToolboxModule,), attributes)
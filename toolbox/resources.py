@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import importlib
+import logging
+import threading
+import time
+from collections import deque
+from logging import Logger
+from typing import Any, Callable, Deque, Dict, Optional, Union
+
+# Optionen einer Ressource in der Config und ihre Defaults
+DEFAULT_OPTIONS: Dict[str, Any] = {
+    "max_size": 4,          # gleichzeitig geöffnete Clients
+    "max_idle": 300.0,      # Sekunden, danach wird ein unbenutzter Client geschlossen
+    "check_interval": 30.0, # Sekunden Leerlauf, nach denen vor der Ausgabe der Health-Check läuft
+    "timeout": 30.0,        # Sekunden Wartezeit auf einen freien Client, None: unbegrenzt
+}
+
+
+class ResourceError(Exception):
+    """ A resource is unknown, closed or has no free client within its timeout """
+
+
+def resolve(reference: Union[str, Callable, None]) -> Optional[Callable]:
+    """ Resolves "package.module:function" (or "package.module.function") to the callable """
+
+    if reference is None or callable(reference):
+        return reference
+    module_name, sep, attribute = reference.partition(":")
+    if not sep:
+        module_name, _, attribute = reference.rpartition(".")
+    try:
+        return getattr(importlib.import_module(module_name), attribute)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise ResourceError(f"cannot resolve {reference!r}: {e}") from e
+
+
+def close_client(client: Any) -> None:
+    """ Default close: calls client.close() if the client has one """
+
+    close = getattr(client, "close", None)
+    if callable(close):
+        close()
+
+
+class ResourcePool: # pylint: disable=too-many-instance-attributes
+    """
+    Pool of reusable clients of one resource, e.g. logged-in vCenter sessions.
+
+    Idle clients are handed out most recently used first, so surplus clients stay idle and are closed
+    after max_idle seconds. A client idle for more than check_interval seconds is checked before it is
+    handed out, a failing check or an exception discards it and another client is used.
+    """
+
+    def __init__(self, name: str, factory: Callable[[Dict[str, Any]], Any], section: Optional[Dict[str, Any]] = None, # pylint: disable=too-many-arguments
+                 *, close: Optional[Callable[[Any], Any]] = None, check: Optional[Callable[[Any], bool]] = None,
+                 max_size: int = 4, max_idle: float = 300.0, check_interval: float = 30.0, timeout: Optional[float] = 30.0,
+                 logger: Optional[Logger] = None):
+        self.name = name
+        self.factory = factory
+        self.section = section or {}
+        self.close_func = close or close_client
+        self.check = check
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger(f"toolbox.resources.{name}")
+
+        self._cond = threading.Condition()
+        self._idle: Deque[tuple[Any, float]] = deque()
+        self._size = 0
+        self._closed = False
+
+    def stats(self) -> Dict[str, int]:
+        """ Open, idle and used clients """
+
+        with self._cond:
+            return {"size": self._size, "idle": len(self._idle), "in_use": self._size - len(self._idle)}
+
+    def _take(self, deadline: Optional[float]) -> tuple[Any, Optional[float]]:
+        """ An idle client with its release time, or (None, None) with a reserved slot for a new client """
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise ResourceError(f"resource {self.name} is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise ResourceError(f"no {self.name} client available within {self.timeout}s")
+                self._cond.wait(remaining)
+
+    def _healthy(self, client: Any, released: float) -> bool:
+        idle = time.monotonic() - released
+        if idle > self.max_idle:
+            return False
+        if self.check is None or idle < self.check_interval:
+            return True
+        try:
+            return bool(self.check(client))
+        except Exception as e: # pylint: disable=broad-exception-caught
+            self.logger.debug(f"health check failed: {e}")
+            return False
+
+    def _discard(self, client: Any) -> None:
+        try:
+            self.close_func(client)
+        except Exception as e: # pylint: disable=broad-exception-caught
+            self.logger.warning(f"closing a client failed: {e}")
+
+    def acquire(self) -> Any:
+        """
+        Hands out an idle client or creates a new one (the factory is called with the config section).
+
+        Raises:
+            ResourceError: If the pool is closed or all max_size clients stay in use for timeout seconds.
+        """
+
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            client, released = self._take(deadline)
+            if released is None:
+                break
+            if self._healthy(client, released):
+                return client
+            self.logger.debug("discarding stale client")
+            self._discard(client)
+            with self._cond:
+                self._size -= 1
+
+        try:
+            self.logger.debug("opening client")
+            return self.factory(self.section)
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, client: Any, discard: bool = False) -> None:
+        """ Returns a client to the pool, broken clients are closed with ``discard`` """
+
+        with self._cond:
+            if not (discard or self._closed):
+                self._idle.append((client, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(client)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def evict_idle(self) -> int:
+        """ Closes the clients idle for more than max_idle seconds, returns their number """
+
+        threshold = time.monotonic() - self.max_idle
+        with self._cond:
+            expired = [client for client, released in self._idle if released < threshold]
+            if not expired:
+                return 0
+            self._idle = deque((client, released) for client, released in self._idle if released >= threshold)
+            self._size -= len(expired)
+            self._cond.notify_all()
+        for client in expired:
+            self._discard(client)
+        self.logger.debug(f"closed {len(expired)} idle client(s)")
+        return len(expired)
+
+    def close(self) -> None:
+        """ Closes the idle clients, clients in use are closed when they are released """
+
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for client, _ in idle:
+            self._discard(client)
+
+
+class ResourceRegistry: # pylint: disable=too-many-instance-attributes
+    """
+    Shared clients (HTTP sessions, DB/LDAP connections, ...) for modules, pooled per Toolbox instance,
+    so logins and TLS handshakes are not repeated for every run. A factory is declared per resource and
+    called with the config section of the same name; modules get their clients with self.resources.get(name).
+
+    Config (section "resources" of the toolbox config, options see DEFAULT_OPTIONS):
+        resources:
+          vmware:
+            factory: toolbox_modules.vmware.client:connect   # factory(config["vmware"]) -> client
+            section: vmware      # config section passed to the factory, default: the resource name
+            close: toolbox_modules.vmware.client:disconnect   # default: client.close()
+            check: toolbox_modules.vmware.client:is_alive     # health check, returns False for broken clients
+            max_size: 4
+            max_idle: 300
+
+    In process mode of the execution engine the registry is copied into the worker without its clients,
+    there a run opens its own clients and closes them afterwards.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, logger: Optional[Logger] = None, detached: bool = False):
+        self.config = config or {}
+        self.logger = logger or logging.getLogger("toolbox.resources")
+        # detached: keine gemeinsame Nutzung, Clients werden nach jedem Lauf geschlossen
+        self.detached = detached
+        self._definitions: Dict[str, Dict[str, Any]] = {}
+        self._pools: Dict[str, ResourcePool] = {}
+        self._lock = threading.Lock()
+        self._stop: Optional[threading.Event] = None
+        self._closed = False
+
+    def register(self, name: str, factory: Union[str, Callable[[Dict[str, Any]], Any]], **options: Any) -> None:
+        """ Declares a resource in code, options as in the config (section, close, check, max_size, ...) """
+
+        with self._lock:
+            if name in self._pools:
+                raise ResourceError(f"resource {name} is already in use")
+            self._definitions[name] = {**options, "factory": factory}
+
+    def definition(self, name: str) -> Dict[str, Any]:
+        """ Declaration of a resource, registered in code or from the "resources" config section """
+
+        definition = self._definitions.get(name) or self.config.get("resources", {}).get(name)
+        if not definition or not definition.get("factory"):
+            raise ResourceError(f"unknown resource {name}, declare it with a factory in the resources config")
+        return definition
+
+    def pool(self, name: str) -> ResourcePool:
+        """ The pool of a resource, created on first use """
+
+        with self._lock:
+            if self._closed:
+                raise ResourceError("resources are closed")
+            pool = self._pools.get(name)
+            if pool is None:
+                definition = self.definition(name)
+                options = {key: definition.get(key, default) for key, default in DEFAULT_OPTIONS.items()}
+                pool = self._pools[name] = ResourcePool(
+                    name,
+                    resolve(definition["factory"]),
+                    self.config.get(definition.get("section", name), {}),
+                    close=resolve(definition.get("close")),
+                    check=resolve(definition.get("check")),
+                    logger=self.logger.getChild(name),
+                    **options,
+                )
+            return pool
+
+    def lease(self) -> ResourceLease:
+        """ A lease for one module run, see ResourceLease """
+
+        return ResourceLease(self)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """ Open, idle and used clients per resource """
+
+        with self._lock:
+            pools = dict(self._pools)
+        return {name: pool.stats() for name, pool in pools.items()}
+
+    def evict_idle(self) -> int:
+        """ Closes the idle clients of all resources which exceeded their max_idle """
+
+        with self._lock:
+            pools = list(self._pools.values())
+        return sum(pool.evict_idle() for pool in pools)
+
+    def start(self, interval: float = 30.0) -> None:
+        """ Starts a background thread, which closes idle clients every ``interval`` seconds """
+
+        with self._lock:
+            if self._stop is not None:
+                return
+            stop = self._stop = threading.Event()
+
+        def _evict():
+            while not stop.wait(interval):
+                try:
+                    self.evict_idle()
+                except Exception as e: # pylint: disable=broad-exception-caught
+                    self.logger.error(f"idle eviction failed: {e}")
+
+        threading.Thread(target=_evict, name="toolbox-resources", daemon=True).start()
+
+    def close(self) -> None:
+        """ Stops the eviction thread and closes all pools """
+
+        with self._lock:
+            self._closed = True
+            pools, self._pools = list(self._pools.values()), {}
+            if self._stop is not None:
+                self._stop.set()
+                self._stop = None
+        for pool in pools:
+            pool.close()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Für Läufe in Worker-Prozessen: nur die Deklarationen, Clients und Locks bleiben im Prozess
+        return {"config": self.config, "definitions": self._definitions}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["config"], detached=True)
+        self._definitions = state["definitions"]
+
+
+class ResourceLease:
+    """
+    The clients of one module run (``self.resources`` of the module): get returns the same client for
+    every call during the run, all clients go back to their pools when the run is finished.
+    """
+
+    def __init__(self, registry: ResourceRegistry):
+        self.registry = registry
+        self._clients: Dict[str, tuple[ResourcePool, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"registry": self.registry}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["registry"])
+
+    def get(self, name: str) -> Any:
+        """
+        Returns a client of the resource ``name``, blocks while all clients are in use.
+
+        Raises:
+            ResourceError: If the resource is not declared or no client becomes available.
+        """
+
+        with self._lock:
+            if name not in self._clients:
+                pool = self.registry.pool(name)
+                self._clients[name] = (pool, pool.acquire())
+            return self._clients[name][1]
+
+    async def get_async(self, name: str) -> Any:
+        """ get for run_async, waiting for a client and opening it don't block the event loop """
+
+        import asyncio # pylint: disable=import-outside-toplevel
+
+        if name in self._clients:
+            return self._clients[name][1]
+        return await asyncio.to_thread(self.get, name)
+
+    def discard(self, name: str) -> None:
+        """ Closes the client of ``name`` instead of returning it, e.g. after a connection error """
+
+        with self._lock:
+            leased = self._clients.pop(name, None)
+        if leased is not None:
+            pool, client = leased
+            pool.release(client, discard=True)
+
+    def release(self) -> None:
+        """ Returns all clients of the run to their pools """
+
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for pool, client in clients.values():
+            pool.release(client)
+        if self.registry.detached:
+            self.registry.close()
+
+
+def run_leased(lease: ResourceLease, func: Callable, *args: Any) -> Any:
+    """ Calls func(*args) and releases the clients of the lease afterwards, also in a worker process """
+
+    try:
+        return func(*args)
+    finally:
+        lease.release()
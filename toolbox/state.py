@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from toolbox.base import BaseToolboxModule
+
+
+def default_state_path() -> str:
+    """ Default directory of the incremental run states (XDG state dir) """
+
+    state_home = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(state_home, "toolbox", "incremental")
+
+
+class StateStore:
+    """
+    Persistent state of incremental modules: the cursor of the last run and the merged snapshot,
+    one JSON file per module and argument set (keyed by the module's cache key, so a new module version
+    or a changed config starts with a full run). Files are replaced atomically.
+
+    Config (section "toolbox" of the toolbox config):
+        toolbox:
+          state_path: ~/.local/state/toolbox/incremental
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = os.path.expanduser(path or default_state_path())
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _file(self, module: str, key: str) -> str:
+        return os.path.join(self.path, module, f"{key}.json")
+
+    def lock(self, key: str) -> threading.Lock:
+        """ Lock of an argument set, incremental runs of the same state take place one after another """
+
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def load(self, module: str, key: str) -> Optional[Dict[str, Any]]:
+        """ Returns the stored state (cursor, snapshot, updated) or None """
+
+        try:
+            with open(self._file(module, key), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, module: str, key: str, cursor: Any, snapshot: Any) -> None:
+        """ Stores cursor and snapshot of an argument set """
+
+        file_path = self._file(module, key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump({"cursor": cursor, "snapshot": snapshot, "updated": time.time()}, fh, default=str)
+        os.replace(tmp_path, file_path)
+
+    def delete(self, module: str, key: str) -> None:
+        """ Removes the state, the next run is a full run """
+
+        try:
+            os.remove(self._file(module, key))
+        except FileNotFoundError:
+            pass
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Für Läufe in Worker-Prozessen: Locks gelten nur im eigenen Prozess
+        return {"path": self.path}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["path"])
+
+
+def run_incremental(module: BaseToolboxModule, store: StateStore, name: str, key: str, run_data: Optional[Any] = None, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                    full: bool = False) -> Any:
+    """
+    Runs an incremental module: passes the cursor of the previous run to run_incremental,
+    merges the changes into the previous snapshot and stores the new cursor and snapshot.
+    Without a previous state or with ``full`` the module gets no cursor and returns everything.
+
+    Returns:
+        The merged snapshot, identical to the output of a full run.
+    """
+
+    with store.lock(key):
+        state = None if full else store.load(name, key)
+        cursor = state.get("cursor") if state else None
+
+        changes = module.run_incremental(run_data, cursor)
+        if state is None or changes.full:
+            snapshot = module.merge_changes(None, changes)
+            module.logger.debug(f"full run, {len(changes.records)} records")
+        else:
+            snapshot = module.merge_changes(state.get("snapshot"), changes)
+            module.logger.debug(f"incremental run since {cursor!r}: {len(changes.records)} changed, {len(changes.deleted)} deleted")
+
+        store.save(name, key, changes.cursor, snapshot)
+    return snapshot
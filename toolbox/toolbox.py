@@ -1,16 +1,24 @@
-import argparse
+from __future__ import annotations
+
 import importlib
 import importlib.util
 import logging
 import os
 
 import sys
-import inspect
-from typing import Type, Optional, Union
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Type, Optional, Union
 
-import yaml
+from toolbox import formats, metrics
+from toolbox.paths import DEFAULT_CONFIG
+from toolbox.manifest import ModuleManifest
 
-from toolbox.base import BaseToolboxModule
+# pydantic, argparse und inspect werden erst geladen, wenn ein Modul ausgeführt wird
+if TYPE_CHECKING:
+    from toolbox.base import BaseToolboxModule, ConfigModel
+    from toolbox.engine import ExecutionEngine
+    from toolbox.resources import ResourceRegistry
+    from toolbox.state import StateStore
 
 class Toolbox:
 
@@ -39,13 +47,13 @@ class Toolbox:
 
         # Load configuration
         if config is None:
-            config = os.path.expanduser("~/.config/toolbox.yaml")
+            config = os.path.expanduser(DEFAULT_CONFIG)
 
         if isinstance(config, str):
             if not os.path.exists(config):
                 raise FileNotFoundError(f"Configuration file {config} does not exist.")
             with open(config, "r", encoding="utf-8") as fh:
-                if loaded_config := yaml.safe_load(fh):
+                if loaded_config := formats.yaml_load(fh):
                     self.config.update(loaded_config)
 
         elif isinstance(config, dict):
@@ -57,11 +65,13 @@ class Toolbox:
         self.logger = logging.getLogger("toolbox")
 
         self.logger.setLevel(logging.DEBUG if verbose else logging.INFO)
-        formatter = logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
-        handler = logging.StreamHandler(sys.stderr)
-        handler.setFormatter(formatter)
-
-        self.logger.addHandler(handler)
+        # Nur einen Handler anhängen, weitere Instanzen würden sonst jede Logzeile mehrfach ausgeben
+        if not any(handler.get_name() == "toolbox" for handler in self.logger.handlers):
+            formatter = logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+            handler = logging.StreamHandler(sys.stderr)
+            handler.set_name("toolbox")
+            handler.setFormatter(formatter)
+            self.logger.addHandler(handler)
 
         # # Load Search Paths
         search_paths = self.config.get("toolbox", {}).get("module_search_paths", [])
@@ -72,30 +82,43 @@ class Toolbox:
             self.logger.debug(f"add search path: {base_path}")
             sys.path.insert(0, base_path)
 
+        self._manifest: Optional[ModuleManifest] = None
+        self._engine: Optional[ExecutionEngine] = None
+        self._state_store: Optional[StateStore] = None
+        self._resources: Optional[ResourceRegistry] = None
+
         self.logger.info("Toolbox initialized")
 
-    def load_module(self, module_name: str) -> Type[BaseToolboxModule]|None:
+    def load_module(self, module_name: str, reload: bool = False) -> Type[BaseToolboxModule]|None:
         """
         Loads a module by its fully qualified name.
 
         Args:
             module_name (str): The fully qualified name of the module to be loaded.
+            reload (bool, optional): Re-executes an already imported module, e.g. after its file changed. Defaults to False.
 
         Returns:
             Type[BaseToolboxModule]: The class object of the loaded module.
         """
 
+        import inspect # pylint: disable=import-outside-toplevel
+        from toolbox.base import BaseToolboxModule # pylint: disable=import-outside-toplevel,redefined-outer-name
+
         package_name, module = module_name.split(".", 1)
         prefix = "toolbox"
 
         if package_name != "builtin":
             prefix = "toolbox_modules"
-            importlib.import_module(f"{prefix}.{package_name}")
 
         try:
+            if prefix == "toolbox_modules":
+                importlib.import_module(f"{prefix}.{package_name}")
             full_module_name = f"{prefix}.{package_name}.{module}"
             self.logger.debug(f"loading {full_module_name}")
-            module = importlib.import_module(full_module_name)
+            if reload and full_module_name in sys.modules:
+                module = importlib.reload(sys.modules[full_module_name])
+            else:
+                module = importlib.import_module(full_module_name)
         except ImportError as e:
             self.logger.error(f"Error loading module {module_name}: {e}")
             return None
@@ -107,10 +130,12 @@ class Toolbox:
         self.logger.error(f"No ToolboxModule class found in module {module_name}")
         return None
 
-    def init_module(self, module_class: Type[BaseToolboxModule], arguments: list | dict) -> BaseToolboxModule:
+    def init_module(self, module_class: Type[BaseToolboxModule], arguments: list | dict | ConfigModel) -> BaseToolboxModule:
         """ Initalizes a Module with specified args, for reusability of the toolbox instance """
+        import argparse # pylint: disable=import-outside-toplevel
 
-        command = module_class.__module__.removeprefix("toolbox.").removeprefix("toolbox_modules.")
+        command = self.module_name(module_class)
+        start = time.perf_counter()
         if isinstance(arguments, list):
             argparser = argparse.ArgumentParser(prog=command, description=module_class.HELP)
             module_class.update_parser(argparser)
@@ -119,18 +144,165 @@ class Toolbox:
 
         elif isinstance(arguments, dict):
             parsed_args = module_class.Arguments.model_validate(arguments)
+        elif isinstance(arguments, module_class.Arguments):
+            parsed_args = arguments
         else:
-            raise ValueError("Invalid arguments type. Must be list or dict.")
+            raise ValueError("Invalid arguments type. Must be list, dict or the module's Arguments.")
+        if parsed_args is not arguments:
+            metrics.PARSE_SECONDS.observe(time.perf_counter() - start, module=command)
 
         self.logger.debug(f"Arguments: {parsed_args}")
 
         # Initialize module
-        module = module_class(args=parsed_args, config=self.config, logger=self.logger.getChild(command))
+        module = module_class(args=parsed_args, config=self.config, logger=self.logger.getChild(command), resources=self.resources.lease())
 
         return module
 
-    def list_modules(self, package_name: str): # pylint: disable=too-many-locals,too-many-branches
-        """ Get all Toolbox Modules from given package retruns a generator with strings """
+    @property
+    def manifest(self) -> ModuleManifest:
+        """ The persistent module index, created on first use """
+
+        if self._manifest is None:
+            self._manifest = ModuleManifest(self.config.get("toolbox", {}).get("manifest_path"), self.logger.getChild("manifest"))
+        return self._manifest
+
+    @property
+    def engine(self) -> ExecutionEngine:
+        """ The execution engine for module runs, created on first use from the "engine" config section """
+
+        if self._engine is None:
+            from toolbox.engine import ExecutionEngine # pylint: disable=import-outside-toplevel,redefined-outer-name
+            self._engine = ExecutionEngine(self.config.get("engine", {}), self.logger.getChild("engine"))
+            metrics.watch_engine(self._engine)
+        return self._engine
+
+    @property
+    def state_store(self) -> StateStore:
+        """ The store of the incremental run states, created on first use """
+
+        if self._state_store is None:
+            from toolbox.state import StateStore # pylint: disable=import-outside-toplevel,redefined-outer-name
+            self._state_store = StateStore(self.config.get("toolbox", {}).get("state_path"))
+        return self._state_store
+
+    @property
+    def resources(self) -> ResourceRegistry:
+        """ The pooled clients shared by the modules, created on first use from the "resources" config section """
+
+        if self._resources is None:
+            from toolbox.resources import ResourceRegistry # pylint: disable=import-outside-toplevel,redefined-outer-name
+            self._resources = ResourceRegistry(self.config, self.logger.getChild("resources"))
+        return self._resources
+
+    def close(self) -> None:
+        """ Closes the pooled clients and stops the execution engine, both are created again on next use """
+
+        if self._resources is not None:
+            self._resources.close()
+            self._resources = None
+        if self._engine is not None:
+            self._engine.shutdown()
+            self._engine = None
+
+    @staticmethod
+    def module_name(module_class: Type[BaseToolboxModule]) -> str:
+        """ Returns the toolbox name of a module class, e.g. "builtin.sample" """
+
+        return module_class.__module__.removeprefix("toolbox.").removeprefix("toolbox_modules.")
+
+    def _run_call(self, module: BaseToolboxModule, run_data: Optional[Any], full: bool) -> tuple:
+        """
+        Function and arguments of a synchronous run, incremental modules run with their stored state.
+        The clients of the module's resources are released after the run, also in a worker process.
+        """
+
+        from toolbox.resources import run_leased # pylint: disable=import-outside-toplevel
+
+        if module.has_incremental_run():
+            from toolbox.state import run_incremental # pylint: disable=import-outside-toplevel
+            name = self.module_name(module.__class__)
+            key = module.cache_key(module.args, self.config)
+            return run_leased, (module.resources, run_incremental, module, self.state_store, name, key, run_data, full)
+        return run_leased, (module.resources, module.run, run_data)
+
+    def execute(self, module: BaseToolboxModule, run_data: Optional[Any] = None, full: bool = False) -> Any:
+        """
+        Runs an initialized module through the execution engine and waits for the result.
+        Incremental modules only fetch the changes since their last run, unless ``full`` is set.
+        """
+
+        if module.has_async_run():
+            import asyncio # pylint: disable=import-outside-toplevel
+            return asyncio.run(self.execute_async(module, run_data, full))
+        name = self.module_name(module.__class__)
+        with metrics.track_run(name):
+            func, args = self._run_call(module, run_data, full)
+            # Lazy Eingaben lesen aus offenen Dateien und laufen daher immer im eigenen Prozess
+            return self.engine.run(name, func, *args, local=isinstance(run_data, Iterator))
+
+    async def execute_async(self, module: BaseToolboxModule, run_data: Optional[Any] = None, full: bool = False) -> Any:
+        """
+        Runs an initialized module without blocking the event loop: run_async is awaited
+        directly, synchronous modules are awaited while they run in the execution engine.
+        """
+
+        import asyncio # pylint: disable=import-outside-toplevel
+
+        name = self.module_name(module.__class__)
+        with metrics.track_run(name):
+            if module.has_async_run():
+                try:
+                    return await self.engine.run_async(name, module.run_async, run_data)
+                finally:
+                    module.resources.release()
+            func, args = self._run_call(module, run_data, full)
+            return await asyncio.wrap_future(self.engine.submit(name, func, *args, local=isinstance(run_data, Iterator)))
+
+    def execute_many(self, modules: list[BaseToolboxModule], run_data: Optional[Any] = None, max_concurrency: Optional[int] = None,
+                     full: bool = False) -> list[dict]:
+        """ Runs several initialized modules concurrently and waits for all of them, see execute_many_async """
+
+        import asyncio # pylint: disable=import-outside-toplevel
+        return asyncio.run(self.execute_many_async(modules, run_data, max_concurrency, full))
+
+    async def execute_many_async(self, modules: list[BaseToolboxModule], run_data: Optional[Any] = None,
+                                 max_concurrency: Optional[int] = None, full: bool = False) -> list[dict]:
+        """
+        Runs several initialized modules concurrently, at most max_concurrency at a time
+        (default: the engine's cap for the module). Errors are captured per module.
+        max_concurrency is limited to the runs the engine accepts, further modules wait instead of being rejected.
+
+        Returns:
+            list: One dict per module in the given order, with its arguments and either "output" or "error".
+        """
+
+        import asyncio # pylint: disable=import-outside-toplevel
+
+        if not modules:
+            return []
+        module_class = modules[0].__class__
+        name, is_async = self.module_name(module_class), module_class.has_async_run()
+        if max_concurrency is None:
+            max_concurrency = self.engine.max_concurrency(name, is_async)
+        semaphore = asyncio.Semaphore(max(1, min(max_concurrency, self.engine.capacity(name, is_async))))
+
+        async def _execute(module: BaseToolboxModule) -> dict:
+            result: Dict[str, Any] = {"arguments": module.args.model_dump(mode="json")}
+            async with semaphore:
+                try:
+                    result["output"] = await self.execute_async(module, run_data, full)
+                except Exception as e: # pylint: disable=broad-exception-caught
+                    self.logger.error(f"{self.module_name(module.__class__)} failed for {result['arguments']}: {e}")
+                    result["error"] = f"{type(e).__name__}: {e}"
+            return result
+
+        return list(await asyncio.gather(*(_execute(module) for module in modules)))
+
+    def find_modules(self, package_name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Get the manifest entries (name, help, arguments) of all Toolbox Modules from given package.
+        The package is located without being imported, the modules are scanned statically.
+        """
         prefix = "toolbox"
 
         if package_name != "builtin":
@@ -141,53 +313,60 @@ class Toolbox:
             full_package_name = package_name
 
         try:
-            package = importlib.import_module(full_package_name)
+            spec = importlib.util.find_spec(full_package_name)
         except Exception as e: # pylint: disable=broad-exception-caught
             self.logger.error(f"Fehler beim Import von {full_package_name}: {e}")
             return
 
-        if not hasattr(package, '__path__'):
+        if spec is None:
+            self.logger.error(f"Fehler beim Import von {full_package_name}: Paket nicht gefunden")
+            return
+
+        if not spec.submodule_search_locations:
             self.logger.warning(f"{full_package_name} besitzt kein __path__-Attribut und kann daher nicht rekursiv durchsucht werden.")
             return
 
         # Iteriere über alle Pfade des Pakets (funktioniert auch bei Namespace-Paketen)
-        for package_path in package.__path__: # pylint: disable=too-many-nested-blocks
-            for root, _, files in os.walk(package_path):
-                for file in files:
-                    if file.endswith('.py') and file != '__init__.py':
-                        # Erstelle den Modulnamen basierend auf dem relativen Pfad
-                        rel_dir = os.path.relpath(root, package_path)
-                        module_name = os.path.splitext(file)[0]
-                        if rel_dir == '.':
-                            full_module_name = f"{package.__name__}.{module_name}"
-                        else:
-                            full_module_name = f"{package.__name__}.{rel_dir.replace(os.sep, '.')}.{module_name}"
-                        try:
-                            mod = importlib.import_module(full_module_name)
-                        except Exception as e: # pylint: disable=broad-exception-caught
-                            self.logger.error(f"Fehler beim Import des Moduls {full_module_name}: {e}")
-                            continue
-
-                        # Prüfe, ob im Modul eine Klasse namens ToolboxModule existiert
-                        for member_name, _ in inspect.getmembers(mod, inspect.isclass):
-                            if member_name == "ToolboxModule":
-                                full_module_name = full_module_name.removeprefix("toolbox_modules.")
-                                full_module_name = full_module_name.removeprefix("toolbox.")
-                                self.logger.info(f"{full_module_name}")
-                                yield full_module_name
-
-    def run(self, command: str, arguments: list | dict, input: Optional[str] = None, output: Optional[str] = None, summation: bool = False): # pylint: disable=redefined-builtin, too-many-arguments, too-many-positional-arguments
+        for entry in self.manifest.scan(full_package_name, list(spec.submodule_search_locations)):
+            entry["name"] = entry["name"].removeprefix("toolbox_modules.").removeprefix("toolbox.")
+            yield entry
+
+    def module_info(self, module_name: str) -> Optional[Dict[str, Any]]:
+        """ Returns the manifest entry of a single module without importing it """
+
+        package_name = module_name.split(".", 1)[0]
+        for entry in self.find_modules(package_name):
+            if entry["name"] == module_name:
+                return entry
+        return None
+
+    def list_modules(self, package_name: str):
+        """ Get all Toolbox Modules from given package retruns a generator with strings """
+
+        for entry in self.find_modules(package_name):
+            self.logger.info(f"{entry['name']}")
+            yield entry["name"]
+
+    def run(self, command: str, arguments: list | dict, input: Optional[str] = None, output: Optional[str] = None, # pylint: disable=redefined-builtin, too-many-arguments, too-many-positional-arguments
+            summation: bool = False, format: Optional[str] = None, full: bool = False): # pylint: disable=redefined-builtin
         """
         Executes a command with the specified arguments.
 
         Args:
             command (str): The CLI command to be executed.
             arguments (list | dict): A list or dictionary of arguments to be passed to the command.
-            input (str, optional): The input to be provided to the command. Can be None, '-' for stdin, or a path to a YAML file. Defaults to None.
-            output (str, optional): The output to be captured from the command. Can be None, '-' for stdout or a path to a YAML file. Defaults to None.
+            input (str, optional): The input to be provided to the command. Can be None, '-' for stdin, or a path to a YAML, JSON
+                or MessagePack file. Defaults to None.
+            output (str, optional): The output to be captured from the command. Can be None, '-' for stdout or a path to a YAML, JSON
+                or MessagePack file. Defaults to None.
+            format (str, optional): Format (yaml, json, ndjson, msgpack) of the output and of stdin. Defaults to the format matching
+                the file extension or yaml, input files are read in the format of their extension.
+            full (bool, optional): Incremental modules fetch everything instead of the changes since their last run. Defaults to False.
 
         Returns:
-            dict: A dictionary containing the module's output.
+            dict: A dictionary containing the module's output. Modules with iter_records, which are streamed
+            to an output, return {command: number of written records} instead. Their YAML output is the same
+            document as that of other modules, NDJSON and MessagePack are written as streams of the records.
         """
 
         if len(command.split('.')) == 1:
@@ -199,38 +378,163 @@ class Toolbox:
             return {} # Todo: raise exception or something
 
         module = self.init_module(module_class, arguments)
+        input_data, output_data = self._read_input(input, summation, format, stream=module_class.STREAM_INPUT)
+        output_format = formats.detect_format(output, format)
+
+        # Streaming: Records direkt schreiben, statt das komplette Ergebnis im Speicher zu halten
+        if module.has_iter_records() and output is not None and not summation and output_format in formats.STREAMING_FORMATS:
+            return {command: self.stream(module, input_data, output, output_format, key=command)}
+
+        # Process
+        output_data[command] = self.execute(module, input_data, full)
+        # output_data = {command: module.run(input_data)}
+
+        # Send Output
+        if output is not None:
+            formats.dump(output_data, output, output_format)
+
+        return output_data
+
+    def run_many(self, command: str, arguments_list: list[list | dict], input: Optional[str] = None, output: Optional[str] = None, # pylint: disable=redefined-builtin, too-many-arguments, too-many-positional-arguments, too-many-locals
+                 summation: bool = False, format: Optional[str] = None, max_concurrency: Optional[int] = None, # pylint: disable=redefined-builtin
+                 full: bool = False):
+        """
+        Executes a module once per argument set (batch mode). The module is loaded once and all
+        arguments are validated before the first run, the runs take place concurrently.
+
+        Args:
+            command (str): The module to be executed.
+            arguments_list (list): Argument sets, each a list or dictionary as for run.
+            input, output, summation, format, full: As for run, the input is passed to every run.
+            max_concurrency (int, optional): Parallel runs, defaults to the engine's cap for the module.
+
+        Returns:
+            dict: A dictionary with a list of results under the command, see execute_many_async.
+            Failed runs contain an "error" instead of an "output" and do not abort the batch.
+        """
+
+        module_class = self.load_module(command)
+        if module_class is None:
+            return {}
+
+        modules = []
+        for index, arguments in enumerate(arguments_list):
+            try:
+                modules.append(self.init_module(module_class, arguments))
+            except ValueError as e:
+                raise ValueError(f"Invalid arguments in batch item {index}: {e}") from e
+
+        input_data, output_data = self._read_input(input, summation, format)
+        output_data[command] = self.execute_many(modules, input_data, max_concurrency, full)
+
+        if output is not None:
+            formats.dump(output_data, output, formats.detect_format(output, format))
+
+        return output_data
+
+    def run_pipeline(self, pipeline: str | dict, input: Optional[str] = None, output: Optional[str] = None, # pylint: disable=redefined-builtin, too-many-arguments, too-many-positional-arguments
+                     summation: bool = False, format: Optional[str] = None): # pylint: disable=redefined-builtin
+        """
+        Executes a pipeline of modules (see toolbox.pipeline.Pipeline) in this process.
+        Outputs are passed between the steps as Python objects, only the final output is serialized.
+
+        Args:
+            pipeline (str | dict): Path to a pipeline definition or the definition itself.
+            input, output, summation, format: As for run.
+
+        Returns:
+            dict: A dictionary containing the pipeline's output under its name.
+        """
+
+        from toolbox.pipeline import Pipeline # pylint: disable=import-outside-toplevel
+
+        pipeline_obj = Pipeline(self, pipeline) if isinstance(pipeline, dict) else Pipeline.from_file(self, pipeline)
+        input_data, output_data = self._read_input(input, summation, format)
 
+        output_data[pipeline_obj.name] = pipeline_obj.run(input_data)
+
+        if output is not None:
+            formats.dump(output_data, output, formats.detect_format(output, format))
+
+        return output_data
+
+    def _read_input(self, input: Optional[str], summation: bool, format: Optional[str] = None, # pylint: disable=redefined-builtin
+                    stream: bool = False) -> tuple[Any, dict]:
+        """
+        Reads the module input and the output of previous modules (summation), stdin in the given format.
+        With ``stream`` the input is returned as lazy iterator over its records (see formats.iter_load),
+        unless stdin is needed completely for the summation.
+        """
+
+        stdin_format = formats.detect_format(None, format)
         stdin_read = False
         # Get Input
         if input is not None:
+            input_format = stdin_format if input == '-' else formats.detect_format(input, None, stdin_format)
             if input == '-':
                 stdin_read = True
-                input_data = yaml.safe_load(sys.stdin.read())
+            if stream and not (summation and stdin_read):
+                input_data = formats.iter_load(input, input_format)
             else:
-                with open(input, "r", encoding="utf-8") as fh:
-                    input_data = yaml.safe_load(fh)
+                input_data = formats.load(input, input_format)
         else:
             input_data = None
 
         output_data = {}
         if summation:
-            if stdin_read and isinstance(input_data, dict):
-                output_data = input_data
+            if stdin_read:
+                # stdin ist bereits gelesen und lässt sich kein zweites Mal lesen
+                output_data = input_data if isinstance(input_data, dict) else {}
             else:
-                output_data = yaml.safe_load(sys.stdin.read())
+                output_data = formats.load('-', stdin_format) or {}
+                if not isinstance(output_data, dict):
+                    raise ValueError("--summation needs the output of a previous run as YAML, JSON or MessagePack document, "
+                                     "not a stream of records")
 
-        # Process
-        output_data[command] = module.run(input_data)
-        # output_data = {command: module.run(input_data)}
+        return input_data, output_data
 
-        # Send Output
-        output_yaml = yaml.dump(output_data, allow_unicode=True, default_flow_style=False)
+    def stream(self, module: BaseToolboxModule, run_data: Optional[Any], output: str, output_format: str = "yaml", # pylint: disable=too-many-arguments,too-many-positional-arguments
+               key: Optional[str] = None) -> int:
+        """
+        Writes the records of a streaming module (iter_records) incrementally to stdout ('-') or a file.
+        With ``key`` YAML output is the list of records under that key (see formats.write_records).
 
-        if output is not None:
+        Returns:
+            int: Number of written records.
+        """
+
+        def _write(stream):
+            try:
+                return formats.write_records(module.iter_records(run_data), stream, output_format, key=key)
+            finally:
+                module.resources.release()
+
+        # Läuft immer in einem Thread des Prozesses, da in eine offene Datei geschrieben wird
+        name = self.module_name(module.__class__)
+        binary = formats.is_binary(output_format)
+        with metrics.track_run(name):
             if output == '-':
-                print(output_yaml)
-            else:
-                with open(output, 'w', encoding="utf-8") as file:
-                    file.write(output_yaml)
+                if binary:
+                    sys.stdout.flush()
+                return self.engine.run(name, _write, sys.stdout.buffer if binary else sys.stdout, local=True)
+            with open(output, 'wb' if binary else 'w', encoding=None if binary else "utf-8") as fh:
+                return self.engine.run(name, _write, fh, local=True)
 
-        return output_data
+    def iter_run(self, command: str, arguments: list | dict, run_data: Optional[Any] = None) -> Iterator[Any]:
+        """
+        Python API for streaming modules: yields the records of the module one by one.
+        Modules without iter_records yield their complete result once.
+        """
+
+        module_class = self.load_module(command)
+        if module_class is None:
+            return
+
+        module = self.init_module(module_class, arguments)
+        if module.has_iter_records():
+            try:
+                yield from module.iter_records(run_data)
+            finally:
+                module.resources.release()
+        else:
+            yield self.execute(module, run_data)
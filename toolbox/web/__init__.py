@@ -1,45 +1,91 @@
 from contextlib import asynccontextmanager
 from pathlib import Path
 import importlib.metadata
-from functools import lru_cache
-from io import BytesIO
 import io
+import logging
 import os
 import csv
-from typing import Dict, Any, List
-
-from fastapi import FastAPI, Request, Response
-from fastapi.responses import HTMLResponse, JSONResponse
+import hashlib
+import json
+import tempfile
+import zlib
+from typing import Dict, Any, Callable, Iterable, Iterator, List, NamedTuple, Optional
+from urllib.parse import urlencode
+
+from fastapi import Depends, FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.routing import Mount
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 
-from jinja2 import Template
-from openpyxl import Workbook
-
-from cachetools import TTLCache
-from pydantic import BaseModel
-import uvicorn
-import yaml
 import toolbox
-
-func_cache = TTLCache(ttl=3600, maxsize=8000)
+from toolbox import formats, metrics
+from toolbox.engine import EngineBusy, ExecutionError, ExecutionTimeout
+from toolbox.web.cache import ArtifactCache, ResultCache
+from toolbox.web.jobs import Job, JobNotFound, JobQueue
+from toolbox.web.prewarm import PrewarmScheduler
+from toolbox.web.render import TemplateRegistry
+from toolbox.web.table import ResultTable, TableCache
+from toolbox.web.tools import ResolvedTool, ToolNotFound, ToolRegistry
+
+func_cache = ResultCache(ttl=3600, maxsize=8000)
+artifact_cache = ArtifactCache()
+table_cache = TableCache()
+template_registry = TemplateRegistry()
+job_queue = JobQueue()
+prewarm_scheduler = PrewarmScheduler()
 
 #pylint: disable = missing-function-docstring
 
+logger = logging.getLogger("toolbox.web")
+
 tb = None # pylint: disable=invalid-name
+tools: ToolRegistry = None # pylint: disable=invalid-name
 web_config = {}
+module_index = {}
 
 @asynccontextmanager
 async def lifespan(app: FastAPI): # pylint: disable=redefined-outer-name,unused-argument
-    global tb, web_config # pylint: disable=global-statement
+    global tb, tools, web_config, module_index # pylint: disable=global-statement
 
     if not tb:
 
         tb = toolbox.Toolbox(os.environ.get('CONFIG', None))
     web_config = tb.config.get('web',{})
+    func_cache.configure(web_config.get('cache', {}))
+    artifact_cache.configure(web_config.get('cache', {}))
+    table_cache.configure(web_config.get('cache', {}))
+    template_registry.configure(web_config)
+    job_queue.configure(web_config.get('jobs', {}))
+
+    # Sidebar-Informationen aus dem Manifest, ohne die Module zu importieren
+    packages = {
+        tool_config['module'].split('.', 1)[0]
+        for group_config in web_config.get('groups', {}).values()
+        for tool_config in group_config.get('tools', {}).values()
+        if tool_config.get('module')
+    }
+    module_index = {entry['name']: entry for package in packages for entry in tb.find_modules(package)}
+    templates.env.globals['module_index'] = module_index
+
+    # Module aller Tools einmalig auflösen, danach nur bei Dateiänderungen oder /_reload
+    tools = ToolRegistry(tb, web_config, logger)
+    tools.build()
+
+    mount_bootstrap(app)
+    tb.resources.start()
+    await job_queue.start(run_job)
+    prewarm_scheduler.configure(web_config, tool_ttl)
+    prewarm_scheduler.start(prewarm_tool, lambda: tb.engine.pending >= tb.engine.workers)
 
     yield
     # Perform any necessary cleanup here
+    await prewarm_scheduler.stop()
+    await job_queue.stop()
+    func_cache.backend.close()
+    tb.close()
 
 # templating
 templates = Jinja2Templates(directory="toolbox/web/templates")
@@ -51,87 +97,356 @@ app = FastAPI(
 
 
 # static files
-dist = importlib.metadata.distribution("bootstrap")
-static_path = Path(dist.locate_file("bootstrap/dist"))
-app.mount("/bootstrap", StaticFiles(directory=str(static_path)), name="bootstrap")
 app.mount("/static", StaticFiles(directory="toolbox/web/static"), name="static")
 
-def toolbox_wrapper(module_class, **kwargs):
-    ignore_cache = kwargs.pop('ignore_cache', False)
-    if ignore_cache:
-        print('ignoring cache!')
+def mount_bootstrap(app: FastAPI): # pylint: disable=redefined-outer-name
+    """ Mounts the bootstrap distribution, looked up on startup instead of import time """
+
+    if any(getattr(route, 'name', None) == "bootstrap" for route in app.router.routes):
+        return
+
+    try:
+        dist = importlib.metadata.distribution("bootstrap")
+    except importlib.metadata.PackageNotFoundError:
+        logger.warning("bootstrap is not installed, /bootstrap is not available")
+        return
+
+    static_path = Path(dist.locate_file("bootstrap/dist"))
+    # Vor den Tool-Routen einhängen, damit /{toolgroup}/{tool}/... nicht greift
+    app.router.routes.insert(0, Mount("/bootstrap", app=StaticFiles(directory=str(static_path)), name="bootstrap"))
+
+def resolve_tool(toolgroup: str, tool: str) -> ResolvedTool:
+    """ Dependency of the tool endpoints: the resolved tool of the path, see ToolRegistry """
+
+    return tools.get(toolgroup, tool)
+
+def parse_arguments(module_class, params: Dict[str, Any]):
+    """ Validates query parameters, empty optional fields are treated like missing ones (default) """
+
+    fields = module_class.Arguments.model_fields
+    params = {
+        k: v for k, v in params.items()
+        if k in fields and (v != "" or fields[k].is_required())
+    }
+    return module_class.Arguments.model_validate(params)
+
+class ToolResult(NamedTuple):
+    """ Output of a run, result_id identifies the cached result (None if the module is not cacheable) """
+    value: Any
+    result_id: Optional[str]
+
+async def toolbox_wrapper(module_class, params: Dict[str, Any], tool_config: Dict[str, Any] | None = None):
+    return (await run_cached(module_class, params, tool_config)).value
+
+async def run_cached(module_class, params: Dict[str, Any], tool_config: Dict[str, Any] | None = None, wait: bool = False) -> ToolResult:
+    """ Runs the module or returns its cached result, with ``wait`` ignore_cache waits for the new result """
+
+    params = dict(params)
+    ignore_cache = params.pop('ignore_cache', False)
+    cache_config = (tool_config or {}).get('cache', {})
+
+    with metrics.PARSE_SECONDS.time(module=tb.module_name(module_class)):
+        arguments = parse_arguments(module_class, params)
+
+    async def compute():
+        # run_async wird im Event-Loop ausgeführt, synchrone Module in der Execution-Engine
+        toolbox_module_obj = tb.init_module(module_class, arguments)
+        return await tb.execute_async(toolbox_module_obj)
+
+    if not module_class.CACHEABLE:
+        return ToolResult(await compute(), None)
+
+    cache_key = module_class.cache_key(arguments, tb.config)
+    logger.debug(f"cache key: {cache_key}")
+
+    if ignore_cache and wait:
+        entry = await func_cache.compute_async(cache_key, compute, ttl=cache_config.get('ttl', module_class.CACHE_TTL),
+                                               max_stale=cache_config.get('max_stale'))
+        return ToolResult(entry.value, make_result_id(cache_key, entry.created))
+
+    # ignore_cache: vorhandenes Ergebnis sofort ausliefern und im Hintergrund neu berechnen
+    entry = await func_cache.get_entry_async(
+        cache_key, compute,
+        ttl=cache_config.get('ttl', module_class.CACHE_TTL),
+        max_stale=cache_config.get('max_stale'),
+        refresh=bool(ignore_cache),
+    )
+    return ToolResult(entry.value, make_result_id(cache_key, entry.created))
+
+def make_result_id(cache_key: str, created: float) -> str:
+    """ Every recomputation gets a new ID, so ETags and artifacts don't get stale """
+
+    return hashlib.sha256(f"{cache_key}:{created!r}".encode("utf-8")).hexdigest()[:32]
+
+async def run_job(job: Job) -> Optional[str]:
+    """ Runner of the job queue: runs the tool, the result lands in the result cache """
+
+    resolved = tools.get(job.group, job.tool)
+    return (await run_cached(resolved.module, job.params, resolved.tool_config, wait=True)).result_id
+
+async def prewarm_tool(group: str, tool: str, arguments: Dict[str, Any]) -> None:
+    """ Runner of the prewarm scheduler: recomputes the cached result of a tool for an argument set """
+
+    resolved = tools.get(group, tool)
+    if not resolved.module.CACHEABLE:
+        raise ValueError("the result of the tool is not cached, prewarming has no effect")
+    await run_cached(resolved.module, {**arguments, 'ignore_cache': True}, resolved.tool_config, wait=True)
 
-    cache_key = str(kwargs)+str(module_class)
-    print(cache_key)
-    if cache_key in func_cache and not ignore_cache:
-        return func_cache[cache_key]
+def tool_ttl(group: str, tool: str) -> float:
+    """ Cache TTL of a tool: from its cache config, the module or the cache default """
 
-    toolbox_module_obj = tb.init_module(module_class, kwargs)
-    func_cache[cache_key] = toolbox_module_obj.run()
-    return func_cache[cache_key]
+    resolved = tools.get(group, tool)
+    ttl = resolved.tool_config.get('cache', {}).get('ttl', resolved.module.CACHE_TTL)
+    return func_cache.ttl if ttl is None else ttl
+
+def job_urls(job: Job) -> Dict[str, str]:
+    """ URLs of the events and the result page of a job """
+
+    params = {k: v for k, v in job.params.items() if k != 'ignore_cache'}
+    return {
+        "events_url": f"/_jobs/{job.id}/events",
+        "result_url": f"/{job.group}/{job.tool}/run?{urlencode(params)}",
+    }
+
+def job_status(job: Job) -> Dict[str, Any]:
+    """ Current job status with the URLs of its events and its result page """
+
+    return {**job.to_dict(), **job_urls(job)}
+
+# Textformate werden komprimiert, XLSX ist bereits ein ZIP-Archiv
+COMPRESSIBLE_FORMATS = {"yaml", "json", "csv"}
+
+def etag_matches(request: Request, etags: Iterable[str]) -> bool:
+    """ Checks If-None-Match against the ETags of the artifact (weak comparison as required for GET) """
+
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
+
+def iter_gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """ Compresses a stream of chunks to a gzip stream """
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
+
+def artifact_response(request: Request, result: ToolResult, fmt: str, render: Callable[[], Iterable[bytes]], # pylint: disable=too-many-arguments,too-many-positional-arguments
+                      media_type: str, headers: Dict[str, str] | None = None) -> Response:
+    """
+    Delivers a rendered artifact of a result with ETag and optional gzip compression.
+    Artifacts of cached results are rendered once per format and encoding, a matching
+    If-None-Match is answered with 304 without rendering anything.
+    """
+
+    headers = dict(headers or {})
+    gzip = fmt in COMPRESSIBLE_FORMATS and "gzip" in request.headers.get("accept-encoding", "")
+    if fmt in COMPRESSIBLE_FORMATS:
+        headers["Vary"] = "Accept-Encoding"
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    if result.result_id is None:
+        chunks = metrics.iter_measured(render(), fmt)
+        return StreamingResponse(iter_gzip(chunks) if gzip else chunks, headers=headers, media_type=media_type)
+
+    etag = f'"{result.result_id}-{fmt}"'
+    etag_gzip = f'"{result.result_id}-{fmt}-gz"'
+    headers["ETag"] = etag_gzip if gzip else etag
+    if etag_matches(request, (etag, etag_gzip)):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+
+    key = (result.result_id, fmt, "gzip" if gzip else "identity")
+    content = artifact_cache.get(key)
+    if content is not None:
+        return Response(content=content, headers=headers, media_type=media_type)
+
+    chunks = metrics.iter_measured(render(), fmt)
+    return StreamingResponse(artifact_cache.tee(key, iter_gzip(chunks) if gzip else chunks), headers=headers, media_type=media_type)
+
+@app.exception_handler(ToolNotFound)
+def tool_not_found_handler(request: Request, exc: ToolNotFound):
+    if "application/json" in request.headers.get("accept", ""):
+        return JSONResponse({"error": str(exc)}, status_code=exc.status_code)
+    return templates.TemplateResponse("404.html", {
+        "request": request,
+        "error_message": str(exc),
+        "web_config": web_config
+    }, status_code=exc.status_code)
+
+@app.exception_handler(JobNotFound)
+def job_not_found_handler(request: Request, exc: JobNotFound): # pylint: disable=unused-argument
+    return JSONResponse({"error": str(exc)}, status_code=exc.status_code)
+
+@app.exception_handler(EngineBusy)
+@app.exception_handler(ExecutionTimeout)
+@app.exception_handler(ExecutionError)
+def engine_error_handler(request: Request, exc: Exception):
+    headers = {"Retry-After": "10"} if isinstance(exc, EngineBusy) else None
+    return templates.TemplateResponse("error.html", {
+        "request": request,
+        "error_message": str(exc),
+        "status_code": exc.status_code,
+        "web_config": web_config
+    }, status_code=exc.status_code, headers=headers)
 
 @app.get("/", response_class=HTMLResponse)
-def index(request: Request):
+async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request, "web_config": web_config})
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """ Run, cache and serialization metrics in the Prometheus text format """
+
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/_reload")
+async def reload_tools():
+    """ Re-imports the modules of all tools, e.g. after a deployment """
+
+    count = await run_in_threadpool(tools.reload)
+    return {"tools": count}
+
+@app.get("/_jobs/{job_id}")
+async def get_job(job_id: str):
+    """ Status of a background job """
+
+    return JSONResponse(jsonable_encoder(job_status(await job_queue.get(job_id))))
+
+@app.delete("/_jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """ Cancels a queued or running background job """
+
+    return JSONResponse(jsonable_encoder(job_status(await job_queue.cancel(job_id))))
+
+@app.get("/_jobs/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    """ Log lines, progress and status changes of a job as Server-Sent Events, resumable with Last-Event-ID """
+
+    job = await job_queue.get(job_id)
+    try:
+        after = int(request.headers.get("last-event-id", 0))
+    except ValueError:
+        after = 0
+
+    async def stream():
+        async for event in job.iter_events(after):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            data = event["data"]
+            if event["event"] == "status":
+                # Status zum Zeitpunkt des Events, damit wiederholte Events die echten Übergänge zeigen
+                data = {**data, **job_urls(job)}
+            yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    # Proxies (nginx) dürfen den Stream nicht puffern
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/{toolgroup}/{tool}/jobs", status_code=202)
+async def submit_job(request: Request, resolved: ResolvedTool = Depends(resolve_tool)):
+    """ Runs the tool in the background with the query parameters of /run, returns the job immediately """
+
+    if not resolved.module.CACHEABLE:
+        return JSONResponse({"error": "The result of this tool is not cached, run it directly"}, status_code=400)
+    params = dict(request.query_params)
+    try:
+        parse_arguments(resolved.module, params)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    job = await job_queue.submit(resolved.group, resolved.name, params)
+    return JSONResponse(jsonable_encoder(job_status(job)), status_code=202, headers={"Location": f"/_jobs/{job.id}"})
+
 @app.get("/{toolgroup}/{tool}", response_class=HTMLResponse)
-def get_tool(toolgroup:str, tool:str, request: Request):
-    return render_tool(toolgroup, tool, request)
+async def get_tool(request: Request, resolved: ResolvedTool = Depends(resolve_tool)):
+    return await render_tool(resolved, request)
 
 @app.get("/{toolgroup}/{tool}/run", response_class=HTMLResponse)
-def run_tool(toolgroup:str, tool:str, request: Request):
-    return render_tool(toolgroup, tool, request, True)
-
-def render_tool(toolgroup:str, tool:str, request: Request, run: bool=False):
-
-    toolgroup_config = web_config.get('groups', {}).get(toolgroup, None)
-    if not toolgroup_config:
-        return templates.TemplateResponse("404.html", {
-            "request": request,
-            "error_message": f"Toolgroup '{toolgroup}' not found.",
-            "web_config": web_config
-        }, status_code=404)
-
-    tool_config = toolgroup_config.get('tools', {}).get(tool, None)
-    if not tool_config:
-        return templates.TemplateResponse("404.html", {
-            "request": request,
-            "error_message": f"Tool '{tool}' not found in toolgroup '{toolgroup}'.",
-            "web_config": web_config
-        }, status_code=404)
-
-    toolbox_module = tb.load_module(tool_config.get('module'))
-    toolbox_arguments = toolbox_module.Arguments.model_fields
+async def run_tool(request: Request, resolved: ResolvedTool = Depends(resolve_tool)):
+    return await render_tool(resolved, request, True)
+
+async def render_tool(resolved: ResolvedTool, request: Request, run: bool=False):
+
+    toolbox_module = resolved.module
 
     get_params = {}
     str_get_params = ""
-    output_str = ""
+    output_chunks: Iterable[str] = ()
+    data_url = None
     if run:
         get_params = dict(request.query_params)
         str_get_params = "&".join([f"{k}={v}" for k, v in get_params.items()])
-        output_data = toolbox_wrapper(toolbox_module, **get_params)
-
-        try:
-            output_str = get_html_output(toolbox_module,output_data)
-        except NotImplementedError:
-            output_str = "No Output defined in Module"
-
-
-
-    return templates.TemplateResponse("tool.html", {
+        result = await run_cached(toolbox_module, get_params, resolved.tool_config)
+
+        if result.result_id is not None and not toolbox_module.OUTPUT_HTML_JINJA2 and resolved.has_flat_output:
+            # Große Tabellen nicht inline rendern, die Seite lädt sie fensterweise über /data
+            data_params = {k: v for k, v in get_params.items() if k != 'ignore_cache'}
+            data_url = f"/{resolved.group}/{resolved.name}/data?{urlencode(data_params)}"
+        elif not toolbox_module.OUTPUT_HTML_JINJA2 and not resolved.has_flat_output:
+            output_chunks = ("No Output defined in Module",)
+        else:
+            output_chunks = iter_html_output(toolbox_module, result)
+
+    # Seite und Modul-Output werden erst beim Senden gerendert (im Threadpool),
+    # große Reports kommen so schon beim Browser an, bevor sie fertig gerendert sind
+    page = templates.env.get_template("tool.html").generate({
         "request": request,
         "web_config": web_config,
-        "path": (toolgroup, tool),
-        "toolbox_arguments": toolbox_arguments,
-        "toolgroup_config": toolgroup_config,
-        "tool_config": tool_config,
+        "path": (resolved.group, resolved.name),
+        "toolbox_arguments": resolved.arguments,
+        "toolgroup_config": resolved.group_config,
+        "tool_config": resolved.tool_config,
         "toolbox_module": toolbox_module,
         "run": run,
         "params": get_params,
-        "output_str": output_str,
+        "output_chunks": output_chunks,
+        "data_url": data_url,
         "str_get_params": str_get_params
     })
+    return StreamingResponse(iter_buffered(page), media_type="text/html; charset=utf-8")
+
+def iter_buffered(chunks: Iterable[str], size: int = 16 * 1024) -> Iterator[bytes]:
+    """ Collects the many small strings of Template.generate to chunks of about size bytes """
+
+    buffer: List[str] = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield "".join(buffer).encode("utf-8")
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+def iter_html_output(module, result: ToolResult) -> Iterator[str]:
+    """
+    Streams the HTML output of a result, see get_html_output. The template is compiled
+    before the stream starts, the HTML of cached results is rendered once and kept.
+    """
 
+    key = (result.result_id, "html")
+    if result.result_id is not None:
+        cached = artifact_cache.get(key)
+        if cached is not None:
+            return iter((cached.decode("utf-8"),))
+
+    if module.OUTPUT_HTML_JINJA2:
+        chunks = template_registry.get(module).generate(data=result.value)
+    else:
+        chunks = iter_generic_table(LazyFlatOutput(module, result.value))
+
+    if result.result_id is None:
+        return chunks
+    return (chunk.decode("utf-8") for chunk in artifact_cache.tee(key, (chunk.encode("utf-8") for chunk in chunks)))
 
 
 def get_html_output(module, output_data: Dict[str, Any]) -> str:
@@ -142,8 +457,7 @@ def get_html_output(module, output_data: Dict[str, Any]) -> str:
     """
 
     if module.OUTPUT_HTML_JINJA2:
-        output_template = Template(module.OUTPUT_HTML_JINJA2)
-        return output_template.render(data=output_data)
+        return template_registry.get(module).render(data=output_data)
 
 
     flat_data = module.flat_output(output_data)
@@ -155,156 +469,197 @@ def generate_generic_table(data: List[Dict[str, str]]) -> str:
     Erzeugt eine einfache HTML-Tabelle aus einer Liste von Dictionaries.
     """
 
-    if not data:
-        return "<p>Keine Daten vorhanden.</p>"
-    headers = data[0].keys()
-    html = "<table class='table table-striped'>\n"
-    html += "<thead><tr>" + "".join(f"<th>{header}</th>" for header in headers) + "</tr></thead>\n"
-    html += "<tbody>\n"
-    for row in data:
-        html += "<tr>" + "".join(f"<td>{row.get(header, '')}</td>" for header in headers) + "</tr>\n"
-    html += "</tbody>\n</table>"
-    return html
+    return "".join(iter_generic_table(data))
 
-def generate_csv_output(data: List[Dict[str, str]]) -> str:
+def iter_generic_table(data: Iterable[Dict[str, str]]) -> Iterator[str]:
+    """
+    Erzeugt die HTML-Tabelle zeilenweise, für das Streamen großer Ergebnisse.
     """
-    Erzeugt einen CSV-Output aus einer Liste von Dictionaries.
 
-    :param data: Liste von Dictionaries, wobei alle Dictionaries dieselben Keys besitzen.
-    :return: CSV-String.
+    rows = iter(data)
+    first = next(rows, None)
+    if first is None:
+        yield "<p>Keine Daten vorhanden.</p>"
+        return
+    headers = list(first.keys())
+    yield "<table class='table table-striped'>\n"
+    yield "<thead><tr>" + "".join(f"<th>{header}</th>" for header in headers) + "</tr></thead>\n"
+    yield "<tbody>\n"
+    yield "<tr>" + "".join(f"<td>{first.get(header, '')}</td>" for header in headers) + "</tr>\n"
+    for row in rows:
+        yield "<tr>" + "".join(f"<td>{row.get(header, '')}</td>" for header in headers) + "</tr>\n"
+    yield "</tbody>\n</table>"
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+class LazyFlatOutput: # pylint: disable=too-few-public-methods
+    """ Iterable over the flat output of a module, flat_output is only called when the response is streamed """
+
+    def __init__(self, module, output_data: Dict[str, Any]):
+        self.module = module
+        self.output_data = output_data
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return iter(self.module.flat_output(self.output_data))
+
+def iter_csv_output(data: Iterable[Dict[str, str]], chunk_rows: int = 1000) -> Iterator[str]:
     """
-    if not data:
-        return "Keine Daten vorhanden."
+    Erzeugt den CSV-Output aus einer Liste von Dictionaries in Blöcken von chunk_rows Zeilen.
 
-    # Erstelle ein StringIO-Objekt als Puffer für den CSV-Output
+    :param data: Liste (oder Iterator) von Dictionaries, wobei alle Dictionaries dieselben Keys besitzen.
+    :return: Generator mit CSV-Blöcken.
+    """
+    rows = iter(data)
+    first = next(rows, None)
+    if first is None:
+        yield "Keine Daten vorhanden."
+        return
+
+    # Kleiner Puffer, der nach jedem Block geleert wird
     output = io.StringIO()
     # Bestimme die Header aus dem ersten Dictionary
-    headers = list(data[0].keys())
-
-    # Verwende csv.DictWriter, um den CSV-Output zu erzeugen
-    writer = csv.DictWriter(output, fieldnames=headers, delimiter=';')
+    writer = csv.DictWriter(output, fieldnames=list(first.keys()), delimiter=';')
     writer.writeheader()
-    writer.writerows(data)
+    writer.writerow(first)
+
+    for count, row in enumerate(rows, start=2):
+        writer.writerow(row)
+        if count % chunk_rows == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
 
-    # Hole den erzeugten CSV-String und schließe den Puffer
-    csv_content = output.getvalue()
+    yield output.getvalue()
     output.close()
-    return csv_content
 
-def generate_xlsx_output(data: List[Dict[str, str]]) -> bytes:
+def generate_csv_output(data: List[Dict[str, str]]) -> str:
     """
-    Erzeugt einen XLSX-Output aus einer Liste von Dictionaries und gibt diesen als Bytes zurück.
+    Erzeugt einen CSV-Output aus einer Liste von Dictionaries.
 
     :param data: Liste von Dictionaries, wobei alle Dictionaries dieselben Keys besitzen.
-    :return: XLSX-Dateiinhalt als Bytes.
+    :return: CSV-String.
+    """
+    return "".join(iter_csv_output(data))
+
+def iter_xlsx_output(data: Iterable[Dict[str, str]], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Erzeugt einen XLSX-Output aus einer Liste von Dictionaries im write-only Modus von openpyxl.
+    Die Zeilen landen direkt auf der Platte, die fertige Datei wird blockweise ausgeliefert.
+
+    :param data: Liste (oder Iterator) von Dictionaries, wobei alle Dictionaries dieselben Keys besitzen.
+    :return: Generator mit Blöcken des XLSX-Dateiinhalts.
     """
+    from openpyxl import Workbook # pylint: disable=import-outside-toplevel
 
-    wb = Workbook()
-    ws = wb.active
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
 
-    if not data:
+    rows = iter(data)
+    first = next(rows, None)
+    if first is None:
         ws.append(["Keine Daten vorhanden."])
     else:
-        headers = list(data[0].keys())
+        headers = list(first.keys())
         ws.append(headers)
-        for row in data:
+        ws.append([first.get(header, "") for header in headers])
+        for row in rows:
             ws.append([row.get(header, "") for header in headers])
 
-    stream = BytesIO()
-    wb.save(stream)
-    stream.seek(0)
-    return stream.read()
+    with tempfile.TemporaryFile() as stream:
+        wb.save(stream)
+        stream.seek(0)
+        while chunk := stream.read(chunk_size):
+            yield chunk
+
+def generate_xlsx_output(data: List[Dict[str, str]]) -> bytes:
+    """
+    Erzeugt einen XLSX-Output aus einer Liste von Dictionaries und gibt diesen als Bytes zurück.
+
+    :param data: Liste von Dictionaries, wobei alle Dictionaries dieselben Keys besitzen.
+    :return: XLSX-Dateiinhalt als Bytes.
+    """
+    return b"".join(iter_xlsx_output(data))
+
+
+# Parameter des Daten-Endpunkts, mit Unterstrich, damit sie nicht mit Modul-Argumenten kollidieren
+TABLE_PARAMS = ("_offset", "_limit", "_sort", "_order", "_q")
+TABLE_MAX_LIMIT = 1000
 
+@app.get("/{toolgroup}/{tool}/data")
+async def data_endpoint(request: Request, resolved: ResolvedTool = Depends(resolve_tool)):
+    """ Window of the flat output as JSON: _offset, _limit, _sort (column), _order (asc/desc), _q (filter text) """
+
+    toolbox_module, tool_config = resolved.module, resolved.tool_config
+    if not resolved.has_flat_output:
+        return JSONResponse({"error": "Module has no flat output"}, status_code=400)
+
+    get_params = dict(request.query_params)
+    get_params.pop('ignore_cache', None)
+    table_params = {k: get_params.pop(k) for k in TABLE_PARAMS if k in get_params}
+    try:
+        offset = max(int(table_params.get('_offset', 0)), 0)
+        limit = min(max(int(table_params.get('_limit', 100)), 1), TABLE_MAX_LIMIT)
+    except ValueError:
+        return JSONResponse({"error": "_offset and _limit must be integers"}, status_code=400)
+
+    result = await run_cached(toolbox_module, get_params, tool_config)
+    table = table_cache.get(result.result_id) if result.result_id is not None else None
+    if table is None:
+        table = await run_in_threadpool(lambda: ResultTable(toolbox_module.flat_output(result.value)))
+        if result.result_id is not None:
+            table_cache.set(result.result_id, table)
+
+    page = await run_in_threadpool(
+        table.page, offset, limit, table_params.get('_sort'),
+        table_params.get('_order') == 'desc', table_params.get('_q'),
+    )
+    page["result_id"] = result.result_id
+    return JSONResponse(jsonable_encoder(page))
 
 @app.get("/{toolgroup}/{tool}/raw/yaml")
-def raw_yaml_endpoint(toolgroup: str, tool: str, request: Request):
-    toolgroup_config = web_config.get('groups', {}).get(toolgroup, None)
-    if not toolgroup_config:
-        return templates.TemplateResponse("404.html", {
-            "request": request,
-            "error_message": f"Toolgroup '{toolgroup}' not found.",
-            "web_config": web_config
-        }, status_code=404)
-    tool_config = toolgroup_config.get('tools', {}).get(tool, None)
-    if not tool_config:
-        return templates.TemplateResponse("404.html", {
-            "request": request,
-            "error_message": f"Tool '{tool}' not found in toolgroup '{toolgroup}'.",
-            "web_config": web_config
-        }, status_code=404)
-    toolbox_module = tb.load_module(tool_config.get('module'))
+async def raw_yaml_endpoint(request: Request, resolved: ResolvedTool = Depends(resolve_tool)):
+    toolbox_module, tool_config = resolved.module, resolved.tool_config
     get_params = dict(request.query_params)
-    output_data = toolbox_wrapper(toolbox_module, **get_params)
-    yaml_output = yaml.safe_dump(output_data, default_flow_style=False)
-    return Response(content=yaml_output, media_type="text/yaml")
+    result = await run_cached(toolbox_module, get_params, tool_config)
+
+    def render():
+        yield formats.yaml_dump(result.value, safe=True).encode("utf-8")
+
+    return artifact_response(request, result, "yaml", render, media_type="text/yaml")
 
 @app.get("/{toolgroup}/{tool}/raw/json")
-def raw_json_endpoint(toolgroup: str, tool: str, request: Request):
-    toolgroup_config = web_config.get('groups', {}).get(toolgroup, None)
-    if not toolgroup_config:
-        return templates.TemplateResponse("404.html", {
-            "request": request,
-            "error_message": f"Toolgroup '{toolgroup}' not found.",
-            "web_config": web_config
-        }, status_code=404)
-    tool_config = toolgroup_config.get('tools', {}).get(tool, None)
-    if not tool_config:
-        return templates.TemplateResponse("404.html", {
-            "request": request,
-            "error_message": f"Tool '{tool}' not found in toolgroup '{toolgroup}'.",
-            "web_config": web_config
-        }, status_code=404)
-    toolbox_module = tb.load_module(tool_config.get('module'))
+async def raw_json_endpoint(request: Request, resolved: ResolvedTool = Depends(resolve_tool)):
+    toolbox_module, tool_config = resolved.module, resolved.tool_config
     get_params = dict(request.query_params)
-    output_data = toolbox_wrapper(toolbox_module, **get_params)
-    return JSONResponse(content=output_data)
+    result = await run_cached(toolbox_module, get_params, tool_config)
+
+    def render():
+        # Gleiche Serialisierung wie JSONResponse
+        yield json.dumps(result.value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    return artifact_response(request, result, "json", render, media_type="application/json")
 
 @app.get("/{toolgroup}/{tool}/csv")
-def csv_endpoint(toolgroup: str, tool: str, request: Request):
-    toolgroup_config = web_config.get('groups', {}).get(toolgroup, None)
-    if not toolgroup_config:
-        return templates.TemplateResponse("404.html", {
-            "request": request,
-            "error_message": f"Toolgroup '{toolgroup}' not found.",
-            "web_config": web_config
-        }, status_code=404)
-    tool_config = toolgroup_config.get('tools', {}).get(tool, None)
-    if not tool_config:
-        return templates.TemplateResponse("404.html", {
-            "request": request,
-            "error_message": f"Tool '{tool}' not found in toolgroup '{toolgroup}'.",
-            "web_config": web_config
-        }, status_code=404)
-    toolbox_module = tb.load_module(tool_config.get('module'))
+async def csv_endpoint(request: Request, resolved: ResolvedTool = Depends(resolve_tool)):
+    toolbox_module, tool_config = resolved.module, resolved.tool_config
     get_params = dict(request.query_params)
-    output_data = toolbox_wrapper(toolbox_module, **get_params)
-    flat_data = toolbox_module.flat_output(output_data)
-    csv_content = generate_csv_output(flat_data)
-    filename = tool_config.get('module') + '.csv'
+    result = await run_cached(toolbox_module, get_params, tool_config)
+    filename = (tool_config.get('module') or resolved.name) + '.csv'
     headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return Response(content=csv_content, headers=headers, media_type="text/csv")
+
+    def render():
+        for chunk in iter_csv_output(LazyFlatOutput(toolbox_module, result.value)):
+            yield chunk.encode("utf-8")
+
+    # Synchrone Generatoren werden von Starlette im Threadpool durchlaufen
+    return artifact_response(request, result, "csv", render, media_type="text/csv", headers=headers)
 
 @app.get("/{toolgroup}/{tool}/xlsx")
-def xlsx_endpoint(toolgroup: str, tool: str, request: Request):
-    toolgroup_config = web_config.get('groups', {}).get(toolgroup, None)
-    if not toolgroup_config:
-        return templates.TemplateResponse("404.html", {
-            "request": request,
-            "error_message": f"Toolgroup '{toolgroup}' not found.",
-            "web_config": web_config
-        }, status_code=404)
-    tool_config = toolgroup_config.get('tools', {}).get(tool, None)
-    if not tool_config:
-        return templates.TemplateResponse("404.html", {
-            "request": request,
-            "error_message": f"Tool '{tool}' not found in toolgroup '{toolgroup}'.",
-            "web_config": web_config
-        }, status_code=404)
-    toolbox_module = tb.load_module(tool_config.get('module'))
+async def xlsx_endpoint(request: Request, resolved: ResolvedTool = Depends(resolve_tool)):
+    toolbox_module, tool_config = resolved.module, resolved.tool_config
     get_params = dict(request.query_params)
-    output_data = toolbox_wrapper(toolbox_module, **get_params)
-    flat_data = toolbox_module.flat_output(output_data)
-    xlsx_content = generate_xlsx_output(flat_data)
-    filename = tool_config.get('module') + '.xlsx'
+    result = await run_cached(toolbox_module, get_params, tool_config)
+    filename = (tool_config.get('module') or resolved.name) + '.xlsx'
     headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return Response(content=xlsx_content, headers=headers, media_type="text/xlsx")
+    return artifact_response(request, result, "xlsx", lambda: iter_xlsx_output(LazyFlatOutput(toolbox_module, result.value)),
+                             media_type=XLSX_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,779 @@
+import abc
+import asyncio
+import fnmatch
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import Logger
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Set
+
+from cachetools import LRUCache
+
+from toolbox import metrics
+
+
+class CacheEntry(NamedTuple):
+    """ A cached module result with its creation time """
+
+    value: Any
+    created: float
+
+
+class CountingLRUCache(LRUCache):
+    """ LRUCache, which counts the entries it evicts to make room in toolbox_cache_evictions_total """
+
+    def __init__(self, name: str, maxsize: int, getsizeof: Optional[Callable[[Any], int]] = None):
+        super().__init__(maxsize=maxsize, getsizeof=getsizeof)
+        self.name = name
+
+    def popitem(self):
+        # Wird von cachetools nur zur Verdrängung aufgerufen
+        item = super().popitem()
+        metrics.CACHE_EVICTIONS.inc(cache=self.name)
+        return item
+
+
+class CacheBackend(abc.ABC):
+    """
+    Storage behind the ResultCache. Backends only store entries until they expire,
+    freshness (ttl, max_stale) is decided by the ResultCache.
+    """
+
+    # Backends mit I/O (oder Serialisierung wie das Memory-Backend) werden aus async Code im Threadpool aufgerufen
+    blocking: bool = True
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """ Returns the entry or None if it does not exist or is expired """
+
+    @abc.abstractmethod
+    def set(self, key: str, entry: CacheEntry, expire: float) -> None:
+        """ Stores the entry for ``expire`` seconds """
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        """ Removes the entry """
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """ Removes all entries """
+
+    def close(self) -> None:
+        """ Releases connections, called on shutdown """
+
+
+def _zstandard():
+    try:
+        import zstandard # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise ImportError("zstd compression requires the zstandard package: pip install toolbox[zstd]") from e
+    return zstandard
+
+
+def codec(compression: str = "zlib", level: Optional[int] = None) -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """ Compress and decompress functions of zlib (default level 3) or zstd (default level 3) """
+
+    level = 3 if level is None else level
+    if compression == "zlib":
+        return (lambda data: zlib.compress(data, level)), zlib.decompress
+    if compression == "zstd":
+        zstandard = _zstandard()
+        # Compressor-Objekte sind nicht thread-safe, daher je Aufruf eines erzeugen
+        return (lambda data: zstandard.ZstdCompressor(level=level).compress(data)), (lambda data: zstandard.ZstdDecompressor().decompress(data))
+    raise ValueError(f"Unknown cache compression: {compression}")
+
+
+class _StoredEntry(NamedTuple):
+    data: bytes         # gepickelter, ab compress_min_size komprimierter Wert
+    compressed: bool
+    created: float
+    expires: float
+    size: int           # unkomprimierte Länge, Maß für den entpackten Wert
+
+
+class MemoryCacheBackend(CacheBackend): # pylint: disable=too-many-instance-attributes
+    """
+    Process local cache, the default backend, bounded by the bytes it holds (max_bytes) and the number
+    of its entries (maxsize).
+
+    Values are stored pickled, so their size is known exactly, values of compress_min_size bytes or more
+    are compressed and only decompressed when they are read. Up to hot_bytes of recently read values are
+    kept decoded as well, so popular results are not unpickled on every hit. Decoded values are charged at
+    their uncompressed pickled size and count against max_bytes together with the stored entries.
+
+    Eviction is size and recency aware (segmented LRU): new entries start on probation and are protected
+    (up to 80 % of max_bytes) once they are read again. Room is made by evicting the least recently used
+    entries on probation first, so a burst of one-off results does not evict popular ones.
+    Entries larger than max_item_size are not stored.
+    """
+
+    PROTECTED_SHARE = 0.8
+
+    def __init__(self, maxsize: int = 8000, max_bytes: int = 256 * 1024 * 1024, max_item_size: Optional[int] = None, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 compress_min_size: int = 64 * 1024, compression: str = "zlib", compression_level: Optional[int] = None,
+                 hot_bytes: int = 32 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.max_item_size = max_item_size or max_bytes // 4
+        self.compress_min_size = compress_min_size
+        self.hot_bytes = hot_bytes
+        self._compress, self._decompress = codec(compression, compression_level)
+
+        self._probation: OrderedDict[str, _StoredEntry] = OrderedDict()
+        self._protected: OrderedDict[str, _StoredEntry] = OrderedDict()
+        self._protected_size = 0
+        self._size = 0
+        self._hot: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._hot_size = 0
+        self._counts = {"hits": 0, "decoded": 0, "misses": 0, "evictions": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+        metrics.CACHE_BYTES.set_function(lambda: {("results", ): self._size + self._hot_size})
+        metrics.CACHE_ENTRIES.set_function(lambda: {("results", ): len(self._probation) + len(self._protected)})
+
+    def stats(self) -> Dict[str, int]:
+        """ Entries, stored and decoded bytes and the hit, miss and eviction counters of the backend """
+
+        with self._lock:
+            return {
+                "entries": len(self._probation) + len(self._protected),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "protected_bytes": self._protected_size,
+                "hot_bytes": self._hot_size,
+                **self._counts,
+            }
+
+    def _pop(self, key: str) -> Optional[_StoredEntry]:
+        """ Removes an entry from its segment and the decoded values (lock must be held) """
+
+        stored = self._probation.pop(key, None)
+        if stored is None:
+            stored = self._protected.pop(key, None)
+            if stored is not None:
+                self._protected_size -= len(stored.data)
+        if stored is not None:
+            self._size -= len(stored.data)
+        hot = self._hot.pop(key, None)
+        if hot is not None:
+            self._hot_size -= hot[1]
+        return stored
+
+    def _protect(self, key: str, stored: _StoredEntry) -> None:
+        """ Moves a read entry to the protected segment, overflow goes back on probation (lock must be held) """
+
+        if key in self._probation:
+            del self._probation[key]
+            self._protected[key] = stored
+            self._protected_size += len(stored.data)
+        else:
+            self._protected.move_to_end(key)
+
+        limit = self.max_bytes * self.PROTECTED_SHARE
+        while self._protected_size > limit and len(self._protected) > 1:
+            demoted_key, demoted = self._protected.popitem(last=False)
+            self._protected_size -= len(demoted.data)
+            self._probation[demoted_key] = demoted
+
+    def _forget(self, size: int) -> None:
+        """ Drops the least recently read decoded values until size bytes fit into max_bytes (lock must be held) """
+
+        while self._hot and self._size + self._hot_size + size > self.max_bytes:
+            _, (_, evicted_size) = self._hot.popitem(last=False)
+            self._hot_size -= evicted_size
+
+    def _remember(self, key: str, value: Any, size: int) -> None:
+        """ Keeps a decoded value for the next reads, if it fits into hot_bytes and max_bytes (lock must be held) """
+
+        if size > self.hot_bytes:
+            return
+        while self._hot and self._hot_size + size > self.hot_bytes:
+            _, (_, evicted_size) = self._hot.popitem(last=False)
+            self._hot_size -= evicted_size
+        self._forget(size)
+        if self._size + self._hot_size + size > self.max_bytes:
+            return # gespeicherte Einträge haben Vorrang
+        self._hot[key] = (value, size)
+        self._hot_size += size
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            stored = self._probation.get(key) or self._protected.get(key)
+            if stored is None or stored.expires <= time.time():
+                if stored is not None:
+                    self._pop(key)
+                self._counts["misses"] += 1
+                return None
+            self._counts["hits"] += 1
+            self._protect(key, stored)
+            hot = self._hot.get(key)
+            if hot is not None:
+                self._hot.move_to_end(key)
+                return CacheEntry(hot[0], stored.created)
+
+        # Entpacken außerhalb des Locks, andere Zugriffe warten nicht darauf
+        value = pickle.loads(self._decompress(stored.data) if stored.compressed else stored.data)
+        with self._lock:
+            self._counts["decoded"] += 1
+            if self._protected.get(key) is stored and key not in self._hot:
+                self._remember(key, value, stored.size)
+        return CacheEntry(value, stored.created)
+
+    def set(self, key: str, entry: CacheEntry, expire: float) -> None:
+        data = pickle.dumps(entry.value, protocol=pickle.HIGHEST_PROTOCOL)
+        size = len(data)
+        compressed = size >= self.compress_min_size
+        if compressed:
+            data = self._compress(data)
+        stored = _StoredEntry(data, compressed, entry.created, time.time() + expire, size)
+
+        with self._lock:
+            self._pop(key)
+            if len(data) > min(self.max_item_size, self.max_bytes):
+                self._counts["rejected"] += 1
+                return
+
+            # Zuerst entpackte Werte verwerfen, dann Einträge
+            self._forget(len(data))
+            evicted = 0
+            while self._size + len(data) > self.max_bytes or len(self._probation) + len(self._protected) >= self.maxsize:
+                segment = self._probation or self._protected
+                self._pop(next(iter(segment)))
+                evicted += 1
+
+            self._probation[key] = stored
+            self._size += len(data)
+            self._counts["evictions"] += evicted
+        if evicted:
+            metrics.CACHE_EVICTIONS.inc(evicted, cache="results")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._probation.clear()
+            self._protected.clear()
+            self._hot.clear()
+            self._size = self._protected_size = self._hot_size = 0
+
+
+class SQLiteConnections:
+    """ One connection per thread to an SQLite database in WAL mode, sqlite3 connections are not thread-safe """
+
+    def __init__(self, path: str, timeout: float = 30):
+        self.path = os.path.expanduser(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    def get(self) -> sqlite3.Connection:
+        """ The connection of the calling thread, opened on first use """
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """ Closes the connection of the calling thread """
+
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    On-disk cache shared by all worker processes on a host.
+
+    SQLite in WAL mode serializes the writers, every write is a single transaction,
+    so readers never see partial entries. Expired entries and the least recently
+    used entries above ``maxsize`` are evicted on write. A hit only writes its access time
+    if the stored one is older than ``touch_interval`` seconds, so hits are plain reads.
+    """
+
+    def __init__(self, path: str, maxsize: int = 8000, timeout: float = 30, touch_interval: float = 60):
+        self.maxsize = maxsize
+        self.touch_interval = touch_interval
+        self._connections = SQLiteConnections(path, timeout)
+        self.path = self._connections.path
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL, "
+                "expires REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute("SELECT value, created, accessed FROM cache WHERE key = ? AND expires > ?", (key, now)).fetchone()
+        if row is None:
+            return None
+        if now - row[2] >= self.touch_interval:
+            # Für die LRU-Reihenfolge genügt eine grobe Zugriffszeit
+            with conn:
+                conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return CacheEntry(pickle.loads(row[0]), row[1])
+
+    def set(self, key: str, entry: CacheEntry, expire: float) -> None:
+        now = time.time()
+        value = pickle.dumps(entry.value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, entry.created, now + expire, now),
+            )
+            conn.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+            evicted = conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            ).rowcount
+        if evicted > 0:
+            metrics.CACHE_EVICTIONS.inc(evicted, cache="results")
+
+    def delete(self, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache")
+
+    def close(self) -> None:
+        self._connections.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """ Cache in Redis, shared between hosts. Needs the optional ``redis`` package or a client object """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "toolbox:cache:", client: Any = None):
+        if client is None:
+            try:
+                import redis # pylint: disable=import-outside-toplevel
+            except ImportError as e:
+                raise ImportError("The redis cache backend requires the 'redis' package") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        data = self.client.get(self.prefix + key)
+        if data is None:
+            return None
+        return CacheEntry(*pickle.loads(data))
+
+    def set(self, key: str, entry: CacheEntry, expire: float) -> None:
+        data = pickle.dumps(tuple(entry), protocol=pickle.HIGHEST_PROTOCOL)
+        self.client.set(self.prefix + key, data, px=max(1, int(expire * 1000)))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class LocalRedis:
+    """
+    In-process stand-in for a Redis client, implementing the commands used by
+    RedisCacheBackend. Intended for tests and development without a Redis server.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[bytes]:
+        """ GET """
+        with self._lock:
+            item = self._data.get(name)
+            if item is None:
+                return None
+            if item[1] is not None and item[1] <= time.time():
+                del self._data[name]
+                return None
+            return item[0]
+
+    def set(self, name: str, value: bytes, px: Optional[int] = None) -> bool:
+        """ SET with optional PX expiry """
+        with self._lock:
+            self._data[name] = (value, time.time() + px / 1000 if px else None)
+        return True
+
+    def delete(self, *names: str) -> int:
+        """ DEL """
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def scan_iter(self, match: str = "*"):
+        """ SCAN with MATCH """
+        with self._lock:
+            keys = list(self._data)
+        return (key for key in keys if fnmatch.fnmatchcase(key, match))
+
+
+# Optionen der "cache"-Sektion, die ein neues Backend erfordern (ttl und max_stale gelten für jedes)
+BACKEND_OPTIONS = ('backend', 'path', 'url', 'prefix', 'maxsize', 'touch_interval', 'max_bytes', 'max_item_size', 'compress_min_size',
+                   'compression', 'compression_level', 'hot_bytes')
+
+
+def create_backend(config: Dict[str, Any]) -> CacheBackend:
+    """
+    Creates the cache backend configured in the "cache" section of the web config.
+
+    Example:
+        web:
+          cache:
+            backend: sqlite            # memory (default), sqlite, redis
+            path: ~/.cache/toolbox/web-cache.sqlite
+            maxsize: 8000              # entries
+            touch_interval: 60         # sqlite: seconds a hit waits before updating the access time again
+            # memory: budget of the pickled entries, compression above compress_min_size (zlib or zstd)
+            max_bytes: 268435456
+            compress_min_size: 65536
+            compression: zlib
+    """
+
+    backend = config.get('backend', 'memory')
+    maxsize = config.get('maxsize', 8000)
+
+    if backend == 'memory':
+        return MemoryCacheBackend(
+            maxsize=maxsize,
+            max_bytes=config.get('max_bytes', 256 * 1024 * 1024),
+            max_item_size=config.get('max_item_size'),
+            compress_min_size=config.get('compress_min_size', 64 * 1024),
+            compression=config.get('compression', 'zlib'),
+            compression_level=config.get('compression_level'),
+            hot_bytes=config.get('hot_bytes', 32 * 1024 * 1024),
+        )
+    if backend == 'sqlite':
+        return SQLiteCacheBackend(config.get('path', '~/.cache/toolbox/web-cache.sqlite'), maxsize=maxsize,
+                                  touch_interval=config.get('touch_interval', 60))
+    if backend == 'redis':
+        return RedisCacheBackend(config.get('url', 'redis://localhost:6379/0'), prefix=config.get('prefix', 'toolbox:cache:'))
+    if backend == 'local-redis':
+        return RedisCacheBackend(client=LocalRedis(), prefix=config.get('prefix', 'toolbox:cache:'))
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller executes the function,
+    all others wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def in_flight(self, key: Hashable) -> bool:
+        """ Checks if a call for the key is currently running """
+
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """ Executes func once for all concurrent callers with the same key """
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+
+        if not leader:
+            return call.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Like do, but awaits the coroutine function func, shares calls with synchronous callers.
+        func runs in its own task: a cancelled caller stops waiting, the call goes on for the others.
+        """
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = Future()
+                task = asyncio.get_running_loop().create_task(func())
+                self._tasks.add(task)
+                task.add_done_callback(lambda task: self._finished(key, call, task))
+
+        # shield: Abbruch eines Wartenden darf den gemeinsamen Future nicht abbrechen
+        return await asyncio.shield(asyncio.wrap_future(call))
+
+    def _finished(self, key: Hashable, call: Future, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        with self._lock:
+            del self._calls[key]
+        if task.cancelled():
+            call.cancel() # nur beim Beenden des Event-Loops
+        elif task.exception() is not None:
+            call.set_exception(task.exception())
+        else:
+            call.set_result(task.result())
+
+
+class ResultCache:
+    """
+    Result cache for the web app with request coalescing and stale-while-revalidate.
+
+    Entries are fresh for ``ttl`` seconds. For another ``max_stale`` seconds an expired entry is
+    still served immediately, while a single background refresh recomputes it.
+    """
+
+    def __init__(self, maxsize: int = 8000, ttl: float = 3600, max_stale: float = 0, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 refresh_workers: int = 4, logger: Optional[Logger] = None, backend: Optional[CacheBackend] = None):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.logger = logger or logging.getLogger("toolbox.web.cache")
+
+        self.backend: CacheBackend = backend or MemoryCacheBackend(maxsize=maxsize)
+        self._flight = SingleFlight()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="toolbox-refresh")
+        self._refresh_tasks: Set[asyncio.Task] = set()
+
+    def configure(self, config: Dict[str, Any]) -> None:
+        """ Applies the "cache" section of the web config """
+
+        self.ttl = config.get('ttl', self.ttl)
+        self.max_stale = config.get('max_stale', self.max_stale)
+        if any(option in config for option in BACKEND_OPTIONS):
+            self.backend.close()
+            self.backend = create_backend(config)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """ Returns the raw entry, regardless of its age """
+
+        return self.backend.get(key)
+
+    def set(self, key: str, value: Any, expire: Optional[float] = None) -> CacheEntry:
+        """ Stores a value with the current time, kept for ``expire`` seconds (default ttl + max_stale) """
+
+        if expire is None:
+            expire = self.ttl + self.max_stale
+        entry = CacheEntry(value, time.time())
+        self.backend.set(key, entry, expire)
+        return entry
+
+    def _compute(self, key: str, compute: Callable[[], Any], expire: float) -> CacheEntry:
+        return self._flight.do(key, lambda: self.set(key, compute(), expire))
+
+    def refresh(self, key: str, compute: Callable[[], Any], expire: Optional[float] = None) -> None:
+        """ Recomputes an entry in the background, unless a computation is already running """
+
+        if self._flight.in_flight(key):
+            return
+
+        expire = self.ttl + self.max_stale if expire is None else expire
+
+        def _refresh():
+            try:
+                self._compute(key, compute, expire)
+            except Exception as e: # pylint: disable=broad-exception-caught
+                self.logger.error(f"Background refresh of {key} failed: {e}")
+
+        self._refresh_pool.submit(_refresh)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                       max_stale: Optional[float] = None, refresh: bool = False) -> Any:
+        """ Returns the cached value for key or computes it, see get_entry """
+
+        return self.get_entry(key, compute, ttl, max_stale, refresh).value
+
+    def get_entry(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                  max_stale: Optional[float] = None, refresh: bool = False) -> CacheEntry:
+        """
+        Returns the cached entry for key or computes it.
+
+        Args:
+            key: The cache key.
+            compute: Function computing the value on a miss.
+            ttl: Seconds an entry is fresh, defaults to the cache wide ttl.
+            max_stale: Seconds an expired entry may still be served while it is refreshed.
+            refresh: Refresh the entry, an existing entry is served until the refresh is done.
+
+        Returns:
+            CacheEntry: The cached or computed value with its creation time.
+        """
+
+        ttl = self.ttl if ttl is None else ttl
+        max_stale = self.max_stale if max_stale is None else max_stale
+
+        expire = ttl + max_stale
+
+        entry = self.get(key)
+        if entry is not None:
+            age = time.time() - entry.created
+            if age < ttl and not refresh:
+                metrics.CACHE_REQUESTS.inc(cache="results", result="hit")
+                return entry
+
+            if age < expire or (refresh and age < ttl):
+                self.logger.debug(f"Serving stale entry for {key}, refreshing in background")
+                metrics.CACHE_REQUESTS.inc(cache="results", result="stale")
+                self.refresh(key, compute, expire)
+                return entry
+
+        metrics.CACHE_REQUESTS.inc(cache="results", result="miss")
+
+        return self._compute(key, compute, expire)
+
+    async def _call_backend(self, func: Callable, *args: Any) -> Any:
+        if self.backend.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def _compute_async(self, key: str, compute: Callable[[], Awaitable[Any]], expire: float) -> CacheEntry:
+        async def _compute_and_store():
+            value = await compute()
+            return await self._call_backend(self.set, key, value, expire)
+
+        return await self._flight.do_async(key, _compute_and_store)
+
+    def refresh_async(self, key: str, compute: Callable[[], Awaitable[Any]], expire: float) -> None:
+        """ Recomputes an entry in a background task on the running event loop """
+
+        if self._flight.in_flight(key):
+            return
+
+        async def _refresh():
+            try:
+                await self._compute_async(key, compute, expire)
+            except Exception as e: # pylint: disable=broad-exception-caught
+                self.logger.error(f"Background refresh of {key} failed: {e}")
+
+        task = asyncio.get_running_loop().create_task(_refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def compute_async(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: Optional[float] = None,
+                            max_stale: Optional[float] = None) -> CacheEntry:
+        """ Recomputes and stores the entry and waits for it, e.g. for a background job refreshing a result """
+
+        ttl = self.ttl if ttl is None else ttl
+        max_stale = self.max_stale if max_stale is None else max_stale
+        return await self._compute_async(key, compute, ttl + max_stale)
+
+    async def get_or_compute_async(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: Optional[float] = None, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                                   max_stale: Optional[float] = None, refresh: bool = False) -> Any:
+        """ Like get_or_compute for the event loop, compute is a coroutine function """
+
+        return (await self.get_entry_async(key, compute, ttl, max_stale, refresh)).value
+
+    async def get_entry_async(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: Optional[float] = None, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                              max_stale: Optional[float] = None, refresh: bool = False) -> CacheEntry:
+        """ Like get_entry for the event loop, compute is a coroutine function """
+
+        ttl = self.ttl if ttl is None else ttl
+        max_stale = self.max_stale if max_stale is None else max_stale
+        expire = ttl + max_stale
+
+        entry = await self._call_backend(self.get, key)
+        if entry is not None:
+            age = time.time() - entry.created
+            if age < ttl and not refresh:
+                metrics.CACHE_REQUESTS.inc(cache="results", result="hit")
+                return entry
+
+            if age < expire or (refresh and age < ttl):
+                self.logger.debug(f"Serving stale entry for {key}, refreshing in background")
+                metrics.CACHE_REQUESTS.inc(cache="results", result="stale")
+                self.refresh_async(key, compute, expire)
+                return entry
+
+        metrics.CACHE_REQUESTS.inc(cache="results", result="miss")
+
+        return await self._compute_async(key, compute, expire)
+
+
+class ArtifactCache:
+    """
+    In-memory LRU cache for rendered artifacts (YAML, JSON, CSV, XLSX, HTML) of a result,
+    keyed by result id, format and content encoding and bounded by the total size in bytes.
+    """
+
+    def __init__(self, maxsize: int = 256 * 1024 * 1024, max_item_size: int = 32 * 1024 * 1024):
+        self.max_item_size = max_item_size
+        self._storage: LRUCache = CountingLRUCache("artifacts", maxsize, len)
+        self._lock = threading.Lock()
+
+    def configure(self, config: Dict[str, Any]) -> None:
+        """ Applies artifacts_maxsize and artifacts_max_item_size of the cache config """
+
+        self.max_item_size = config.get('artifacts_max_item_size', self.max_item_size)
+        if 'artifacts_maxsize' in config:
+            with self._lock:
+                self._storage = CountingLRUCache("artifacts", config['artifacts_maxsize'], len)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """ Returns the rendered artifact or None """
+
+        with self._lock:
+            data = self._storage.get(key)
+        metrics.CACHE_REQUESTS.inc(cache="artifacts", result="miss" if data is None else "hit")
+        return data
+
+    def set(self, key: Hashable, data: bytes) -> None:
+        """ Stores a rendered artifact, if it is not too large """
+
+        if len(data) > min(self.max_item_size, self._storage.maxsize):
+            return
+        with self._lock:
+            self._storage[key] = data
+
+    def clear(self) -> None:
+        """ Removes all artifacts """
+
+        with self._lock:
+            self._storage.clear()
+
+    def tee(self, key: Hashable, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """ Passes the chunks through and stores the complete artifact at the end, unless it got too large """
+
+        buffer: Optional[List[bytes]] = []
+        size = 0
+        for chunk in chunks:
+            if buffer is not None:
+                size += len(chunk)
+                if size > self.max_item_size:
+                    buffer = None
+                else:
+                    buffer.append(chunk)
+            yield chunk
+
+        if buffer is not None:
+            self.set(key, b"".join(buffer))
@@ -0,0 +1,438 @@
+import asyncio
+import contextvars
+import itertools
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from logging import Logger
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from cachetools import LRUCache
+
+from toolbox.web.cache import SQLiteConnections
+
+# Ablauf eines Jobs: queued -> running -> done | failed | cancelled
+FINISHED = ("done", "failed", "cancelled")
+
+# Job des laufenden Tasks, Logeinträge werden diesem Job zugeordnet (auch in Threads der Execution-Engine)
+current_job: contextvars.ContextVar[Optional["Job"]] = contextvars.ContextVar("toolbox_job", default=None)
+
+
+def default_jobs_path() -> str:
+    """ Default location of the job database (XDG state dir) """
+
+    state_home = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(state_home, "toolbox", "web-jobs.sqlite")
+
+
+class JobNotFound(Exception):
+    """ Raised for unknown or purged job IDs """
+
+    status_code = 404
+
+
+class Job: # pylint: disable=too-many-instance-attributes
+    """
+    A tool run in the background. Log lines, progress and status changes are kept as numbered
+    events (at most max_events), which the SSE endpoint streams to the browser.
+    """
+
+    def __init__(self, job_id: str, group: str, tool: str, params: Dict[str, Any], status: str = "queued", # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 created: Optional[float] = None, started: Optional[float] = None, finished: Optional[float] = None,
+                 error: Optional[str] = None, result_id: Optional[str] = None, max_events: int = 1000):
+        self.id = job_id # pylint: disable=invalid-name
+        self.group = group
+        self.tool = tool
+        self.params = params
+        self.status = status
+        self.created = created or time.time()
+        self.started = started
+        self.finished = finished
+        self.error = error
+        self.result_id = result_id
+
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._event_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._listeners: Set[tuple] = set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ Status of the job as returned by the API """
+
+        return {
+            "id": self.id, "group": self.group, "tool": self.tool, "params": self.params, "status": self.status,
+            "created": self.created, "started": self.started, "finished": self.finished, "error": self.error,
+            "result_id": self.result_id,
+        }
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        """ Adds an event and wakes up the listeners, may be called from any thread """
+
+        with self._lock:
+            self.events.append({"id": next(self._event_ids), "event": event, "data": data})
+            listeners = list(self._listeners)
+        for loop, wakeup in listeners:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass # Event-Loop bereits beendet
+
+    def set_status(self, status: str, error: Optional[str] = None) -> None:
+        """ Changes the status and emits it as "status" event """
+
+        now = time.time()
+        if status == "running":
+            self.started = now
+        elif status in FINISHED:
+            self.finished = now
+        self.status = status
+        self.error = error
+        self.emit("status", self.to_dict())
+
+    async def iter_events(self, after: int = 0, heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yields the events after the event ID ``after``, waits for new ones until the job is finished.
+        Yields None every ``heartbeat`` seconds without events, so proxies keep the connection open.
+        """
+
+        loop = asyncio.get_running_loop()
+        while True:
+            listener = (loop, asyncio.Event())
+            with self._lock:
+                events = [event for event in self.events if event["id"] > after]
+                if not events and self.status not in FINISHED:
+                    self._listeners.add(listener)
+
+            if not events and self.status in FINISHED:
+                # Nach einem Neustart sind nur Status und Ergebnis erhalten
+                yield {"id": after + 1, "event": "status", "data": self.to_dict()}
+                return
+
+            for event in events:
+                yield event
+                after = event["id"]
+                if event["event"] == "status" and event["data"]["status"] in FINISHED:
+                    return
+
+            if not events:
+                try:
+                    await asyncio.wait_for(listener[1].wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                finally:
+                    with self._lock:
+                        self._listeners.discard(listener)
+
+
+class JobLogHandler(logging.Handler):
+    """
+    Forwards the log records of a running job (see current_job) as "log" and "progress" events.
+    Worker processes of the execution engine (engine.mode: process) don't have current_job, the log
+    records and progress of modules running there are not forwarded to the job.
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        job = current_job.get()
+        if job is None:
+            return
+        try:
+            data = {"time": record.created, "level": record.levelname, "logger": record.name, "message": record.getMessage()}
+            progress = getattr(record, "progress", None)
+            if progress is not None:
+                job.emit("progress", {**data, **progress})
+            else:
+                job.emit("log", data)
+        except Exception: # pylint: disable=broad-exception-caught
+            self.handleError(record)
+
+
+class JobStore:
+    """
+    SQLite table of the jobs, so queued jobs survive a restart of the web app.
+    Events are not stored, after a restart a job only has its status and result.
+
+    Several processes (e.g. uvicorn workers) can share the table: a job is claimed atomically by one
+    owner, which renews the lease of its running jobs. Only running jobs with an expired lease are
+    considered interrupted and queued again.
+    """
+
+    COLUMNS = ("id", "grp", "tool", "params", "status", "created", "started", "finished", "error", "result_id")
+
+    def __init__(self, path: str, timeout: float = 30):
+        self._connections = SQLiteConnections(path, timeout)
+        self.path = self._connections.path
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, grp TEXT NOT NULL, tool TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL, "
+                "created REAL NOT NULL, started REAL, finished REAL, error TEXT, result_id TEXT, owner TEXT, lease REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+            # Datenbanken älterer Versionen ohne owner/lease
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (("owner", "TEXT"), ("lease", "REAL")):
+                if column not in columns:
+                    try:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+                    except sqlite3.OperationalError:
+                        pass # gleichzeitig von einem anderen Prozess hinzugefügt
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def save(self, job: Job) -> None:
+        """ Inserts or updates the job """
+
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                (job.id, job.group, job.tool, json.dumps(job.params), job.status, job.created, job.started,
+                 job.finished, job.error, job.result_id),
+            )
+
+    def _job(self, row: tuple, max_events: int) -> Job:
+        job_id, group, tool, params, *fields = row
+        return Job(job_id, group, tool, json.loads(params), *fields, max_events=max_events)
+
+    def get(self, job_id: str, max_events: int = 1000) -> Optional[Job]:
+        """ Loads a job or returns None """
+
+        row = self._connection().execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else self._job(row, max_events)
+
+    def pending(self, max_events: int = 1000) -> List[Job]:
+        """ Queued jobs, oldest first """
+
+        rows = self._connection().execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE status = 'queued' ORDER BY created"
+        ).fetchall()
+        return [self._job(row, max_events) for row in rows]
+
+    def claim(self, job_id: str, owner: str, lease: float, started: float) -> bool:
+        """ Marks a queued job as running by owner until the lease timestamp, False if it is no longer queued """
+
+        with self._connection() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'running', started = ?, owner = ?, lease = ? WHERE id = ? AND status = 'queued'",
+                (started, owner, lease, job_id),
+            ).rowcount == 1
+
+    def cancel_queued(self, job_id: str, finished: float) -> bool:
+        """ Cancels a job unless it was claimed in the meantime """
+
+        with self._connection() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'", (finished, job_id),
+            ).rowcount == 1
+
+    def renew(self, owner: str, lease: float) -> None:
+        """ Extends the lease of the running jobs of owner """
+
+        with self._connection() as conn:
+            conn.execute("UPDATE jobs SET lease = ? WHERE owner = ? AND status = 'running'", (lease, owner))
+
+    def requeue(self, now: float, owner: Optional[str] = None) -> List[str]:
+        """ Queues running jobs whose lease expired before now (or all running jobs of owner), returns their IDs """
+
+        if owner is None:
+            where, params = "status = 'running' AND (lease IS NULL OR lease < ?)", (now,)
+        else:
+            where, params = "status = 'running' AND owner = ?", (owner,)
+        with self._connection() as conn:
+            rows = conn.execute(f"SELECT id FROM jobs WHERE {where}", params).fetchall()
+            conn.execute(f"UPDATE jobs SET status = 'queued', started = NULL, owner = NULL, lease = NULL WHERE {where}", params)
+        return [row[0] for row in rows]
+
+    def purge(self, before: float) -> int:
+        """ Deletes the jobs finished before the timestamp, returns their number """
+
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?", (before,)).rowcount
+
+    def close(self) -> None:
+        """ Closes the connection of the calling thread """
+
+        self._connections.close()
+
+
+class JobQueue: # pylint: disable=too-many-instance-attributes
+    """
+    Background execution of tool runs for the web app: submit returns a job immediately,
+    ``workers`` tasks run the jobs one at a time each (the runs themselves go through the execution engine).
+    Jobs are stored in SQLite, queued jobs and jobs interrupted by a restart run again. Processes sharing
+    the database claim each job atomically and pick up queued jobs and jobs of crashed processes, whose
+    lease expired, every lease / 3 seconds.
+
+    Config (section "jobs" of the web config):
+        web:
+          jobs:
+            path: ~/.local/state/toolbox/web-jobs.sqlite
+            workers: 2
+            keep: 86400        # seconds finished jobs are kept
+            max_events: 1000   # log lines and progress events kept per job
+            recent: 100        # finished jobs kept in memory with their events
+            lease: 60          # seconds a running job stays claimed without renewal
+    """
+
+    def __init__(self, logger: Optional[Logger] = None):
+        self.logger = logger or logging.getLogger("toolbox.web.jobs")
+        self.path = default_jobs_path()
+        self.workers = 2
+        self.keep = 86400.0
+        self.max_events = 1000
+        self.lease = 60.0
+        # Eindeutig je Prozess und Start, damit Leases anderer Worker nicht verwechselt werden
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self.store: Optional[JobStore] = None
+        self._jobs: Dict[str, Job] = {}
+        self._recent: LRUCache = LRUCache(maxsize=100)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._handler = JobLogHandler()
+        self._stopping = False
+
+    def configure(self, config: Dict[str, Any]) -> None:
+        """ Applies the "jobs" section of the web config """
+
+        self.path = config.get('path', self.path)
+        self.workers = config.get('workers', self.workers)
+        self.keep = config.get('keep', self.keep)
+        self.max_events = config.get('max_events', self.max_events)
+        self.lease = config.get('lease', self.lease)
+        self._recent = LRUCache(maxsize=config.get('recent', self._recent.maxsize))
+
+    async def start(self, runner: Callable[[Job], Awaitable[Optional[str]]]) -> None:
+        """
+        Opens the job database, queues the pending jobs and starts the workers.
+        ``runner`` executes a job and returns the result ID of the cached result.
+        """
+
+        self._stopping = False
+        self.store = await asyncio.to_thread(JobStore, self.path)
+        await asyncio.to_thread(self.store.purge, time.time() - self.keep)
+
+        self._queue = asyncio.Queue()
+        await self._enqueue_pending()
+
+        logging.getLogger("toolbox").addHandler(self._handler)
+        self._tasks = [asyncio.create_task(self._worker(runner)) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+
+    async def stop(self) -> None:
+        """ Stops the workers, the interrupted running jobs are queued again for the next start or another process """
+
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logging.getLogger("toolbox").removeHandler(self._handler)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.requeue, time.time(), self.owner)
+            self.store.close()
+
+    async def _enqueue_pending(self) -> None:
+        """ Queues jobs of crashed processes again and takes over the queued jobs not known to this process """
+
+        for job_id in await asyncio.to_thread(self.store.requeue, time.time()):
+            self.logger.warning(f"job {job_id} was interrupted, running it again")
+        for job in await asyncio.to_thread(self.store.pending, self.max_events):
+            if job.id not in self._jobs:
+                self._jobs[job.id] = job
+                self._queue.put_nowait(job.id)
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await asyncio.to_thread(self.store.renew, self.owner, time.time() + self.lease)
+                await self._enqueue_pending()
+            except Exception as e: # pylint: disable=broad-exception-caught
+                self.logger.error(f"job maintenance failed: {e}")
+
+    async def submit(self, group: str, tool: str, params: Dict[str, Any]) -> Job:
+        """ Stores and queues a job for the tool with the given (unvalidated) parameters """
+
+        if self._queue is None:
+            raise RuntimeError("job queue is not started")
+        job = Job(uuid.uuid4().hex, group, tool, params, max_events=self.max_events)
+        await asyncio.to_thread(self.store.save, job)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job.id)
+        job.emit("status", job.to_dict())
+        return job
+
+    async def get(self, job_id: str) -> Job:
+        """
+        Returns the job, also finished jobs of earlier runs of the web app.
+
+        Raises:
+            JobNotFound: If the job does not exist (anymore).
+        """
+
+        job = self._jobs.get(job_id) or self._recent.get(job_id)
+        if self.store is not None and (job is None or (job.status == "queued" and job_id not in self._running)):
+            # Wartende Jobs können inzwischen von einem anderen Prozess übernommen oder abgebrochen sein
+            stored = await asyncio.to_thread(self.store.get, job_id, self.max_events)
+            if job is None or (stored is not None and stored.status != job.status):
+                job = stored
+        if job is None:
+            raise JobNotFound(f"Job '{job_id}' not found.")
+        return job
+
+    async def cancel(self, job_id: str) -> Job:
+        """ Cancels a queued or running job, a run already executing in a thread finishes in the background """
+
+        job = await self.get(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        elif job.status == "queued":
+            if await asyncio.to_thread(self.store.cancel_queued, job.id, time.time()):
+                await self._finish(job, "cancelled")
+            else:
+                job = await self.get(job_id) # bereits von einem anderen Prozess übernommen
+        return job
+
+    async def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        job.set_status(status, error)
+        await asyncio.to_thread(self.store.save, job)
+        # Die letzten beendeten Jobs mit ihren Events behalten, ältere nur noch aus der Datenbank liefern
+        self._recent[job.id] = self._jobs.pop(job.id, job)
+
+    async def _worker(self, runner: Callable[[Job], Awaitable[Optional[str]]]) -> None:
+        while True:
+            job = self._jobs.get(await self._queue.get())
+            if job is None or job.status != "queued":
+                continue # inzwischen abgebrochen
+
+            now = time.time()
+            if not await asyncio.to_thread(self.store.claim, job.id, self.owner, now + self.lease, now):
+                self._jobs.pop(job.id, None) # läuft in einem anderen Prozess oder wurde abgebrochen
+                continue
+            job.set_status("running")
+            current_job.set(job)
+            task = self._running[job.id] = asyncio.create_task(runner(job))
+            try:
+                job.result_id = await task
+            except asyncio.CancelledError:
+                if self._stopping:
+                    raise
+                await self._finish(job, "cancelled")
+            except Exception as e: # pylint: disable=broad-exception-caught
+                self.logger.error(f"job {job.id} ({job.group}/{job.tool}) failed: {e}")
+                await self._finish(job, "failed", f"{type(e).__name__}: {e}")
+            else:
+                await self._finish(job, "done")
+            finally:
+                self._running.pop(job.id, None)
+                current_job.set(None)
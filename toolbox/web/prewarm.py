@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from logging import Logger
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from toolbox import metrics
+
+# Kurzformen wie bei cron
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+# Anteil der TTL, nach dem ein Eintrag ohne every/cron neu berechnet wird
+TTL_FACTOR = 0.8
+
+
+def _parse_field(field: str, low: int, high: int) -> Set[int]:
+    """ Values of a cron field: *, */n, a, a-b, a-b/n and comma separated lists of them """
+
+    values: Set[int] = set()
+    for part in field.split(","):
+        spec, _, step = part.partition("/")
+        if spec == "*":
+            start, end = low, high
+        elif "-" in spec:
+            start, end = (int(value) for value in spec.split("-", 1))
+        else:
+            start = end = int(spec)
+            if step:
+                end = high
+        if not low <= start <= end <= high:
+            raise ValueError(f"{part!r} is out of range {low}-{high}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class CronSchedule: # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """
+    Cron expression with the five fields minute, hour, day of month, month and day of week (0 or 7: Sunday),
+    evaluated in local time. As in cron a day matches either field if both day fields are restricted.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = CRON_ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression {expression!r} needs 5 fields")
+        try:
+            self.minutes = _parse_field(fields[0], 0, 59)
+            self.hours = _parse_field(fields[1], 0, 23)
+            self.days = _parse_field(fields[2], 1, 31)
+            self.months = _parse_field(fields[3], 1, 12)
+            self.weekdays = {day % 7 for day in _parse_field(fields[4], 0, 7)}
+        except ValueError as e:
+            raise ValueError(f"invalid cron expression {expression!r}: {e}") from e
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next(self, after: datetime) -> datetime:
+        """ The first matching minute after ``after`` """
+
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=5 * 366)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"cron expression {self.expression!r} never matches")
+
+
+class PrewarmSchedule: # pylint: disable=too-many-instance-attributes
+    """ A prewarm entry of a tool: when to run it (interval or cron, plus jitter) and with which argument sets """
+
+    def __init__(self, group: str, tool: str, arguments: List[Dict[str, Any]], every: Optional[float] = None, # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 cron: Optional[str] = None, jitter: float = 0, on_start: Optional[bool] = None):
+        if (every is None) == (cron is None):
+            raise ValueError("a prewarm schedule needs either every or cron")
+        self.group = group
+        self.tool = tool
+        self.arguments = arguments
+        self.every = every
+        self.cron = CronSchedule(cron) if cron else None
+        self.jitter = jitter
+        # Intervalle wärmen direkt nach dem Start vor, cron-Zeitpläne erst zur nächsten Zeit
+        self.on_start = cron is None if on_start is None else on_start
+
+    @property
+    def name(self) -> str:
+        """ group/tool, for logs and metrics """
+        return f"{self.group}/{self.tool}"
+
+    def next_run(self, now: float) -> float:
+        """ Timestamp of the next run after now, delayed by a random jitter """
+
+        delay = random.uniform(0, self.jitter) if self.jitter else 0
+        if self.cron is not None:
+            return self.cron.next(datetime.fromtimestamp(now)).timestamp() + delay
+        return now + self.every + delay
+
+    def first_run(self, now: float) -> float:
+        """ Timestamp of the first run after the start of the scheduler """
+
+        if self.on_start:
+            return now + (random.uniform(0, self.jitter) if self.jitter else 0)
+        return self.next_run(now)
+
+
+class PrewarmScheduler:
+    """
+    Refreshes the cached results of configured tools in the background, so users are served from a warm cache.
+    At most max_concurrency prewarm runs take place at the same time, and a run waits while the execution
+    engine is busy, so prewarming does not take workers from interactive requests.
+
+    Config (per tool and in the "prewarm" section of the web config):
+        web:
+          prewarm:
+            max_concurrency: 1
+            jitter: 60           # default seconds of random delay per run
+          groups:
+            reports:
+              tools:
+                vms:
+                  module: vmware.get_vms
+                  prewarm:
+                    - cron: "30 6 * * 1-5"    # minute hour day month weekday, or @hourly, @daily, ...
+                      arguments: [{limit: WIN}, {limit: LNX}]
+                    - every: 1800             # seconds
+                      arguments: [{}]
+                    - arguments: [{}]         # neither: every 80 % of the cache TTL of the tool
+    """
+
+    def __init__(self, logger: Optional[Logger] = None):
+        self.logger = logger or logging.getLogger("toolbox.web.prewarm")
+        self.schedules: List[PrewarmSchedule] = []
+        self.max_concurrency = 1
+        self._task: Optional[asyncio.Task] = None
+        self._runs: Dict[int, asyncio.Task] = {}
+
+    def configure(self, web_config: Dict[str, Any], ttl: Callable[[str, str], float]) -> None:
+        """
+        Reads the prewarm schedules of all tools, invalid schedules are logged and skipped.
+        ``ttl`` returns the cache TTL of a tool, for schedules without every and cron.
+        """
+
+        config = web_config.get('prewarm', {})
+        self.max_concurrency = config.get('max_concurrency', 1)
+        default_jitter = config.get('jitter', 60)
+
+        self.schedules = []
+        for group, group_config in web_config.get('groups', {}).items():
+            for tool, tool_config in group_config.get('tools', {}).items():
+                entries = tool_config.get('prewarm') or []
+                for entry in entries if isinstance(entries, list) else [entries]:
+                    try:
+                        every = entry.get('every')
+                        if every is None and not entry.get('cron'):
+                            every = ttl(group, tool) * TTL_FACTOR
+                        self.schedules.append(PrewarmSchedule(
+                            group, tool, entry.get('arguments') or [{}], every, entry.get('cron'),
+                            entry.get('jitter', default_jitter), entry.get('on_start'),
+                        ))
+                    except Exception as e: # pylint: disable=broad-exception-caught
+                        self.logger.error(f"Invalid prewarm schedule of tool {group}/{tool}: {e}")
+
+    def start(self, runner: Callable[[str, str, Dict[str, Any]], Awaitable[Any]], busy: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Starts the scheduler on the running event loop. ``runner`` recomputes the cached result of a tool for
+        an argument set, while ``busy`` returns True, runs wait.
+        """
+
+        if self.schedules:
+            self.logger.info(f"prewarming {len(self.schedules)} schedule(s), at most {self.max_concurrency} at a time")
+            self._task = asyncio.create_task(self._loop(runner, busy or (lambda: False)))
+
+    async def stop(self) -> None:
+        """ Stops the scheduler and cancels running prewarm runs """
+
+        tasks = [task for task in [self._task, *self._runs.values()] if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._runs = {}
+
+    async def _loop(self, runner: Callable[[str, str, Dict[str, Any]], Awaitable[Any]], busy: Callable[[], bool]) -> None:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        now = time.time()
+        due = {index: schedule.first_run(now) for index, schedule in enumerate(self.schedules)}
+
+        while True:
+            index, when = min(due.items(), key=lambda item: item[1])
+            await asyncio.sleep(max(0.0, when - time.time()))
+            schedule = self.schedules[index]
+            due[index] = schedule.next_run(time.time())
+
+            if index in self._runs:
+                self.logger.warning(f"prewarming of {schedule.name} is still running, skipping this run")
+                continue
+            task = self._runs[index] = asyncio.create_task(self._run(schedule, runner, busy, semaphore))
+            task.add_done_callback(lambda _, index=index: self._runs.pop(index, None))
+
+    async def _run(self, schedule: PrewarmSchedule, runner: Callable[[str, str, Dict[str, Any]], Awaitable[Any]],
+                   busy: Callable[[], bool], semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            for arguments in schedule.arguments:
+                # Interaktive Anfragen haben Vorrang: warten, solange die Engine ausgelastet ist
+                while busy():
+                    await asyncio.sleep(1)
+
+                start = time.perf_counter()
+                try:
+                    await runner(schedule.group, schedule.tool, arguments)
+                except Exception as e: # pylint: disable=broad-exception-caught
+                    metrics.PREWARMS.inc(tool=schedule.name, status="error")
+                    self.logger.error(f"prewarming {schedule.name} with {arguments} failed: {e}")
+                else:
+                    metrics.PREWARMS.inc(tool=schedule.name, status="ok")
+                    self.logger.debug(f"prewarmed {schedule.name} with {arguments} in {time.perf_counter() - start:.1f}s")
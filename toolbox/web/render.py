@@ -0,0 +1,73 @@
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FunctionLoader, Template
+
+
+def default_bytecode_cache_path() -> str:
+    """ Default directory of the compiled templates: $XDG_CACHE_HOME/toolbox/jinja2 """
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "toolbox", "jinja2")
+
+
+class TemplateRegistry:
+    """
+    Compiles the OUTPUT_HTML_JINJA2 template of every module once and keeps it.
+
+    Templates are named after the module and a hash of their source, so an updated module
+    gets a fresh template. With a bytecode cache the compiled code is also stored on disk
+    and reused after a restart.
+
+    Config (section "web" of the toolbox config):
+        web:
+          template_bytecode_cache: true   # or a directory, default: no bytecode cache
+    """
+
+    def __init__(self, bytecode_cache: Optional[str] = None):
+        self._sources: Dict[str, str] = {}
+        self._templates: Dict[str, Template] = {}
+        self._lock = threading.Lock()
+        self.env = self._create_env(bytecode_cache)
+
+    def _create_env(self, bytecode_cache: Optional[str]) -> Environment:
+        cache = None
+        if bytecode_cache:
+            os.makedirs(bytecode_cache, exist_ok=True)
+            cache = FileSystemBytecodeCache(bytecode_cache, "toolbox-%s.cache")
+        # Gleiche Einstellungen wie Template(source), die Quellen ändern sich nur mit dem Namen
+        return Environment(loader=FunctionLoader(self._load), bytecode_cache=cache, auto_reload=False, cache_size=-1)
+
+    def configure(self, config: Dict[str, Any]) -> None:
+        """ Applies template_bytecode_cache of the web config """
+
+        bytecode_cache = config.get('template_bytecode_cache')
+        if bytecode_cache is True:
+            bytecode_cache = default_bytecode_cache_path()
+        with self._lock:
+            self.env = self._create_env(bytecode_cache or None)
+            self._templates.clear()
+
+    def _load(self, name: str) -> Optional[tuple]:
+        source = self._sources.get(name)
+        if source is None:
+            return None
+        return source, None, lambda: True
+
+    def get(self, module) -> Template:
+        """ Returns the compiled OUTPUT_HTML_JINJA2 template of a module class """
+
+        source = module.OUTPUT_HTML_JINJA2
+        digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        name = f"{module.__module__}.{module.__qualname__}:{digest}"
+
+        template = self._templates.get(name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    self._sources[name] = source
+                    template = self._templates[name] = self.env.get_template(name)
+        return template
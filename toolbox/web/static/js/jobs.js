@@ -0,0 +1,90 @@
+// Hintergrund-Jobs: startet den Lauf über /jobs, zeigt Log und Fortschritt per SSE und öffnet danach das Ergebnis
+(function () {
+  const STATUS_TEXT = {
+    queued: "wartet",
+    running: "läuft",
+    done: "fertig",
+    failed: "fehlgeschlagen",
+    cancelled: "abgebrochen",
+  };
+
+  function initJobs(button) {
+    const form = button.closest("form");
+    const panel = document.querySelector(".job-panel");
+    const status = panel.querySelector(".job-status");
+    const bar = panel.querySelector(".progress-bar");
+    const log = panel.querySelector(".job-log");
+    const cancel = panel.querySelector(".job-cancel");
+    let job = null;
+
+    function appendLine(text) {
+      const follow = log.scrollTop + log.clientHeight >= log.scrollHeight - 20;
+      log.append(text + "\n");
+      if (follow) {
+        log.scrollTop = log.scrollHeight;
+      }
+    }
+
+    function showStatus(data) {
+      status.textContent = STATUS_TEXT[data.status] || data.status;
+      cancel.disabled = !["queued", "running"].includes(data.status);
+      if (data.status === "done") {
+        bar.style.width = "100%";
+        window.location.href = data.result_url;
+      } else if (data.status === "failed") {
+        bar.classList.add("bg-danger");
+        appendLine(data.error || "Job fehlgeschlagen");
+      }
+    }
+
+    function listen(eventsUrl) {
+      // EventSource verbindet sich selbst neu und sendet dabei Last-Event-ID
+      const source = new EventSource(eventsUrl);
+      source.addEventListener("status", (event) => {
+        const data = JSON.parse(event.data);
+        showStatus(data);
+        if (!["queued", "running"].includes(data.status)) {
+          source.close();
+        }
+      });
+      source.addEventListener("log", (event) => {
+        const data = JSON.parse(event.data);
+        appendLine(`${data.level} ${data.message}`);
+      });
+      source.addEventListener("progress", (event) => {
+        const data = JSON.parse(event.data);
+        if (data.total) {
+          bar.style.width = `${Math.min(100, (100 * data.done) / data.total)}%`;
+        }
+        bar.textContent = data.message;
+      });
+    }
+
+    button.addEventListener("click", async () => {
+      const params = new URLSearchParams(new FormData(form));
+      panel.classList.remove("d-none");
+      log.replaceChildren();
+      bar.style.width = "0%";
+      bar.textContent = "";
+      bar.classList.remove("bg-danger");
+      const response = await fetch(`${button.dataset.url}?${params}`, { method: "POST", headers: { Accept: "application/json" } });
+      const data = await response.json();
+      if (!response.ok) {
+        status.textContent = STATUS_TEXT.failed;
+        appendLine(data.error);
+        return;
+      }
+      job = data;
+      showStatus(job);
+      listen(job.events_url);
+    });
+
+    cancel.addEventListener("click", async () => {
+      if (job) {
+        await fetch(`/_jobs/${job.id}`, { method: "DELETE" });
+      }
+    });
+  }
+
+  document.querySelectorAll(".job-submit[data-url]").forEach(initJobs);
+})();
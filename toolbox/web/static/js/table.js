@@ -0,0 +1,120 @@
+// Ergebnistabelle: lädt die Zeilen fensterweise vom /data-Endpunkt, sortiert und filtert auf dem Server
+(function () {
+  const PAGE_SIZE = 200;
+
+  function initTable(container) {
+    const scroll = container.querySelector(".result-table-scroll");
+    const headRow = container.querySelector("thead tr");
+    const body = container.querySelector("tbody");
+    const status = container.querySelector(".result-table-status");
+    const filter = container.querySelector(".result-table-filter");
+    const state = { sort: null, order: "asc", query: "", loaded: 0, filtered: null, loading: false, generation: 0 };
+
+    function url() {
+      const target = new URL(container.dataset.url, window.location.origin);
+      target.searchParams.set("_offset", state.loaded);
+      target.searchParams.set("_limit", PAGE_SIZE);
+      if (state.sort) {
+        target.searchParams.set("_sort", state.sort);
+        target.searchParams.set("_order", state.order);
+      }
+      if (state.query) {
+        target.searchParams.set("_q", state.query);
+      }
+      return target;
+    }
+
+    function renderHeader(columns) {
+      if (headRow.children.length) {
+        return;
+      }
+      for (const column of columns) {
+        const th = document.createElement("th");
+        th.textContent = column;
+        th.style.cursor = "pointer";
+        th.addEventListener("click", () => {
+          state.order = state.sort === column && state.order === "asc" ? "desc" : "asc";
+          state.sort = column;
+          for (const other of headRow.children) {
+            other.textContent = other.dataset.column;
+          }
+          th.textContent = column + (state.order === "asc" ? " ▲" : " ▼");
+          reload();
+        });
+        th.dataset.column = column;
+        headRow.appendChild(th);
+      }
+    }
+
+    async function loadMore() {
+      if (state.loading || (state.filtered !== null && state.loaded >= state.filtered)) {
+        return;
+      }
+      state.loading = true;
+      const generation = state.generation;
+      try {
+        const response = await fetch(url(), { headers: { Accept: "application/json" } });
+        const page = await response.json();
+        if (generation !== state.generation) {
+          return; // Sortierung oder Filter wurden inzwischen geändert
+        }
+        if (!response.ok) {
+          status.textContent = page.error || response.statusText;
+          return;
+        }
+        renderHeader(page.columns);
+        const fragment = document.createDocumentFragment();
+        for (const row of page.rows) {
+          const tr = document.createElement("tr");
+          for (const value of row) {
+            const td = document.createElement("td");
+            td.textContent = value === null || value === undefined ? "" : String(value);
+            tr.appendChild(td);
+          }
+          fragment.appendChild(tr);
+        }
+        body.appendChild(fragment);
+        state.loaded += page.rows.length;
+        state.filtered = page.filtered;
+        status.textContent = page.total ? `${state.loaded} von ${page.filtered} Zeilen (gesamt ${page.total})` : "Keine Daten vorhanden.";
+      } finally {
+        if (generation === state.generation) {
+          state.loading = false;
+          // Fenster noch nicht gefüllt: direkt weiterladen
+          if (scroll.scrollHeight <= scroll.clientHeight && state.loaded < state.filtered) {
+            loadMore();
+          }
+        }
+      }
+    }
+
+    function reload() {
+      state.generation += 1;
+      state.loaded = 0;
+      state.filtered = null;
+      state.loading = false;
+      body.replaceChildren();
+      scroll.scrollTop = 0;
+      loadMore();
+    }
+
+    scroll.addEventListener("scroll", () => {
+      if (scroll.scrollTop + scroll.clientHeight >= scroll.scrollHeight - 200) {
+        loadMore();
+      }
+    });
+
+    let debounce = null;
+    filter.addEventListener("input", () => {
+      clearTimeout(debounce);
+      debounce = setTimeout(() => {
+        state.query = filter.value.trim();
+        reload();
+      }, 250);
+    });
+
+    loadMore();
+  }
+
+  document.querySelectorAll(".result-table[data-url]").forEach(initTable);
+})();
@@ -0,0 +1,124 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from cachetools import LRUCache
+
+from toolbox import metrics
+from toolbox.web.cache import CountingLRUCache
+
+
+def sort_key(value: Any) -> tuple:
+    """ Numbers sort numerically before text, text case-insensitive, empty values last """
+
+    if value is None or value == "":
+        return (2, 0, "")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value, "")
+    text = str(value)
+    try:
+        return (0, float(text), "")
+    except ValueError:
+        return (1, 0, text.casefold())
+
+
+class ResultTable:
+    """
+    Flat output of a cached result, paged, sorted and filtered on the server.
+    Sort indexes and the search text of the rows are computed once per result and kept,
+    so scrolling and re-sorting a large result only slices lists.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], max_filters: int = 8):
+        self.rows = rows
+        self.columns: List[str] = list(rows[0].keys()) if rows else []
+        self._sort_indexes: Dict[str, List[int]] = {}
+        self._search_text: Optional[List[str]] = None
+        self._filters: LRUCache = LRUCache(maxsize=max_filters)
+        self._lock = threading.Lock()
+
+    def sort_index(self, column: str) -> List[int]:
+        """ Row numbers in ascending order of the column """
+
+        index = self._sort_indexes.get(column)
+        if index is None:
+            values = [sort_key(row.get(column)) for row in self.rows]
+            index = sorted(range(len(self.rows)), key=values.__getitem__)
+            self._sort_indexes[column] = index
+        return index
+
+    def matches(self, query: str) -> List[int]:
+        """ Row numbers of the rows containing the query in any column (case-insensitive) """
+
+        query = query.casefold()
+        with self._lock:
+            matched = self._filters.get(query)
+        if matched is not None:
+            return matched
+
+        if self._search_text is None:
+            self._search_text = ["\x00".join(str(value) for value in row.values()).casefold() for row in self.rows]
+        matched = [i for i, text in enumerate(self._search_text) if query in text]
+        with self._lock:
+            self._filters[query] = matched
+        return matched
+
+    def page(self, offset: int = 0, limit: int = 100, sort: Optional[str] = None, # pylint: disable=too-many-arguments,too-many-positional-arguments
+             descending: bool = False, query: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Returns a window of the table.
+
+        Returns:
+            dict: columns, total and filtered row count, offset and the rows as lists in column order.
+        """
+
+        if sort in self.columns:
+            index = self.sort_index(sort)
+            if descending:
+                index = index[::-1]
+            if query:
+                matched = set(self.matches(query))
+                index = [i for i in index if i in matched]
+        elif query:
+            index = self.matches(query)
+            if descending:
+                index = index[::-1]
+        else:
+            index = range(len(self.rows) - 1, -1, -1) if descending else range(len(self.rows))
+
+        window = index[offset:offset + limit]
+        return {
+            "columns": self.columns,
+            "total": len(self.rows),
+            "filtered": len(index),
+            "offset": offset,
+            "rows": [[self.rows[i].get(column, "") for column in self.columns] for i in window],
+        }
+
+
+class TableCache:
+    """ Keeps the ResultTables of the most recently viewed results, keyed by result id """
+
+    def __init__(self, maxsize: int = 16):
+        self._storage: LRUCache = CountingLRUCache("tables", maxsize)
+        self._lock = threading.Lock()
+
+    def configure(self, config: Dict[str, Any]) -> None:
+        """ Applies tables_maxsize of the cache config """
+
+        if 'tables_maxsize' in config:
+            with self._lock:
+                self._storage = CountingLRUCache("tables", config['tables_maxsize'])
+
+    def get(self, result_id: str) -> Optional[ResultTable]:
+        """ Returns the table of a result or None """
+
+        with self._lock:
+            table = self._storage.get(result_id)
+        metrics.CACHE_REQUESTS.inc(cache="tables", result="miss" if table is None else "hit")
+        return table
+
+    def set(self, result_id: str, table: ResultTable) -> None:
+        """ Stores the table of a result """
+
+        with self._lock:
+            self._storage[result_id] = table
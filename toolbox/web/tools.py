@@ -0,0 +1,123 @@
+import logging
+import os
+import sys
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from toolbox.pipeline import Pipeline
+
+
+class ToolNotFound(Exception):
+    """ Raised for unknown tool groups and tools or tools, whose module cannot be loaded """
+
+    status_code = 404
+
+
+class ResolvedTool: # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """ A configured tool with its module class and the metadata the endpoints need """
+
+    def __init__(self, group: str, name: str, group_config: Dict[str, Any], tool_config: Dict[str, Any], module, path: Optional[str]): # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self.group = group
+        self.name = name
+        self.group_config = group_config
+        self.tool_config = tool_config
+        self.module = module
+        self.arguments = module.Arguments.model_fields
+        self.has_flat_output = module.has_flat_output()
+        self.path = path
+        self.mtime = _mtime(path)
+
+
+def _mtime(path: Optional[str]) -> Optional[int]:
+    if not path:
+        return None
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ToolRegistry:
+    """
+    Resolves every tool of web.groups to its module class once, instead of importing and
+    scanning the module on every request. A tool is resolved again when the file of its module
+    (or pipeline definition) changed, or for all tools with reload().
+    """
+
+    def __init__(self, tb, web_config: Dict[str, Any], logger: Optional[logging.Logger] = None):
+        self.tb = tb
+        self.web_config = web_config
+        self.logger = logger or logging.getLogger("toolbox.web")
+        self._tools: Dict[Tuple[str, str], ResolvedTool] = {}
+        self._lock = threading.Lock()
+
+    def build(self, reload: bool = False) -> None:
+        """ Resolves all configured tools, tools which fail to load are logged and skipped """
+
+        for group, group_config in self.web_config.get('groups', {}).items():
+            for name in group_config.get('tools', {}):
+                try:
+                    self._resolve(group, name, reload)
+                except ToolNotFound as e:
+                    self.logger.error(str(e))
+
+    def reload(self) -> int:
+        """ Re-imports the modules of all tools, returns the number of resolved tools """
+
+        with self._lock:
+            self._tools.clear()
+        self.build(reload=True)
+        return len(self._tools)
+
+    def get(self, group: str, name: str) -> ResolvedTool:
+        """
+        Returns the resolved tool, re-imports its module if the file changed.
+
+        Raises:
+            ToolNotFound: If the tool is not configured or its module cannot be loaded.
+        """
+
+        tool = self._tools.get((group, name))
+        if tool is None:
+            return self._resolve(group, name)
+        if tool.path and _mtime(tool.path) != tool.mtime:
+            self.logger.info(f"{tool.path} changed, reloading tool {group}/{name}")
+            try:
+                return self._resolve(group, name, reload=True)
+            except ToolNotFound as e:
+                # Fehlerhafte Änderung: bisherige Version weiter ausliefern
+                self.logger.error(str(e))
+                tool.mtime = _mtime(tool.path)
+        return tool
+
+    def _resolve(self, group: str, name: str, reload: bool = False) -> ResolvedTool:
+        group_config = self.web_config.get('groups', {}).get(group)
+        if not group_config:
+            raise ToolNotFound(f"Toolgroup '{group}' not found.")
+        tool_config = group_config.get('tools', {}).get(name)
+        if not tool_config:
+            raise ToolNotFound(f"Tool '{name}' not found in toolgroup '{group}'.")
+
+        with self._lock:
+            try:
+                module, path = self._load(tool_config, reload)
+            except Exception as e: # pylint: disable=broad-exception-caught
+                raise ToolNotFound(f"Tool '{name}' in toolgroup '{group}' could not be loaded: {e}") from e
+            if module is None:
+                raise ToolNotFound(f"Module of tool '{name}' in toolgroup '{group}' could not be loaded.")
+            tool = self._tools[(group, name)] = ResolvedTool(group, name, group_config, tool_config, module, path)
+        return tool
+
+    def _load(self, tool_config: Dict[str, Any], reload: bool) -> tuple:
+        """ Loads the module of a tool, or wraps its pipeline (file path or inline definition) as a module """
+
+        pipeline = tool_config.get('pipeline')
+        if pipeline:
+            if isinstance(pipeline, dict):
+                return Pipeline(self.tb, pipeline, pipeline.get('name', 'pipeline')).module_class(), None
+            return Pipeline.from_file(self.tb, pipeline).module_class(), pipeline
+
+        module = self.tb.load_module(tool_config.get('module'), reload=reload)
+        if module is None:
+            return None, None
+        return module, getattr(sys.modules.get(module.__module__), "__file__", None)